@@ -15,20 +15,8 @@ import src.streamlit_app.pages_in_dashboard.visitors.other_information as other_
 from src.streamlit_app.pages_in_dashboard.visitors.language_selection_menu import TRANSLATIONS
 from src.streamlit_app.pages_in_dashboard.password import check_password
 
-# imports for the sourcing and preprocessing pipeline
-from src.prediction_pipeline.sourcing_data.source_visitor_center_data import source_preprocessed_hourly_visitor_center_data
-from src.prediction_pipeline.sourcing_data.source_historic_visitor_count import source_historic_visitor_count 
-from src.prediction_pipeline.pre_processing.preprocess_historic_visitor_count_data import preprocess_visitor_count_data
-from src.prediction_pipeline.sourcing_data.source_visitor_center_data import source_visitor_center_data
-from src.prediction_pipeline.pre_processing.preprocess_visitor_center_data import process_visitor_center_data
-from src.prediction_pipeline.sourcing_data.source_weather import source_weather_data
-from src.prediction_pipeline.pre_processing.preprocess_weather_data import process_weather_data
-from src.prediction_pipeline.pre_processing.join_sensor_weather_visitorcenter import get_joined_dataframe
-from src.prediction_pipeline.pre_processing.features_zscoreweather_distanceholidays import get_zscores_and_nearest_holidays
-
-# imports for training pipeline
-from src.prediction_pipeline.modeling.source_and_feature_selection import get_features
-from src.prediction_pipeline.modeling.train_regressor import train_regressor
+# imports for the training pipeline
+from src.prediction_pipeline.modeling.run_training import run_training as run_training_pipeline
 
 # imports for inference pipeline
 from src.prediction_pipeline.modeling.run_inference import run_inference
@@ -82,35 +70,11 @@ def run_training():
 
     """
     Runs the training pipeline. This includes sourcing and preprocessing the data, training the model, and saving the model.
+    Stages whose code, parameters and inputs did not change since the last run are skipped (see
+    `src.prediction_pipeline.modeling.run_training`, which can also be run from the command line).
     """
 
-    # source and preprocess the historic visitor count data
-    sourced_visitor_count_df = source_historic_visitor_count()
-    processed_visitor_count_df = preprocess_visitor_count_data(sourced_visitor_count_df)
-
-    # source and preprocess the visitor center data
-    sourced_vc_data_df = source_visitor_center_data()
-    processed_vc_df_hourly,_ = process_visitor_center_data(sourced_vc_data_df)
-
-     # get the weather data for training and inference
-    # training data
-    train_start_date = datetime(2023, 1, 1)
-    train_end_date = datetime(2024, 7, 21)
-    weather_data = source_weather_data(start_time=train_start_date, end_time=train_end_date)
-    processed_weather_df = process_weather_data(weather_data)
-
-    # join the dataframes
-    joined_df = get_joined_dataframe(processed_weather_df, processed_visitor_count_df, processed_vc_df_hourly)
-
-    # Feature engineering: add features such as zscore weather features and nearest holidays
-    weather_columns_for_zscores = [ 'Temperature (°C)','Relative Humidity (%)','Wind Speed (km/h)']
-    with_zscores_and_nearest_holidays_df = get_zscores_and_nearest_holidays(joined_df, weather_columns_for_zscores)
-
-    # get the features for training
-    feature_df = get_features(with_zscores_and_nearest_holidays_df,train_start_date, train_end_date)
-
-    # train the model
-    train_regressor(feature_df)
+    run_training_pipeline()
 
 
 if __name__ == "__main__":
@@ -121,10 +85,8 @@ if __name__ == "__main__":
     ):
         st.stop()  # Do not continue if check_password is not True.
 
-    preprocessed_hourly_visitor_center_data = source_preprocessed_hourly_visitor_center_data()
-
     # call the sourcing and processing pipeline
-    inference_predictions = run_inference(preprocessed_hourly_visitor_center_data)
+    inference_predictions = run_inference()
 
     # create the dashboard
     create_dashboard_main_page(inference_predictions)
\ No newline at end of file
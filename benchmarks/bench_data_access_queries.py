@@ -0,0 +1,112 @@
+"""
+Benchmark the latency of the Data Access queries against the number of rows of a category dataset (hourly data of
+~130 sensors over 1, 3 and 9 years).
+
+Compares the previous per-row filters on the in-memory frame (comparing `index.date` of every row with the range, and
+the month names and years of precomputed temporal columns) against `query_engine.run_query` on the materialized
+dataset, which prunes the year partitions and the row groups outside of the range and filters the stored month codes.
+Both give the same rows. The per-row date comparisons grow with the rows of the dataset, while the engine only lists
+and reads the partitions of the queried years, so its latency stays flat. A query has a fixed cost of a few
+milliseconds (planning, reading the row group and converting the result), so filtering the in-memory categorical month
+column stays faster than a query, but needs the whole dataset in the memory of the app.
+
+Usage:
+    python -m benchmarks.bench_data_access_queries
+"""
+
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.calendar_features import get_month_name, get_season
+from src.streamlit_app.pages_in_dashboard.data_accessibility import query_engine
+
+
+def legacy_create_temporal_columns(df):
+    """Previous temporal columns, with the names of the month and season of every row."""
+    df['month'] = get_month_name(df.index.month)
+    df['year'] = df.index.year
+    df['season'] = get_season(df.index.month)
+    return df
+
+
+def legacy_range_query(df, columns, start_date, end_date):
+    """Previous date range filter, comparing the date of every row with the range."""
+    start_date = pd.to_datetime(start_date)
+    end_date = pd.to_datetime(end_date)
+    queried_df = df[(df.index.date >= start_date.date()) & (df.index.date <= end_date.date())]
+    return queried_df[columns]
+
+
+def legacy_month_query(df, columns, month_name, year):
+    """Previous month filter, comparing the month name and year of every row."""
+    queried_df = df[(df['month'] == month_name) & (df['year'] == year)]
+    return queried_df[columns]
+
+
+def make_category_frame(years, n_sensors=130, seed=0):
+    """Hourly counts of `n_sensors` sensors over `years` years, indexed by time."""
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2016-01-01", periods=years * 365 * 24, freq="h", name=query_engine.time_column)
+    counts = rng.poisson(20, size=(len(index), n_sensors)).astype(np.float64)
+    return pd.DataFrame(counts, index=index, columns=[f"Sensor {i} IN" for i in range(n_sensors)])
+
+
+def time_call(function, *args, repeat=5, **kwargs):
+    """Return the best wall time of `repeat` calls and the result of the last call."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def check_equal(legacy_result, new_result):
+    """Check that both queries return the same rows and values."""
+    legacy_result = legacy_result.copy()
+    legacy_result.index = legacy_result.index.astype("datetime64[ns]")
+    new_result = new_result.copy()
+    new_result.index = new_result.index.astype("datetime64[ns]")
+    pd.testing.assert_frame_equal(legacy_result, new_result, check_freq=False)
+
+
+if __name__ == "__main__":
+    query_engine.query_cache_dir = tempfile.mkdtemp(prefix="bench_data_access_")
+    columns = ["Sensor 7 IN"]
+
+    print(f"{'rows':>8} {'query':<12} {'legacy':>10} {'engine':>10} {'speedup':>8}")
+    for years in [1, 3, 9]:
+        df = make_category_frame(years)
+        query_engine.materialize_dataset(df, "visitor_sensors", f"bench{years}")
+        legacy_df = legacy_create_temporal_columns(df.copy())
+        last_year = df.index[-1].year
+
+        queries = {
+            "one month": (
+                lambda: legacy_range_query(legacy_df, columns, f"{last_year}-03-01", f"{last_year}-03-31"),
+                lambda: query_engine.run_query(
+                    "visitor_sensors", f"bench{years}", columns,
+                    start_date=f"{last_year}-03-01", end_date=f"{last_year}-03-31",
+                ),
+            ),
+            "one year": (
+                lambda: legacy_range_query(legacy_df, columns, f"{last_year}-01-01", f"{last_year}-12-31"),
+                lambda: query_engine.run_query(
+                    "visitor_sensors", f"bench{years}", columns,
+                    start_date=f"{last_year}-01-01", end_date=f"{last_year}-12-31",
+                ),
+            ),
+            "month/year": (
+                lambda: legacy_month_query(legacy_df, columns, "July", last_year),
+                lambda: query_engine.run_query("visitor_sensors", f"bench{years}", columns, month=7, year=last_year),
+            ),
+        }
+
+        for name, (legacy_query, new_query) in queries.items():
+            legacy_time, legacy_result = time_call(legacy_query)
+            new_time, new_result = time_call(new_query)
+            check_equal(legacy_result, new_result)
+            print(f"{len(df):>8} {name:<12} {legacy_time * 1000:>8.1f}ms {new_time * 1000:>8.1f}ms {legacy_time / new_time:>7.1f}x")
@@ -0,0 +1,79 @@
+"""
+Benchmark the nearest-holiday distance feature on the full 2016-2026 hourly frame.
+
+Compares the previous implementation (a Python apply over every unique date against all holidays) with
+the sorted-search implementation in `add_nearest_holiday_distance` and checks that both give the same output.
+
+Usage:
+    python -m benchmarks.bench_nearest_holiday_distance
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.prediction_pipeline.pre_processing.features_zscoreweather_distanceholidays import add_nearest_holiday_distance
+
+
+def legacy_add_nearest_holiday_distance(df):
+    """Previous implementation, kept here as the reference for output and timing."""
+    df['Time'] = pd.to_datetime(df['Time'])
+    df['Date'] = df['Time'].dt.date
+    bayern_holidays = df[df['Feiertag_Bayern']]['Date'].unique()
+    cz_holidays = df[df['Feiertag_CZ']]['Date'].unique()
+    dates_df = pd.DataFrame({'Date': df['Date'].unique()})
+
+    def get_nearest_holiday_distance(date, holidays):
+        if len(holidays) == 0:
+            return np.nan
+        return min(abs((date - pd.to_datetime(holidays)).days))
+
+    dates_df['Distance_to_Nearest_Holiday_Bayern'] = dates_df['Date'].apply(
+        lambda x: get_nearest_holiday_distance(pd.to_datetime(x), bayern_holidays)
+    )
+    dates_df['Distance_to_Nearest_Holiday_CZ'] = dates_df['Date'].apply(
+        lambda x: get_nearest_holiday_distance(pd.to_datetime(x), cz_holidays)
+    )
+    return df.merge(dates_df, on='Date', how='left')
+
+
+def make_hourly_frame(start="2016-01-01", end="2026-12-31 23:00", seed=0):
+    """Build an hourly frame with roughly 13 Bavarian and 13 Czech holidays per year."""
+    rng = np.random.default_rng(seed)
+    time_index = pd.date_range(start, end, freq="h")
+    days = pd.DatetimeIndex(time_index.normalize().unique())
+
+    bayern_days = days[rng.random(len(days)) < 13 / 365]
+    cz_days = days[rng.random(len(days)) < 13 / 365]
+
+    return pd.DataFrame({
+        'Time': time_index,
+        'Feiertag_Bayern': time_index.normalize().isin(bayern_days),
+        'Feiertag_CZ': time_index.normalize().isin(cz_days),
+    })
+
+
+def time_call(function, df, repeat):
+    """Return the best wall time in seconds of `repeat` calls on fresh copies of `df`."""
+    timings = []
+    for _ in range(repeat):
+        df_copy = df.copy()
+        start = time.perf_counter()
+        result = function(df_copy)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+if __name__ == "__main__":
+    hourly_df = make_hourly_frame()
+    print(f"Hourly frame: {len(hourly_df)} rows, {hourly_df['Time'].dt.date.nunique()} days")
+
+    legacy_time, legacy_result = time_call(legacy_add_nearest_holiday_distance, hourly_df, repeat=1)
+    new_time, new_result = time_call(add_nearest_holiday_distance, hourly_df, repeat=5)
+
+    pd.testing.assert_frame_equal(legacy_result, new_result)
+
+    print(f"apply over unique dates: {legacy_time:8.3f} s")
+    print(f"sorted search:           {new_time:8.3f} s")
+    print(f"speed-up:                {legacy_time / new_time:8.1f}x")
@@ -0,0 +1,70 @@
+"""
+Benchmark parsing the German timestamps of the historic visitor sensor exports (2016-2024, e.g. "10. Mai 2016 00:00").
+
+Compares the previous implementation (a per-row regex rewrite followed by pandas' format inference) with the
+vectorized month replacement and explicit format in `src.utils.parse_german_dates` and checks that both give the
+same output.
+
+Usage:
+    python -m benchmarks.bench_parse_german_dates
+"""
+
+import re
+import time
+
+import pandas as pd
+
+from src.utils import parse_german_dates
+
+
+german_month_names = ["Jan.", "Feb.", "März", "Apr.", "Mai", "Juni", "Juli", "Aug.", "Sep.", "Okt.", "Nov.", "Dez."]
+
+
+def legacy_parse_german_dates(df, date_column_name):
+    """Previous implementation, kept here as the reference for output and timing."""
+    month_map = {month_name: f"{number:02d}" for number, month_name in enumerate(german_month_names, start=1)}
+    pattern = re.compile(r'(\d{1,2})\.\s*(' + '|'.join(month_map.keys()) + r')\s*(\d{4})\s*(\d{2}):(\d{2})')
+
+    def replace_month(match):
+        day, month, year, hour, minute = match.groups()
+        return f"{year}-{month_map[month]}-{day} {hour}:{minute}:00"
+
+    df[date_column_name] = df[date_column_name].apply(lambda x: replace_month(pattern.search(x)) if pattern.search(x) else x)
+    df[date_column_name] = pd.to_datetime(df[date_column_name], errors='coerce')
+    return df
+
+
+def make_sensor_export_frame(start="2016-05-10", end="2024-12-31 23:00"):
+    """Build an hourly frame with the timestamps formatted like the sensor exports."""
+    time_index = pd.date_range(start, end, freq="h")
+    month_names = pd.Index(german_month_names)[time_index.month - 1]
+    formatted = [
+        f"{day}. {month_name} {year} {hour:02d}:00"
+        for day, month_name, year, hour in zip(time_index.day, month_names, time_index.year, time_index.hour)
+    ]
+    return pd.DataFrame({'Time': formatted})
+
+
+def time_call(function, df, repeat):
+    """Return the best wall time in seconds of `repeat` calls on fresh copies of `df`."""
+    timings = []
+    for _ in range(repeat):
+        df_copy = df.copy()
+        start = time.perf_counter()
+        result = function(df_copy, 'Time')
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+if __name__ == "__main__":
+    export_df = make_sensor_export_frame()
+    print(f"Sensor export frame: {len(export_df)} rows")
+
+    legacy_time, legacy_result = time_call(legacy_parse_german_dates, export_df, repeat=3)
+    new_time, new_result = time_call(parse_german_dates, export_df, repeat=5)
+
+    pd.testing.assert_frame_equal(legacy_result, new_result)
+
+    print(f"regex per row + inference: {legacy_time:8.3f} s")
+    print(f"vectorized explicit format: {new_time:8.3f} s")
+    print(f"speed-up:                   {legacy_time / new_time:8.1f}x")
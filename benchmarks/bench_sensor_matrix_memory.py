@@ -0,0 +1,88 @@
+"""
+Benchmark the peak memory of reading and preprocessing the historic visitor sensor export (2016-2024, ~100 count columns).
+
+Compares the previous float64 counts (with a boolean mask frame in `handle_outliers` and all intermediate frames kept
+alive) against the float32 counts read with `sensor_count_dtype` and clipped on one NumPy block, and checks that both
+give the same counts. The peak is measured with tracemalloc, which traces the NumPy buffers of the frames.
+
+Usage:
+    python -m benchmarks.bench_sensor_matrix_memory
+"""
+
+import contextlib
+import io
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_parse_german_dates import make_sensor_export_frame
+from src.prediction_pipeline.sourcing_data.source_historic_visitor_count import common_columns, sensor_count_dtype
+from src.prediction_pipeline.pre_processing.preprocess_historic_visitor_count_data import (
+    preprocess_visitor_count_data, parse_german_dates, fix_columns_names, correct_and_impute_times,
+    apply_sensor_lifecycle, calculate_traffic_metrics_abs, to_local_wall_clock
+)
+
+
+def legacy_handle_outliers(df):
+    """Previous implementation, kept here as the reference for output and memory."""
+    df[df > 800] = np.nan
+    return df
+
+
+def legacy_preprocess_visitor_count_data(visitor_counts):
+    """The previous preprocessing, which keeps every intermediate frame alive and the dtype of the counts."""
+    visitor_counts_parsed_dates = parse_german_dates(df=visitor_counts, date_column_name="Time")
+    df = visitor_counts_parsed_dates[visitor_counts_parsed_dates['Time'] >= "2016-05-10 03:00:00"].reset_index(drop=True)
+    df_mapped = fix_columns_names(df)
+    df_imputed_timestamps = correct_and_impute_times(df_mapped)
+    df_merged_columns = apply_sensor_lifecycle(df_imputed_timestamps)
+    df_no_outliers = legacy_handle_outliers(df_merged_columns)
+    df_traffic_metrics = to_local_wall_clock(calculate_traffic_metrics_abs(df_no_outliers))
+    df_traffic_metrics.reset_index(inplace=True)
+    return df_traffic_metrics
+
+
+def write_sensor_export(path, seed=0):
+    """Write an hourly export with all sensor columns, small counts, missing hours and a few outliers."""
+    rng = np.random.default_rng(seed)
+    export_df = make_sensor_export_frame()
+    counts = rng.poisson(20, size=(len(export_df), len(common_columns) - 1)).astype(np.float64)
+    counts[rng.random(counts.shape) < 0.3] = np.nan
+    counts[rng.random(counts.shape) < 1e-5] = 5000
+    export_df[common_columns[1:]] = counts
+    export_df.to_csv(path, index=False)
+
+
+def measure(function, path, dtype):
+    """Return the wall time, the peak traced memory in MB and the result of reading and preprocessing the export."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        visitor_counts = pd.read_csv(path, usecols=common_columns, dtype=dtype)
+        result = function(visitor_counts)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2**20, result
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "sensor_export.csv")
+        write_sensor_export(path)
+
+        legacy_time, legacy_peak, legacy_result = measure(legacy_preprocess_visitor_count_data, path, dtype=None)
+        new_time, new_peak, new_result = measure(
+            preprocess_visitor_count_data, path, dtype=dict.fromkeys(common_columns[1:], sensor_count_dtype)
+        )
+
+    print(f"Preprocessed frame: {new_result.shape[0]} rows, {new_result.shape[1]} columns")
+    pd.testing.assert_frame_equal(legacy_result.astype({c: sensor_count_dtype for c in legacy_result.columns[1:]}), new_result)
+
+    print(f"float64 + mask frame: {legacy_peak:8.1f} MB peak, {legacy_time:6.2f} s")
+    print(f"float32 block:        {new_peak:8.1f} MB peak, {new_time:6.2f} s")
+    print(f"peak memory ratio:    {legacy_peak / new_peak:8.1f}x")
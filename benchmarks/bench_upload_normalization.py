@@ -0,0 +1,164 @@
+"""
+Benchmark the schema check and type normalization of uploads in the data quality check, on a multi-year visitor
+sensor export (2016-2024, hourly) and a visitor center export (2016-2024, daily).
+
+Compares the previous implementations (nested loops with list membership for the schema, a Python lambda per value
+for the counts and flags) against the set-based header check and the block-wise NumPy conversions in
+`src.streamlit_app.pre_processing.data_quality_check`, and checks that both give the same output.
+
+Usage:
+    python -m benchmarks.bench_upload_normalization
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_parse_german_dates import make_sensor_export_frame
+from src.streamlit_app.pre_processing.gen_config_for_visitor_sensors_and_centers import visitor_centers, visitor_sensors
+from src.streamlit_app.pre_processing.data_quality_check import match_header, get_filled_columns, int_for_all_counts, convert_data_types
+
+
+def flatten_columns(dict_to_check):
+    """The columns of a configuration dictionary, in order."""
+    columns = []
+    for sensors in dict_to_check.values():
+        if isinstance(sensors, dict):
+            for column_list in sensors.values():
+                columns.extend(column_list)
+        else:
+            columns.extend(sensors)
+    return columns
+
+
+def legacy_get_and_match_columns(df, dict_to_check):
+    """Previous schema check, kept here as the reference for output and timing (without the error messages)."""
+    sensors_list = flatten_columns(dict_to_check)
+    missing_in_df = []
+    extra_in_df = []
+    for sensor in sensors_list:
+        if sensor not in df.columns:
+            missing_in_df.append(sensor)
+    for column in df.columns:
+        if column not in sensors_list:
+            extra_in_df.append(column)
+            if "Unnamed" in column and df[column].isnull().all():
+                df.drop(column, axis=1, inplace=True)
+                extra_in_df.remove(column)
+    return not (missing_in_df or extra_in_df)
+
+
+def check_columns(df, dict_to_check):
+    """Schema check of the upload page on a whole frame: the header, then the Unnamed columns must be empty."""
+    missing_in_df, extra_in_df, unnamed_columns = match_header(list(df.columns), dict_to_check)
+    filled_unnamed_columns = get_filled_columns(df, unnamed_columns)
+    df.drop(columns=[column for column in unnamed_columns if column not in filled_unnamed_columns], inplace=True)
+    return not (missing_in_df or extra_in_df or filled_unnamed_columns)
+
+
+def legacy_int_for_all_counts(df):
+    """Previous count conversion, with a Python lambda per value."""
+    for column in df.columns:
+        if df[column].dtype == "float64":
+            df[column] = df[column].apply(lambda x: int(x) if pd.notna(x) and x.is_integer() else (round(x) if pd.notna(x) else np.nan))
+            df[column] = df[column].fillna(0).astype('int64')
+    return df
+
+
+def legacy_to_binary(df, column):
+    """Previous flag conversion of one column, with a Python lambda per value."""
+    df[column] = pd.to_numeric(df[column], errors='coerce').fillna(0)
+    df[column] = df[column].apply(lambda x: 1 if x > 0 else 0).astype(int)
+
+
+def legacy_convert_data_types(df, visitor_centers):
+    """Previous visitor center conversion, column by column."""
+    for column_list in visitor_centers['visitor_centers_count'].values():
+        for column in column_list:
+            if column in df.columns:
+                df[column] = pd.to_numeric(df[column], errors='coerce').fillna(0).astype(int)
+    for group in ['holidays', 'opening_or_closed']:
+        for column_list in visitor_centers[group].values():
+            for column in column_list:
+                if column in df.columns:
+                    legacy_to_binary(df, column)
+    time_column = visitor_centers.get('time', [None])[0]
+    day_column = visitor_centers.get('Day', [None])[0]
+    if time_column and time_column in df.columns:
+        df[time_column] = pd.to_datetime(df[time_column], errors='coerce')
+    if day_column and day_column in df.columns:
+        df[day_column] = df[day_column].astype(str)
+    for column_list in visitor_centers['temperature_columns'].values():
+        for column in column_list:
+            if column in df.columns:
+                if column == 'Laubfärbung':
+                    legacy_to_binary(df, column)
+                else:
+                    df[column] = pd.to_numeric(df[column], errors='coerce').astype('float64')
+    return df
+
+
+def make_sensor_upload(seed=0):
+    """An hourly sensor export with all configured columns, float counts, missing values and a few fractions."""
+    rng = np.random.default_rng(seed)
+    upload_df = make_sensor_export_frame()
+    sensor_columns = [column for column in flatten_columns(visitor_sensors) if column != 'Time']
+    counts = rng.poisson(20, size=(len(upload_df), len(sensor_columns))).astype(np.float64)
+    counts[rng.random(counts.shape) < 0.2] = np.nan
+    counts[rng.random(counts.shape) < 0.01] += 0.5
+    count_df = pd.DataFrame(counts, columns=sensor_columns)
+    count_df["Unnamed: 200"] = np.nan
+    return pd.concat([upload_df, count_df], axis=1)
+
+
+def make_center_upload(seed=0):
+    """A daily visitor center export with object columns of numbers, text markers and missing values."""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2016-01-01", "2024-12-31", freq="D")
+    upload_df = pd.DataFrame({'Datum': dates.strftime("%Y-%m-%d"), 'Wochentag': dates.day_name()})
+    for column in flatten_columns(visitor_centers):
+        if column not in upload_df.columns:
+            values = rng.integers(-1, 300, len(dates)).astype(object)
+            values[rng.random(len(dates)) < 0.05] = "geschlossen"
+            values[rng.random(len(dates)) < 0.05] = None
+            upload_df[column] = values
+    return upload_df
+
+
+def time_call(function, df, *args, repeat=3):
+    """Return the best wall time in seconds of `repeat` calls on fresh copies of `df` and the last result."""
+    timings = []
+    for _ in range(repeat):
+        df_copy = df.copy()
+        start = time.perf_counter()
+        result = function(df_copy, *args)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def validate_sensor_upload(schema_check, count_conversion):
+    """Check the schema of the sensor upload and convert its counts, returning the status and the converted frame."""
+    def validate(df):
+        status = schema_check(df, visitor_sensors)
+        return status, count_conversion(df)
+    return validate
+
+
+if __name__ == "__main__":
+    sensor_df = make_sensor_upload()
+    print(f"Sensor export: {sensor_df.shape[0]} rows, {sensor_df.shape[1]} columns")
+
+    legacy_time, (legacy_status, legacy_result) = time_call(validate_sensor_upload(legacy_get_and_match_columns, legacy_int_for_all_counts), sensor_df)
+    new_time, (new_status, new_result) = time_call(validate_sensor_upload(check_columns, int_for_all_counts), sensor_df)
+
+    assert legacy_status == new_status
+    pd.testing.assert_frame_equal(legacy_result, new_result)
+    print(f"Sensor upload   legacy: {legacy_time:8.3f} s  vectorized: {new_time:8.3f} s  speedup: {legacy_time / new_time:7.1f}x")
+
+    center_df = make_center_upload()
+    legacy_time, legacy_result = time_call(legacy_convert_data_types, center_df, visitor_centers)
+    new_time, new_result = time_call(convert_data_types, center_df, visitor_centers)
+
+    pd.testing.assert_frame_equal(legacy_result, new_result)
+    print(f"Center upload   legacy: {legacy_time:8.3f} s  vectorized: {new_time:8.3f} s  speedup: {legacy_time / new_time:7.1f}x")
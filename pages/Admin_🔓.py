@@ -5,7 +5,6 @@ from src.streamlit_app.pages_in_dashboard.admin.visitor_count import visitor_pre
 from src.streamlit_app.pages_in_dashboard.admin.parking import get_parking_section
 from src.streamlit_app.source_data import source_and_preprocess_realtime_parking_data
 from src.streamlit_app.pages_in_dashboard.visitors.language_selection_menu import TRANSLATIONS
-from src.prediction_pipeline.sourcing_data.source_visitor_center_data import source_preprocessed_hourly_visitor_center_data
 from src.prediction_pipeline.modeling.run_inference import run_inference
 from datetime import datetime
 import pytz
@@ -27,9 +26,7 @@ def get_visitor_predictions_section():
     Build the visitor predictions section by running/loading the inference pipeline and displaying the predictions in actual number of visitors.
     """
 
-    preprocessed_hourly_visitor_center_data = source_preprocessed_hourly_visitor_center_data()
-
-    inference_predictions = run_inference(preprocessed_hourly_visitor_center_data)
+    inference_predictions = run_inference()
 
     visitor_prediction_graph(inference_predictions)
 
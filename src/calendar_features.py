@@ -0,0 +1,125 @@
+"""
+Calendar features (month, season, weekday and weekend) shared by the prediction pipeline and the dashboard.
+
+Every feature is derived with one lookup array indexed by `dt.month` or `dt.dayofweek`, and returned as a categorical
+built from the looked up codes, so no per-element Python function is applied.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+# Names of the months, indexed by month number - 1
+month_names = {
+    'en': ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September', 'October',
+           'November', 'December'],
+    'de': ['Januar', 'Februar', 'März', 'April', 'Mai', 'Juni', 'Juli', 'August', 'September', 'Oktober',
+           'November', 'Dezember'],
+}
+
+# Names of the seasons, indexed by the season code
+season_names = {
+    'en': ['Winter', 'Spring', 'Summer', 'Fall'],
+    'de': ['Winter', 'Frühling', 'Sommer', 'Herbst'],
+}
+
+# Season code of every month, indexed by month number (index 0 is unused)
+season_of_month = np.array([-1, 0, 0, 1, 1, 1, 2, 2, 2, 3, 3, 3, 0], dtype=np.int8)
+
+# Names of the weekdays, indexed by `dt.dayofweek` (Monday = 0)
+weekday_names = {
+    'en': ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'],
+    'de': ['Montag', 'Dienstag', 'Mittwoch', 'Donnerstag', 'Freitag', 'Samstag', 'Sonntag'],
+}
+
+# Weekdays in the order of the weekday categories, as `dt.dayofweek`. This is the alphabetical order of the English
+# names, which the categories had when they were built from `dt.day_name()`. The cyclic encoding of the models turns
+# the category codes into features, so changing this order changes the encoding of the trained models.
+weekday_category_order = np.array([4, 0, 5, 6, 3, 1, 2], dtype=np.int8)
+
+# Category code of every weekday, indexed by `dt.dayofweek`
+weekday_category_code = np.argsort(weekday_category_order).astype(np.int8)
+
+# Weekend flag of every weekday, indexed by `dt.dayofweek`
+weekend_of_weekday = np.array([False, False, False, False, False, True, True])
+
+
+def _lookup_codes(numbers, lookup: np.ndarray) -> np.ndarray:
+    """Look up the codes of the numbers (e.g. month numbers), with code -1 for missing numbers."""
+    numbers = np.asarray(numbers, dtype=np.float64)
+    is_valid = ~np.isnan(numbers)
+    codes = np.full(numbers.shape, -1, dtype=np.int8)
+    codes[is_valid] = lookup[numbers[is_valid].astype(np.int64)]
+    return codes
+
+
+def get_month(months) -> pd.Categorical:
+    """
+    Get the months as a categorical with the categories 1 to 12.
+
+    Args:
+        months (array-like): Month numbers (1-12), e.g. from `dt.month`. Missing values stay missing.
+
+    Returns:
+        pd.Categorical: The months.
+    """
+    return pd.Categorical.from_codes(_lookup_codes(months, np.arange(-1, 12, dtype=np.int8)), categories=range(1, 13))
+
+
+def get_month_name(months, language: str = 'en') -> pd.Categorical:
+    """
+    Get the names of the months as a categorical ordered from January to December.
+
+    Args:
+        months (array-like): Month numbers (1-12), e.g. from `dt.month`. Missing values stay missing.
+        language (str, optional): 'en' or 'de'. Defaults to 'en'.
+
+    Returns:
+        pd.Categorical: The month names.
+    """
+    return pd.Categorical.from_codes(_lookup_codes(months, np.arange(-1, 12, dtype=np.int8)), categories=month_names[language])
+
+
+def get_season(months, language: str = 'en') -> pd.Categorical:
+    """
+    Get the meteorological seasons of the months (winter: December to February, spring: March to May,
+    summer: June to August, fall: September to November).
+
+    Args:
+        months (array-like): Month numbers (1-12), e.g. from `dt.month`. Missing values stay missing.
+        language (str, optional): 'en' or 'de'. Defaults to 'en'.
+
+    Returns:
+        pd.Categorical: The season names.
+    """
+    return pd.Categorical.from_codes(_lookup_codes(months, season_of_month), categories=season_names[language])
+
+
+def get_weekday(days_of_week, language: str = 'en') -> pd.Categorical:
+    """
+    Get the names of the weekdays as a categorical in the order of `weekday_category_order` (Friday, Monday,
+    Saturday, Sunday, Thursday, Tuesday, Wednesday).
+
+    Args:
+        days_of_week (array-like): Days of the week (Monday = 0), e.g. from `dt.dayofweek`. Missing values stay missing.
+        language (str, optional): 'en' or 'de'. Defaults to 'en'.
+
+    Returns:
+        pd.Categorical: The weekday names.
+    """
+    categories = [weekday_names[language][day] for day in weekday_category_order]
+    return pd.Categorical.from_codes(_lookup_codes(days_of_week, weekday_category_code), categories=categories)
+
+
+def get_weekend(days_of_week) -> np.ndarray:
+    """
+    Get whether the days of the week are on a weekend (Saturday or Sunday).
+
+    Args:
+        days_of_week (array-like): Days of the week (Monday = 0), e.g. from `dt.dayofweek`. Missing values are no weekend.
+
+    Returns:
+        np.ndarray: Boolean array with True for weekend days.
+    """
+    codes = _lookup_codes(days_of_week, np.arange(7, dtype=np.int8))
+    return np.where(codes >= 0, weekend_of_weekday[codes], False)
@@ -34,4 +34,40 @@ regions = {
     'Scheuereck-Schachten-Trinkwassertalsperre': ['Scheuereck-Schachten-Trinkwassertalsperre IN', 'Scheuereck-Schachten-Trinkwassertalsperre OUT'],
     'Lusen-Mauth-Finsterau': ['Lusen-Mauth-Finsterau IN', 'Lusen-Mauth-Finsterau OUT'],
     'Rachel-Spiegelau': ['Rachel-Spiegelau IN', 'Rachel-Spiegelau OUT'],
-}
\ No newline at end of file
+}
+
+# Lifecycle of the visitor sensors, one row per sensor column: (sensor, valid_from, valid_to, merged_into)
+# - valid_from / valid_to: first hour with valid counts and first hour without valid counts anymore (None = open).
+#   Counts outside of this interval are set to NaN, e.g. before a sensor was replaced or after it was replaced by a new one.
+# - merged_into: column that combines the counts of a replaced and a replacing sensor (None = not merged). The counts
+#   of the sensor listed first are preferred and the other sensors fill the missing values.
+sensor_lifecycle = [
+    ('Bucina PYRO IN', None, '2021-05-28 01:00:00', 'Bucina MERGED IN'),
+    ('Bucina_Multi IN', '2021-05-28 01:00:00', None, 'Bucina MERGED IN'),
+    ('Bucina PYRO OUT', None, '2021-05-28 01:00:00', 'Bucina MERGED OUT'),
+    ('Bucina_Multi OUT', '2021-05-28 01:00:00', None, 'Bucina MERGED OUT'),
+    ('Bucina_Multi Fußgänger IN', '2021-05-28 01:00:00', None, None),
+    ('Bucina_Multi Fußgänger OUT', '2021-05-28 01:00:00', None, None),
+    ('Bucina_Multi Fahrräder IN', '2021-05-28 01:00:00', None, None),
+    ('Bucina_Multi Fahrräder OUT', '2021-05-28 01:00:00', None, None),
+    ('Falkenstein 1 PYRO IN', None, '2022-12-22 13:00:00', 'Falkenstein 1 MERGED IN'),
+    ('Falkenstein 1 IN', '2022-12-22 13:00:00', None, 'Falkenstein 1 MERGED IN'),
+    ('Falkenstein 1 PYRO OUT', None, '2022-12-22 13:00:00', 'Falkenstein 1 MERGED OUT'),
+    ('Falkenstein 1 OUT', '2022-12-22 13:00:00', None, 'Falkenstein 1 MERGED OUT'),
+    ('Lusen 1 PYRO IN', '2020-07-30 00:00:00', None, 'Lusen 1 MERGED IN'),
+    ('Lusen 1 EVO IN', None, None, 'Lusen 1 MERGED IN'),
+    ('Lusen 1 PYRO OUT', '2020-07-30 00:00:00', None, 'Lusen 1 MERGED OUT'),
+    ('Lusen 1 EVO OUT', None, None, 'Lusen 1 MERGED OUT'),
+    ('Trinkwassertalsperre PYRO IN', None, '2021-06-18 01:00:00', 'Trinkwassertalsperre MERGED IN'),
+    ('Trinkwassertalsperre_MULTI IN', '2021-06-18 01:00:00', None, 'Trinkwassertalsperre MERGED IN'),
+    ('Trinkwassertalsperre PYRO OUT', None, '2021-06-18 01:00:00', 'Trinkwassertalsperre MERGED OUT'),
+    ('Trinkwassertalsperre_MULTI OUT', '2021-06-18 01:00:00', None, 'Trinkwassertalsperre MERGED OUT'),
+    ('Trinkwassertalsperre_MULTI Fußgänger IN', '2021-06-18 01:00:00', None, None),
+    ('Trinkwassertalsperre_MULTI Fußgänger OUT', '2021-06-18 01:00:00', None, None),
+    ('Trinkwassertalsperre_MULTI Fahrräder IN', '2021-06-18 01:00:00', None, None),
+    ('Trinkwassertalsperre_MULTI Fahrräder OUT', '2021-06-18 01:00:00', None, None),
+    ('Lusen 3 IN', '2022-12-20 00:00:00', None, None),
+    ('Lusen 3 OUT', '2022-12-20 00:00:00', None, None),
+    ('Gsenget IN', '2022-10-12 00:00:00', None, None),
+    ('Gsenget OUT', '2022-10-12 00:00:00', None, None),
+]
@@ -0,0 +1,237 @@
+"""
+Append-only tables in the cloud: a compacted base file plus immutable, timestamped delta files.
+
+Every write adds a new parquet delta with the new rows only, so its cost depends only on the size of the new data and
+not on the history. Readers merge the base and the deltas in the order they were written, and the last written row
+of every time wins. A periodic compaction merges the deltas into the base and removes them, so that reads stay fast.
+
+Layout of a table `<name>` in its folder:
+    <folder>/<name>_base.parquet              the compacted rows
+    <folder>/deltas/<name>_<UTC time>.parquet  the rows written since the last compaction
+A CSV file `<folder>/<name>.csv` written before the deltas were introduced is read as the base until the first
+compaction replaces it.
+
+Usage (compaction):
+    python -m src.delta_store --folder preprocessed_data/bf_preprocessed_files/visitor_count_sensors
+        --table visitor_count_sensors_preprocessed --time-column Time
+"""
+
+import argparse
+import os
+import tempfile
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from azure.storage.blob import BlobServiceClient
+from src.config import CONNECTION_STRING, CONTAINER_NAME
+from src.utils import read_dataframe_from_azure, upload_dataframe_to_azure
+from src.workbook_ingestion import convert_to_parquet_types
+
+
+###########################################################################################
+# GLOBAL VARIABLES
+###########################################################################################
+
+delta_folder_name = "deltas"
+base_suffix = "_base"
+
+
+###########################################################################################
+# Functions
+###########################################################################################
+
+def get_container_client():
+    """Get the client of the project container."""
+    return BlobServiceClient.from_connection_string(CONNECTION_STRING).get_container_client(CONTAINER_NAME)
+
+def list_delta_names(folder: str, table_name: str) -> list:
+    """
+    List the delta blobs of a table in the order they were written (their names start with the UTC write time).
+
+    Args:
+        folder (str): The folder of the table.
+        table_name (str): The name of the table.
+
+    Returns:
+        list: The full names of the delta blobs, oldest first.
+    """
+    prefix = f"{folder}/{delta_folder_name}/{table_name}_"
+    return sorted(get_container_client().list_blob_names(name_starts_with=prefix))
+
+def blob_exists(blob_name: str) -> bool:
+    """Check if a blob exists in the container."""
+    return get_container_client().get_blob_client(blob_name).exists()
+
+def get_delta_file_name(table_name: str) -> str:
+    """Get the file name of a new delta of a table, which starts with the current UTC time."""
+    write_time = pd.Timestamp.now(tz="UTC")
+    return f"{table_name}_{write_time:%Y%m%dT%H%M%S%f}.parquet"
+
+def append_delta(df: pd.DataFrame, folder: str, table_name: str) -> str:
+    """
+    Write new rows of a table as an immutable delta file.
+
+    Args:
+        df (pd.DataFrame): The new rows.
+        folder (str): The folder of the table.
+        table_name (str): The name of the table.
+
+    Returns:
+        str: The file name of the delta.
+    """
+    file_name = get_delta_file_name(table_name)
+
+    upload_dataframe_to_azure(
+        df=convert_to_parquet_types(df.copy()),
+        file_name=file_name,
+        target_folder=f"{folder}/{delta_folder_name}",
+        file_format="parquet",
+    )
+
+    return file_name
+
+def get_common_schema(schemas: list) -> pa.Schema:
+    """
+    Get one schema for parquet parts of the same rows whose column types differ, e.g. a column that has only numbers
+    in one part and also text in another. Mixed integer and float columns become float, other mixed columns string.
+
+    Args:
+        schemas (list): The schemas of the parts, with the same columns in the same order.
+
+    Returns:
+        pa.Schema: The common schema, without the pandas metadata of the parts.
+    """
+    fields = []
+    for name in schemas[0].names:
+        types = {schema.field(name).type for schema in schemas} - {pa.null()}
+        if len(types) <= 1:
+            field_type = types.pop() if types else pa.null()
+        elif all(pa.types.is_integer(field_type) or pa.types.is_floating(field_type) for field_type in types):
+            field_type = pa.float64()
+        else:
+            field_type = pa.string()
+        fields.append(pa.field(name, field_type))
+
+    return pa.schema(fields)
+
+def append_delta_parts(part_paths: list, folder: str, table_name: str) -> str:
+    """
+    Write local parquet parts of new rows (e.g. the chunks of an upload) as a single delta file.
+
+    The parts are streamed into one local file, one part at a time, and uploaded as one blob. Readers therefore see
+    either all new rows or none, also if the write fails halfway.
+
+    Args:
+        part_paths (list): The local paths of the parts, in the order of their rows. All parts have the same columns.
+        folder (str): The folder of the table.
+        table_name (str): The name of the table.
+
+    Returns:
+        str: The file name of the delta.
+    """
+    file_name = get_delta_file_name(table_name)
+    schema = get_common_schema([pq.read_schema(part_path) for part_path in part_paths])
+
+    with tempfile.TemporaryDirectory() as delta_folder:
+        delta_path = os.path.join(delta_folder, file_name)
+        with pq.ParquetWriter(delta_path, schema) as writer:
+            for part_path in part_paths:
+                writer.write_table(pq.read_table(part_path).replace_schema_metadata(None).cast(schema))
+
+        with open(delta_path, "rb") as delta_file:
+            get_container_client().upload_blob(
+                name=f"{folder}/{delta_folder_name}/{file_name}", data=delta_file, overwrite=False
+            )
+
+    return file_name
+
+def merge_last_write_wins(frames: list, time_column: str) -> pd.DataFrame:
+    """
+    Merge frames in the order they were written, keeping the last written row of every time.
+
+    Args:
+        frames (list): The frames, oldest first.
+        time_column (str): The time key of the rows.
+
+    Returns:
+        pd.DataFrame: The merged rows, sorted by time.
+    """
+    if not frames:
+        return pd.DataFrame()
+
+    merged = pd.concat(frames, ignore_index=True)
+    merged[time_column] = pd.to_datetime(merged[time_column])
+    merged = merged.drop_duplicates(subset=[time_column], keep='last')
+
+    return merged.sort_values(time_column, kind='stable').reset_index(drop=True)
+
+def read_table(folder: str, table_name: str, time_column: str) -> tuple:
+    """
+    Read a table by merging its base and its deltas on the fly.
+
+    Args:
+        folder (str): The folder of the table.
+        table_name (str): The name of the table.
+        time_column (str): The time key of the rows.
+
+    Returns:
+        tuple: The merged rows sorted by time, and the names of the delta blobs that were merged.
+    """
+    frames = []
+
+    if blob_exists(f"{folder}/{table_name}{base_suffix}.parquet"):
+        frames.append(read_dataframe_from_azure(f"{table_name}{base_suffix}", "parquet", folder))
+    elif blob_exists(f"{folder}/{table_name}.csv"):
+        frames.append(read_dataframe_from_azure(table_name, "csv", folder))
+
+    delta_names = list_delta_names(folder, table_name)
+    for delta_name in delta_names:
+        frames.append(read_dataframe_from_azure(
+            delta_name.split("/")[-1], "parquet", delta_name.rsplit("/", 1)[0]
+        ))
+
+    return merge_last_write_wins(frames, time_column), delta_names
+
+def compact_table(folder: str, table_name: str, time_column: str) -> int:
+    """
+    Merge the deltas of a table into its base and remove them. Deltas written while the compaction runs are kept
+    and merged by the next compaction.
+
+    Args:
+        folder (str): The folder of the table.
+        table_name (str): The name of the table.
+        time_column (str): The time key of the rows.
+
+    Returns:
+        int: The number of compacted deltas.
+    """
+    merged, delta_names = read_table(folder, table_name, time_column)
+    if not delta_names:
+        print(f"No deltas to compact for {folder}/{table_name}")
+        return 0
+
+    upload_dataframe_to_azure(
+        df=convert_to_parquet_types(merged),
+        file_name=f"{table_name}{base_suffix}",
+        target_folder=folder,
+        file_format="parquet",
+    )
+
+    # Remove the deltas only after the new base is written, so that a failed compaction loses no rows
+    container_client = get_container_client()
+    for delta_name in delta_names:
+        container_client.delete_blob(delta_name)
+
+    print(f"Compacted {len(delta_names)} deltas into {folder}/{table_name}{base_suffix}.parquet ({len(merged)} rows)")
+    return len(delta_names)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge the deltas of an append-only table into its base.")
+    parser.add_argument("--folder", required=True, help="Folder of the table in the container.")
+    parser.add_argument("--table", required=True, help="Name of the table.")
+    parser.add_argument("--time-column", required=True, help="Time key of the rows (the last written row wins).")
+    args = parser.parse_args()
+
+    compact_table(args.folder, args.table, args.time_column)
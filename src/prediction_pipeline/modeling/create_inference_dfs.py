@@ -8,10 +8,12 @@ from pycaret.regression import load_model
 from sklearn.preprocessing import MinMaxScaler
 from src.config import regions, CONTAINER_NAME, CONNECTION_STRING
 from src.utils import upload_dataframe_to_azure
+from src.prediction_pipeline.modeling.source_and_feature_selection import feature_transformer_file_name
+from src.prediction_pipeline.modeling.train_regressor import save_path_models, load_run_info_from_azure
 from azure.storage.blob import BlobClient
 
 
-# Folder where models are stored
+# Folder of the models used if no training run saved a registry entry
 folder_prefix = 'models/models_trained/1483317c-343a-4424-88a6-bd57459901d1/'  # If you have a specific folder
 
 
@@ -27,6 +29,23 @@ target_vars_et  = ['traffic_abs', 'sum_IN_abs', 'sum_OUT_abs',
 # model names 
 model_names = [f'extra_trees_{var}' for var in target_vars_et]
 
+def get_latest_run_folder_prefix():
+    """
+    Get the folder of the models and the feature transformer of the latest training run, from its registry entry.
+
+    Returns:
+    - str: The folder/virtual path prefix of the latest training run, or `folder_prefix` if no run saved a registry entry.
+    """
+    try:
+        run_info = load_run_info_from_azure(save_path_models)
+    except ValueError as error:
+        print(f"Warning: {error}, falling back to the models under {folder_prefix}")
+        return folder_prefix
+
+    print(f"Using the models of the latest training run {run_info['run_id']}")
+
+    return f"{save_path_models}/{run_info['run_id']}/"
+
 @st.cache_resource(max_entries=1)
 def load_latest_models_azure(connection_string, container_name, folder_prefix, models_names):
     """
@@ -84,6 +103,41 @@ def load_latest_models_azure(connection_string, container_name, folder_prefix, m
 
 
 
+@st.cache_resource(max_entries=1)
+def load_feature_transformer_azure(connection_string, container_name, folder_prefix):
+    """
+    Load the feature transformer that was fitted and saved together with the models of a training run.
+
+    Parameters:
+    - connection_string (str): The connection string for the Azure Storage Account.
+    - container_name (str): The name of the Blob Storage container.
+    - folder_prefix (str): The folder/virtual path prefix within the container.
+
+    Returns:
+    - FeatureTransformer: The fitted feature transformer, or None if the training run did not save one.
+    """
+
+    blob_name = folder_prefix + feature_transformer_file_name
+    print(f"Retrieving the feature transformer saved under Azure container {container_name} with blob name {blob_name}")
+
+    blob_client = BlobClient.from_connection_string(
+        conn_str=connection_string, 
+        container_name=container_name, 
+        blob_name=blob_name
+    )
+
+    if not blob_client.exists():
+        print(f"No feature transformer found under {blob_name}")
+        return None
+
+    bytes_data = blob_client.download_blob().readall()
+    feature_transformer = joblib.load(io.BytesIO(bytes_data))
+
+    print("Successfully loaded the feature transformer")
+
+    return feature_transformer
+
+
 def predict_with_models(loaded_models, df_features):
     """
     Given a dictionary of models and a DataFrame of features, this function predicts the target
@@ -162,7 +216,7 @@ def preprocess_overall_inference_predictions(overall_predictions: pd.DataFrame)
 
 
 @st.cache_data(max_entries=1)
-def visitor_predictions(inference_data):
+def visitor_predictions(inference_data, folder_prefix):
 
     loaded_models = load_latest_models_azure(
         connection_string=CONNECTION_STRING,
@@ -1,5 +1,7 @@
-from src.prediction_pipeline.pre_processing.features_zscoreweather_distanceholidays import add_nearest_holiday_distance, add_daily_max_values, add_moving_z_scores 
-from src.prediction_pipeline.modeling.source_and_feature_selection import process_transformations
+from src.prediction_pipeline.pre_processing.feature_store import compute_weather_features, read_feature_store
+from src.prediction_pipeline.modeling.source_and_feature_selection import FeatureTransformer
+from src.prediction_pipeline.modeling.create_inference_dfs import load_feature_transformer_azure
+from src.config import CONNECTION_STRING, CONTAINER_NAME
 
 from datetime import datetime, timedelta
 import pandas as pd
@@ -7,73 +9,43 @@ import streamlit as st
 
 
 
-weather_columns_for_zscores = ['Temperature (°C)', 'Relative Humidity (%)', 'Wind Speed (km/h)']
-window_size_for_zscores = 5
-
-def join_inference_data(weather_data_inference, visitor_centers_data):
-
-    """Merge weather data with visitor centers data.
-
-    Args:
-        weather_data_inference (pd.DataFrame): DataFrame containing weather data.
-        visitor_centers_data (pd.DataFrame): DataFrame containing visitor centers data.
-
-    Returns:
-        pd.DataFrame: Merged DataFrame with selected columns from visitor centers data.
-    """
-
-    # Define the columns you want to bring from visitor_centers_data
-    columns_to_add = ['Time','Tag', 'Hour', 'Monat','Wochentag',  'Wochenende',  'Jahreszeit',  'Laubfärbung',
-                    'Schulferien_Bayern', 'Schulferien_CZ','Feiertag_Bayern',  'Feiertag_CZ',
-                    'HEH_geoeffnet',  'HZW_geoeffnet',  'WGM_geoeffnet', 'Lusenschutzhaus_geoeffnet',  'Racheldiensthuette_geoeffnet', 'Falkensteinschutzhaus_geoeffnet', 'Schwellhaeusl_geoeffnet']  
-
-    # Perform the merge, keep the min and max values of the visitor center data
-    merged_data = visitor_centers_data[columns_to_add].merge(weather_data_inference, on='Time', how='left')
-    
-    return merged_data
-
 @st.cache_data(max_entries=1)
-def source_preprocess_inference_data(weather_data_inference, hourly_visitor_center_data, start_time, end_time):
+def source_preprocess_inference_data(weather_data_inference, start_time, end_time, folder_prefix):
 
-    """Source and preprocess inference data from weather and visitor center sources.
+    """Source and preprocess inference data from the feature store.
 
-    This function fetches weather and visitor center data, merges them, and computes additional features
-    such as nearest holiday distance, daily max values, and moving z-scores.
+    This function computes the weather features (moving z-scores, ...) of the latest weather data in memory and
+    reads the calendar features (nearest holiday distance, ...) for the inference period from the feature store.
+    The feature store is only read here, it is written by the training pipeline. The features are transformed with
+    the feature transformer saved in `folder_prefix`, the folder of the training run whose models make the predictions.
 
     Returns:
         pd.DataFrame: DataFrame containing preprocessed inference data.
     """
     print(f"Sourcing and preprocessing inference data at {datetime.now()}...")    
 
-    join_df = join_inference_data(weather_data_inference, hourly_visitor_center_data)
-
-
-    # Get z scores for the weather columns
-    inference_data_with_distances = add_nearest_holiday_distance(join_df)
-
+    # Compute the weather features of the latest weather data, which includes the days before the inference period
+    weather_features = compute_weather_features(weather_data_inference)
 
-    inference_data_with_daily_max = add_daily_max_values(inference_data_with_distances, weather_columns_for_zscores)
+    # Read the calendar features for the inference period and join the weather features
+    inference_data_with_new_features = read_feature_store(start_time, end_time, weather_features)
 
-    inference_data_with_new_features = add_moving_z_scores(inference_data_with_daily_max, 
-                                                           weather_columns_for_zscores, 
-                                                           window_size_for_zscores)
+    # Load the feature transformer fitted on the training data of the models
+    feature_transformer = load_feature_transformer_azure(
+        connection_string=CONNECTION_STRING,
+        container_name=CONTAINER_NAME,
+        folder_prefix=folder_prefix
+    )
 
+    if feature_transformer is None:
+        # Models trained before the transformer was saved: fit the statistics on the inference data instead
+        print(f"Warning: no feature transformer found under {folder_prefix}, fitting the feature transformations on the inference data")
+        feature_transformer = FeatureTransformer().fit(inference_data_with_new_features)
 
-    
-    # Apply the cyclic and categorical trasformations from the training dataset (same as the training dataset)
-    inference_data_with_coco_encoding = process_transformations(inference_data_with_new_features)
-
-    # Slice the data to keep only rows within the next 10 days
-    inference_data_with_coco_encoding = inference_data_with_coco_encoding[
-        (inference_data_with_coco_encoding["Time"] >= start_time) & 
-        (inference_data_with_coco_encoding["Time"] < end_time)
-
-        ]
-    
     #set Time column as index   
-    inference_data_with_coco_encoding = inference_data_with_coco_encoding.set_index('Time')
-    #drop column named Date
-    inference_data_with_coco_encoding = inference_data_with_coco_encoding.drop(columns=['Date'])
+    inference_data_with_new_features = inference_data_with_new_features.set_index('Time')
+
+    # Apply the cyclic, standardization and categorical transformations fitted on the training dataset
+    inference_data_with_coco_encoding = feature_transformer.transform(inference_data_with_new_features)
 
-    
-    return inference_data_with_coco_encoding
\ No newline at end of file
+    return inference_data_with_coco_encoding
@@ -5,18 +5,15 @@ from datetime import datetime
 
 # imports for inference dataframe
 from src.prediction_pipeline.modeling.preprocess_inference_features import source_preprocess_inference_data
-from src.prediction_pipeline.modeling.create_inference_dfs import visitor_predictions
+from src.prediction_pipeline.modeling.create_inference_dfs import visitor_predictions, get_latest_run_folder_prefix
 from src.prediction_pipeline.sourcing_data.source_weather import source_weather_data
 
 
 @st.fragment(run_every="3h")
-def run_inference(preprocessed_hourly_visitor_center_data):
+def run_inference():
 
     """
-    Run the inference pipeline. Fetches the latest weather forecasts, preprocesses data, and makes predictions.
-
-    Args:
-        preprocessed_hourly_visitor_center_data (pd.DataFrame): The preprocessed hourly visitor center data.
+    Run the inference pipeline. Fetches the latest weather forecasts, reads the features from the feature store, and makes predictions.
 
     Returns:
         None
@@ -47,12 +44,17 @@ def run_inference(preprocessed_hourly_visitor_center_data):
 
     print(f"The overall weather_data_inference is: {weather_data_inference}")
 
+    # the feature transformer and the models of the latest training run are used together
+    run_folder_prefix = get_latest_run_folder_prefix()
+
     # preprocess the inference data
-    inference_df = source_preprocess_inference_data(weather_data_inference, preprocessed_hourly_visitor_center_data, start_time=today, end_time=end_inference_time)
+    inference_df = source_preprocess_inference_data(
+        weather_data_inference, start_time=today, end_time=end_inference_time, folder_prefix=run_folder_prefix
+    )
 
     print(f"The overall inference_df is: {inference_df}")
 
     # make predictions
-    overall_visitor_predictions = visitor_predictions(inference_df) 
+    overall_visitor_predictions = visitor_predictions(inference_df, folder_prefix=run_folder_prefix) 
 
     return overall_visitor_predictions
\ No newline at end of file
@@ -0,0 +1,250 @@
+"""
+Training pipeline as a DAG of stages: sourcing and preprocessing the visitor counts, the visitor center data and the
+weather data (which run concurrently), materializing the features in the feature store, joining them with the visitor
+counts, selecting the features and training the models.
+
+The data windows are parameters: the latest `held_out_months` before the end date are held out for evaluation, and
+the models are trained in one of three modes:
+- 'full': fit from scratch on all data since the start date,
+- 'rolling': fit from scratch on the `rolling_window_months` before the held-out data,
+- 'warm_start': take a previous run from the registry (by default the latest) and add trees fitted on the data that
+  arrived since that run to its models, reusing its feature transformer.
+
+The preprocessing, feature and training stages are cached under a content hash of their code, parameters and inputs,
+so a rerun only repeats the stages downstream of what changed (see `src.prediction_pipeline.pipeline_runner`).
+
+Usage:
+    python -m src.prediction_pipeline.modeling.run_training [--mode full|rolling|warm_start] [--start 2023-01-01]
+        [--end 2024-07-21] [--held-out-months 1] [--rolling-window-months 12] [--previous-run-id RUN_ID]
+        [--force] [--max-workers 3] [--cache-dir .pipeline_cache]
+"""
+
+import argparse
+
+import pandas as pd
+from datetime import datetime
+
+from src.prediction_pipeline.pipeline_runner import Stage, PipelineRunner
+from src.prediction_pipeline.sourcing_data.source_historic_visitor_count import source_historic_visitor_count
+from src.prediction_pipeline.pre_processing.preprocess_historic_visitor_count_data import preprocess_visitor_count_data
+from src.prediction_pipeline.sourcing_data.source_visitor_center_data import source_visitor_center_data
+from src.prediction_pipeline.pre_processing.preprocess_visitor_center_data import process_visitor_center_data
+from src.prediction_pipeline.sourcing_data.source_weather import source_weather_data
+from src.prediction_pipeline.pre_processing.preprocess_weather_data import process_weather_data
+from src.prediction_pipeline.pre_processing.feature_store import write_calendar_features, write_weather_features, get_training_data
+from src.prediction_pipeline.modeling.source_and_feature_selection import get_features, feature_transformer_file_name
+from src.prediction_pipeline.modeling.train_regressor import train_regressor, load_run_info_from_azure, load_joblib_from_azure, save_path_models
+
+
+###########################################################################################
+# GLOBAL VARIABLES
+###########################################################################################
+
+# Default data windows: the data from train_start_date up to and including train_end_date, of which the latest
+# held_out_months are held out for evaluation
+train_start_date = datetime(2023, 1, 1)
+train_end_date = datetime(2024, 7, 21)
+held_out_months = 1
+
+# Length of the training window in the 'rolling' mode
+rolling_window_months = 12
+
+training_modes = ['full', 'rolling', 'warm_start']
+
+# Local folder with the cached stage outputs
+pipeline_cache_dir = ".pipeline_cache"
+
+
+###########################################################################################
+# Functions
+###########################################################################################
+
+def process_visitor_center_data_hourly(sourced_df: pd.DataFrame) -> pd.DataFrame:
+    """Preprocess the visitor center data and return the hourly data only."""
+    hourly_df, _ = process_visitor_center_data(sourced_df)
+    return hourly_df
+
+def get_training_windows(
+    mode: str = 'full',
+    start_time: datetime = train_start_date,
+    end_time: datetime = train_end_date,
+    held_out_months: int = held_out_months,
+    rolling_window_months: int = rolling_window_months,
+    previous_run_info: dict = None,
+) -> dict:
+    """
+    Get the data windows of a training run. All window ends are exclusive.
+
+    Args:
+        mode (str, optional): 'full', 'rolling' or 'warm_start'. Defaults to 'full'.
+        start_time (datetime, optional): Start of the data in the 'full' mode. Defaults to train_start_date.
+        end_time (datetime, optional): Last day of the data (inclusive). Defaults to train_end_date.
+        held_out_months (int, optional): Number of latest months held out for evaluation. Defaults to held_out_months.
+        rolling_window_months (int, optional): Length of the training window in the 'rolling' mode.
+            Defaults to rolling_window_months.
+        previous_run_info (dict, optional): The registry entry of the run that is warm-started. Required in the
+            'warm_start' mode, whose training window starts where the data of that run ended.
+
+    Returns:
+        dict: The 'train_start', 'test_start' and 'test_end' of the run.
+
+    Raises:
+        ValueError: If the mode is unknown, the 'warm_start' mode has no previous run, or the training window is empty
+            (e.g. a warm start whose previous run has already seen the test window).
+    """
+    if mode not in training_modes:
+        raise ValueError(f"Unknown training mode: {mode}. Must be one of {training_modes}.")
+
+    test_end = pd.Timestamp(end_time).normalize() + pd.Timedelta(days=1)
+    test_start = test_end - pd.DateOffset(months=held_out_months)
+
+    if mode == 'full':
+        train_start = pd.Timestamp(start_time)
+    elif mode == 'rolling':
+        train_start = test_start - pd.DateOffset(months=rolling_window_months)
+    else:
+        if previous_run_info is None:
+            raise ValueError("The 'warm_start' mode needs the registry entry of a previous run.")
+        train_start = pd.Timestamp(previous_run_info['fitted_until'])
+
+    # An empty training window would evaluate the models on data they have already been fitted on
+    if train_start >= test_start:
+        raise ValueError(
+            f"The training window is empty: it starts at {train_start}, at or after the test window starting at "
+            f"{test_start}. Choose a later end date or fewer held-out months."
+        )
+
+    return {'train_start': train_start, 'test_start': test_start, 'test_end': test_end}
+
+def get_training_data_for_period(visitor_count_data, calendar_features, weather_features, start_time, end_time) -> pd.DataFrame:
+    """
+    Join the features of the period start_time <= Time < end_time with the visitor counts. The features are read from
+    the feature store, the calendar and weather features are inputs so that the join runs after they are written. As
+    the store can change outside of the pipeline, this stage is not cached.
+    """
+    return get_training_data(visitor_count_data, start_time, end_time)
+
+def select_features(training_data: pd.DataFrame, start_time, end_time, previous_run_id: str = None) -> tuple:
+    """Select the features for training. When warm-starting, the feature transformer of the previous run is reused."""
+    feature_transformer = None
+    if previous_run_id is not None:
+        feature_transformer = load_joblib_from_azure(f"{save_path_models}/{previous_run_id}/{feature_transformer_file_name}")
+
+    return get_features(training_data, start_time, end_time, feature_transformer=feature_transformer)
+
+def train_models(features, train_start, test_start, test_end, previous_run_id: str = None) -> str:
+    """Train the models on the selected features and save them together with the feature transformer."""
+    feature_df, feature_transformer = features
+    return train_regressor(feature_df, feature_transformer, train_start, test_start, test_end, previous_run_id=previous_run_id)
+
+def get_training_stages(windows: dict, previous_run_id: str = None) -> list:
+    """
+    Define the stages of the training pipeline.
+
+    Args:
+        windows (dict): The 'train_start', 'test_start' and 'test_end' of the run (see `get_training_windows`).
+        previous_run_id (str, optional): The training run that is warm-started. Defaults to None.
+
+    Returns:
+        list: The stages of the training pipeline.
+    """
+    start_time, end_time = windows['train_start'], windows['test_end']
+
+    return [
+        # Sourcing reads the latest data from the cloud, so it always runs
+        Stage("source_visitor_counts", source_historic_visitor_count, cache=False),
+        Stage("source_visitor_centers", source_visitor_center_data, cache=False),
+        Stage("source_weather", source_weather_data, params={"start_time": start_time, "end_time": end_time}, cache=False),
+
+        Stage("preprocess_visitor_counts", preprocess_visitor_count_data, inputs=["source_visitor_counts"]),
+        Stage("process_visitor_centers", process_visitor_center_data_hourly, inputs=["source_visitor_centers"]),
+        Stage("process_weather", process_weather_data, inputs=["source_weather"]),
+
+        Stage("calendar_features", write_calendar_features, inputs=["process_visitor_centers"]),
+        Stage("weather_features", write_weather_features, inputs=["process_weather"]),
+
+        Stage(
+            "training_data",
+            get_training_data_for_period,
+            inputs=["preprocess_visitor_counts", "calendar_features", "weather_features"],
+            params={"start_time": start_time, "end_time": end_time},
+            cache=False,
+        ),
+        Stage(
+            "features",
+            select_features,
+            inputs=["training_data"],
+            params={"start_time": start_time, "end_time": end_time, "previous_run_id": previous_run_id},
+        ),
+        Stage("train", train_models, inputs=["features"], params={**windows, "previous_run_id": previous_run_id}),
+    ]
+
+def run_training(
+    mode: str = 'full',
+    start_time: datetime = train_start_date,
+    end_time: datetime = train_end_date,
+    held_out_months: int = held_out_months,
+    rolling_window_months: int = rolling_window_months,
+    previous_run_id: str = None,
+    force: bool = False,
+    max_workers: int = 3,
+    cache_dir: str = pipeline_cache_dir,
+) -> dict:
+    """
+    Run the training pipeline, skipping the stages whose code, parameters and inputs did not change.
+
+    Args:
+        mode (str, optional): 'full', 'rolling' or 'warm_start'. Defaults to 'full'.
+        start_time (datetime, optional): Start of the data in the 'full' mode. Defaults to train_start_date.
+        end_time (datetime, optional): Last day of the data (inclusive). Defaults to train_end_date.
+        held_out_months (int, optional): Number of latest months held out for evaluation. Defaults to held_out_months.
+        rolling_window_months (int, optional): Length of the training window in the 'rolling' mode.
+            Defaults to rolling_window_months.
+        previous_run_id (str, optional): The run that is warm-started in the 'warm_start' mode. Defaults to the latest
+            run in the registry.
+        force (bool, optional): Run all stages even if a cached output exists. Defaults to False.
+        max_workers (int, optional): The maximum number of stages that run concurrently. Defaults to 3.
+        cache_dir (str, optional): The local folder with the cached stage outputs. Defaults to pipeline_cache_dir.
+
+    Returns:
+        dict: The outputs of the stages by name.
+    """
+    previous_run_info = None
+    if mode == 'warm_start':
+        previous_run_info = load_run_info_from_azure(save_path_models, previous_run_id)
+        previous_run_id = previous_run_info['run_id']
+        print(f"Warm-starting the models of run {previous_run_id}, fitted until {previous_run_info['fitted_until']}")
+    else:
+        previous_run_id = None
+
+    windows = get_training_windows(mode, start_time, end_time, held_out_months, rolling_window_months, previous_run_info)
+    print(f"Training on {windows['train_start']} to {windows['test_start']}, testing on {windows['test_start']} to {windows['test_end']}")
+
+    runner = PipelineRunner(get_training_stages(windows, previous_run_id), cache_dir=cache_dir)
+    return runner.run(force=force, max_workers=max_workers)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the training pipeline.")
+    parser.add_argument("--mode", choices=training_modes, default="full", help="Fit from scratch ('full', 'rolling') or warm-start a previous run.")
+    parser.add_argument("--start", type=pd.Timestamp, default=train_start_date, help="Start of the data in the 'full' mode.")
+    parser.add_argument("--end", type=pd.Timestamp, default=train_end_date, help="Last day of the data (inclusive).")
+    parser.add_argument("--held-out-months", type=int, default=held_out_months, help="Number of latest months held out for evaluation.")
+    parser.add_argument("--rolling-window-months", type=int, default=rolling_window_months, help="Length of the training window in the 'rolling' mode.")
+    parser.add_argument("--previous-run-id", default=None, help="Run to warm-start (defaults to the latest run in the registry).")
+    parser.add_argument("--force", action="store_true", help="Run all stages, ignoring the cached outputs.")
+    parser.add_argument("--max-workers", type=int, default=3, help="Maximum number of stages that run concurrently.")
+    parser.add_argument("--cache-dir", default=pipeline_cache_dir, help="Local folder with the cached stage outputs.")
+    args = parser.parse_args()
+
+    run_training(
+        mode=args.mode,
+        start_time=args.start,
+        end_time=args.end,
+        held_out_months=args.held_out_months,
+        rolling_window_months=args.rolling_window_months,
+        previous_run_id=args.previous_run_id,
+        force=args.force,
+        max_workers=args.max_workers,
+        cache_dir=args.cache_dir,
+    )
@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
 import warnings
+from src.prediction_pipeline.pre_processing.region_aggregation import SensorAggregation
 
 
 warnings.filterwarnings("ignore")
@@ -78,6 +79,13 @@ regionwise_sensor_mapping = {
 }
 
 
+# Sensor-to-region mapping compiled into a sparse incidence matrix for the region totals
+regionwise_aggregation = SensorAggregation({
+    f'{region} {direction}': sensors[direction]
+    for region, sensors in regionwise_sensor_mapping.items()
+    for direction in ['IN', 'OUT']
+})
+
 
 dtype_dict = {
     'datetime64[ns]': [
@@ -85,15 +93,26 @@ dtype_dict = {
     ],
     
     'float64': [
-        'traffic_abs',
         'Temperature (°C)',
         'Relative Humidity (%)',
         'Wind Speed (km/h)',
         'Monat',
+        
+        # Z-Score data
+        'ZScore_Daily_Max_Temperature (°C)',
+        'ZScore_Daily_Max_Relative Humidity (%)',
+        'ZScore_Daily_Max_Wind Speed (km/h)',
+        
+        # Distance to nearest holidays
+        'Distance_to_Nearest_Holiday_Bayern',
+        'Distance_to_Nearest_Holiday_CZ'
+    ],
+    
+    # traffic data, kept as compact hourly counts
+    'float32': [
+        'traffic_abs',
         'sum_IN_abs',
         'sum_OUT_abs',
-        
-        # traffic data
         'Falkenstein-Schwellhäusl IN',
         'Rachel-Spiegelau IN',
         'Nationalparkzentrum Falkenstein IN',
@@ -131,16 +150,7 @@ dtype_dict = {
         'Waldspielgelände IN', 'Waldspielgelände OUT',
         'Wistlberg IN', 'Wistlberg OUT',
         'Bucina IN', 'Bucina OUT',
-        'Trinkwassertalsperre IN', 'Trinkwassertalsperre OUT',
-        
-        # Z-Score data
-        'ZScore_Daily_Max_Temperature (°C)',
-        'ZScore_Daily_Max_Relative Humidity (%)',
-        'ZScore_Daily_Max_Wind Speed (km/h)',
-        
-        # Distance to nearest holidays
-        'Distance_to_Nearest_Holiday_Bayern',
-        'Distance_to_Nearest_Holiday_CZ'
+        'Trinkwassertalsperre IN', 'Trinkwassertalsperre OUT'
     ],
     
     'category': [
@@ -180,6 +190,21 @@ target_vars_et = ['traffic_abs', 'sum_IN_abs', 'sum_OUT_abs', 'Lusen-Mauth-Finst
                'Scheuereck-Schachten-Trinkwassertalsperre IN', 'Scheuereck-Schachten-Trinkwassertalsperre OUT', 
                'Nationalparkzentrum Falkenstein IN', 'Nationalparkzentrum Falkenstein OUT']
 
+# Transformations fitted on the training data and reused at inference
+cyclic_features = ['Tag', 'Hour', 'Monat', 'Wochentag']
+
+standardize_features = ['Temperature (°C)', 'Relative Humidity (%)', 'Wind Speed (km/h)',
+                        'Distance_to_Nearest_Holiday_Bayern', 'Distance_to_Nearest_Holiday_CZ']
+
+# Features that are dummy encoded, with the names of the dummy columns per category (category value if not listed)
+dummy_features = {
+    'coco_2': {1: 'sunny', 2: 'cloudy', 3: 'rainy', 4: 'snowy', 5: 'extreme', 6: 'stormy'},
+    'Jahreszeit': {},
+}
+
+# Name of the fitted feature transformer, saved next to the models of a training run
+feature_transformer_file_name = "feature_transformer.pkl"
+
 coco_mapping = {
     1: [1, 2],       # Clear, Fair
     2: [3, 4, 5],    # Cloudy, Overcast, Fog
@@ -196,6 +221,9 @@ coco_mapping = {
 
 def get_regionwise_IN_and_OUT_columns(df: pd.DataFrame) -> pd.DataFrame:
     """Preprocess the data by summing IN and OUT columns for each region.
+
+    All region totals are computed at once with the sparse sensor-to-region matrix compiled from
+    `regionwise_sensor_mapping`. A region total is NaN if all of its sensors are NaN.
     
     Args:
         df (pd.DataFrame): The DataFrame containing the data to preprocess.
@@ -204,17 +232,7 @@ def get_regionwise_IN_and_OUT_columns(df: pd.DataFrame) -> pd.DataFrame:
         pd.DataFrame: The preprocessed DataFrame.
     """
 
-    # Iterate over the regionwise sensor mapping
-    for region, sensors in regionwise_sensor_mapping.items():
-        # Sum the values for all IN columns of the current region
-        if sensors['IN']:
-            df[f'{region} IN'] = df[sensors['IN']].sum(axis=1, min_count=1)
-
-        # Sum the values for all OUT columns of the current region
-        if sensors['OUT']:
-            df[f'{region} OUT'] = df[sensors['OUT']].sum(axis=1, min_count=1)
-
-    return df
+    return regionwise_aggregation.aggregate(df, min_count=1)
 
 
 
@@ -261,100 +279,6 @@ def change_datatypes(df: pd.DataFrame, dtype_dict: dict) -> pd.DataFrame:
     df = df.set_index('Time')
     return df
 
-def apply_cliclic_tranformations(df: pd.DataFrame,cyclic_features: list) -> pd.DataFrame:
-
-    # Convert categorical features to numeric if they are not already
-    for feature in cyclic_features:
-        if feature in df.columns:
-            if pd.api.types.is_categorical_dtype(df[feature]):
-                df[feature] = df[feature].cat.codes  # Convert categorical to numeric codes
-            
-            max_value = df[feature].max()  # Get max value for scaling
-            
-            # Apply sine and cosine transformations
-            df[f'{feature}_sin'] = np.sin(2 * np.pi * df[feature] / max_value)
-            df[f'{feature}_cos'] = np.cos(2 * np.pi * df[feature] / max_value)
-        else:
-            print(f"Warning: Feature '{feature}' not found in DataFrame")
-    # Drop the original columns
-    columns_to_drop = ['Tag', 'Monat', 'Wochentag', 'Hour']
-    df = df.drop(columns=columns_to_drop)
-
-    return df
-
-def standardize_numeric_features(df: pd.DataFrame, standardize_features: list) -> pd.DataFrame: 
-
-    # Loop through each numeric feature and apply z-score normalization
-    for feature in standardize_features:
-        if feature in df.columns:
-            mean_value = df[feature].mean()  # Calculate mean
-            std_value = df[feature].std()    # Calculate standard deviation
-            
-            # Apply z-score normalization
-            df[feature] = (df[feature] - mean_value) / std_value
-        else:
-            print(f"Warning: Feature '{feature}' not found in DataFrame")
-
-    return df
-
-
-
-       
-def get_dummy_encodings(df: pd.DataFrame, columns_to_use: list) -> pd.DataFrame:
-    # Create a copy of the original dataframe
-    df_copy = df.copy()
-
-    ################ Get dummy encodings for the coco_2 column ####################
-    
-    # Dummy encode the column *coco_2*
-    dummies = pd.get_dummies(df[columns_to_use[1]], drop_first=False)
-
-    # check if the dummy columns are created  and if not fill the column with False
-    for col in [1.0, 2.0, 3.0, 4.0, 5.0, 6.0]:
-        if col not in dummies.columns:
-            dummies[col] = False
-
-    # Rename the dummy columns to more meaningful names
-    dummies = dummies.rename(columns={1.0: 'sunny',
-                                      2.0: 'cloudy', 
-                                      3.0: 'rainy', 
-                                      4.0: 'snowy', 
-                                      5.0: 'extreme', 
-                                      6.0: 'stormy'})
-    df_copy = pd.concat([df_copy, dummies], axis=1)
-
-    # 
-
-    ################### dummy encodings for the Jahreszeit column ####################
-    # Dummy encode the columns *Jahreszeit*
-    season_dummies = pd.get_dummies(df[columns_to_use[0]], drop_first=False)
-    
-    for col in ['Frühling', 'Sommer', 'Herbst', 'Winter']:
-        if col not in season_dummies.columns:
-            dummies[col] = False
-    
-    df_copy = pd.concat([df_copy, season_dummies], axis=1)
-
-    # remove the original columns
-    df_copy = df_copy.drop(columns=columns_to_use)
-    
-    # Return the dataframe with original and new dummy-encoded columns
-    return df_copy
-
-def handle_binary_values(df: pd.DataFrame) -> pd.DataFrame:
-
-    boolean_columns = df.select_dtypes(include=['bool']).columns  # Select boolean columns
-    df[boolean_columns] = df[boolean_columns].astype(int)  # Convert to int
-
-    # convert the columns with True and False to 1 and 0 and convert the int64 datatype to category
-    df = df.replace({True: 1, False: 0})
-    # convert the int64 datatype to category
-    boolean_columns = df.select_dtypes(include=['int64']).columns
-    # Convert these columns to categorical
-    df[boolean_columns] = df[boolean_columns].astype('category')
-
-    return df
-
 def remove_merge_from_columns(df: pd.DataFrame) -> pd.DataFrame:
 
     # remove the MERGED from the column names and remove the extra gap
@@ -364,26 +288,156 @@ def remove_merge_from_columns(df: pd.DataFrame) -> pd.DataFrame:
     
     return df
 
-def process_transformations(df: pd.DataFrame) -> pd.DataFrame:
-    """Process the transformations on the DataFrame."""
-    df = apply_cliclic_tranformations(df, cyclic_features = ['Tag','Hour', 'Monat', 'Wochentag'])
-    df = standardize_numeric_features(df, standardize_features = ['Temperature (°C)', 'Relative Humidity (%)', 'Wind Speed (km/h)',
-                                                                  'Distance_to_Nearest_Holiday_Bayern','Distance_to_Nearest_Holiday_CZ'])
-    df = get_dummy_encodings(df, columns_to_use = ['Jahreszeit', 'coco_2'])
-    df = handle_binary_values(df)
-    
-    return df
+class FeatureTransformer:
+    """Fit/transform pipeline for the model features.
 
-def filter_features_for_modelling(df: pd.DataFrame) -> pd.DataFrame:
-    """Filter the features for modelling."""
-    # Filter the features for modelling
-    df = df[numeric_features_for_modelling + categorical_features_for_modelling + target_vars_et]
+    All statistics the transformations depend on are fitted once on the training data and then reused
+    unchanged at inference, so a 17-day inference window is encoded exactly like the training period:
+    - the maximum value used for the cyclic sine/cosine encodings,
+    - the mean and standard deviation used for standardizing numeric features,
+    - the category vocabularies of the dummy encoded features ('coco_2', 'Jahreszeit'),
+    - the order of the output feature columns.
 
-    return df
+    The fitted transformer is saved next to the models of a training run and loaded at inference.
+    """
 
+    def __init__(self,
+                 numeric_features: list = numeric_features_for_modelling,
+                 categorical_features: list = categorical_features_for_modelling,
+                 cyclic_features: list = cyclic_features,
+                 standardize_features: list = standardize_features,
+                 dummy_features: dict = dummy_features):
+        self.numeric_features = list(numeric_features)
+        self.categorical_features = list(categorical_features)
+        self.cyclic_features = list(cyclic_features)
+        self.standardize_features = list(standardize_features)
+        self.dummy_features = dict(dummy_features)
+
+    def _encode_cyclic(self, df: pd.DataFrame, feature: str) -> np.ndarray:
+        """Return the numeric values of a cyclic feature, using the fitted codes for categorical features."""
+        categories = self.cyclic_categories_.get(feature)
+        if categories is not None:
+            return pd.Categorical(df[feature], categories=categories).codes.astype('float64')
+        return df[feature].astype('float64').to_numpy()
+
+    def fit(self, df: pd.DataFrame) -> "FeatureTransformer":
+        """Fit the transformation statistics on the (training) DataFrame.
+
+        Args:
+            df (pd.DataFrame): The DataFrame with the raw features.
+
+        Returns:
+            FeatureTransformer: The fitted transformer.
+        """
+        # Categories of categorical cyclic features (e.g. 'Wochentag') so that codes stay the same
+        self.cyclic_categories_ = {
+            feature: list(df[feature].cat.categories)
+            for feature in self.cyclic_features
+            if feature in df.columns and isinstance(df[feature].dtype, pd.CategoricalDtype)
+        }
+
+        # Max value of every cyclic feature for scaling
+        self.cyclic_max_ = {}
+        for feature in self.cyclic_features:
+            if feature in df.columns:
+                self.cyclic_max_[feature] = np.nanmax(self._encode_cyclic(df, feature))
+            else:
+                print(f"Warning: Feature '{feature}' not found in DataFrame")
+
+        # Mean and standard deviation for z-score normalization
+        self.standardize_stats_ = {}
+        for feature in self.standardize_features:
+            if feature in df.columns:
+                self.standardize_stats_[feature] = (df[feature].mean(), df[feature].std())
+            else:
+                print(f"Warning: Feature '{feature}' not found in DataFrame")
+
+        # Category vocabularies of the dummy encoded features
+        self.dummy_categories_ = {
+            feature: sorted(df[feature].dropna().unique().tolist())
+            for feature in self.dummy_features
+        }
+
+        # Order of the output columns
+        self.feature_columns_ = self.numeric_features + self.categorical_features
+
+        return self
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Apply the fitted transformations and return the model features in the fitted column order.
+
+        Numeric features are returned as float64, binary and dummy features as categories with values 0 and 1.
+        Features that cannot be derived from the DataFrame (e.g. a weather category that was never observed) are
+        filled with 0.
+
+        Args:
+            df (pd.DataFrame): The DataFrame with the raw features.
+
+        Returns:
+            pd.DataFrame: The transformed features with the same index as `df`.
+        """
+        transformed = {}
+
+        # Cyclic sine and cosine encodings
+        for feature, max_value in self.cyclic_max_.items():
+            values = self._encode_cyclic(df, feature)
+            transformed[f'{feature}_sin'] = np.sin(2 * np.pi * values / max_value)
+            transformed[f'{feature}_cos'] = np.cos(2 * np.pi * values / max_value)
+
+        # Z-score normalization
+        for feature, (mean_value, std_value) in self.standardize_stats_.items():
+            transformed[feature] = (df[feature].to_numpy(dtype='float64') - mean_value) / std_value
+
+        # Dummy encodings over the fitted vocabularies
+        for feature, categories in self.dummy_categories_.items():
+            values = np.asarray(df[feature])
+            column_names = self.dummy_features[feature]
+            for category in categories:
+                transformed[column_names.get(category, category)] = values == category
+
+        # Assemble all features in the fitted order
+        features = {}
+        for column in self.feature_columns_:
+            if column in transformed:
+                values = transformed[column]
+            elif column in df.columns:
+                values = df[column]
+            else:
+                values = np.zeros(len(df))
+
+            if column in self.numeric_features:
+                features[column] = np.asarray(values, dtype='float64')
+            else:
+                features[column] = _to_binary_category(values)
+
+        return pd.DataFrame(features, index=df.index)
+
+    def fit_transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Fit the transformer on the DataFrame and transform it."""
+        return self.fit(df).transform(df)
+
+
+def _to_binary_category(values) -> pd.Categorical:
+    """Convert boolean or 0/1 values to a categorical with the categories 0 and 1, keeping missing values."""
+    values = pd.Series(values).astype('float64').to_numpy()
+    codes = np.where(np.isnan(values), -1, values > 0).astype(np.int8)
+    return pd.Categorical.from_codes(codes, categories=[0, 1])
+
+
+def get_features(with_zscores_and_nearest_holidays_df, train_start_date, train_end_date, feature_transformer=None):
+    """Get the features and targets for training and fit the feature transformer on the training period.
 
+    Args:
+        with_zscores_and_nearest_holidays_df (pd.DataFrame): The joined DataFrame with z-score and holiday features.
+        train_start_date (datetime): Start of the training period.
+        train_end_date (datetime): End of the training period.
+        feature_transformer (FeatureTransformer, optional): An already fitted transformer (e.g. of the training run
+            that is warm-started), which is applied without refitting. Defaults to None (fit a new one).
 
-def get_features(with_zscores_and_nearest_holidays_df, train_start_date, train_end_date):
+    Returns:
+        tuple: The DataFrame with the features and targets for modelling, and the fitted FeatureTransformer
+               that has to be applied to the inference data.
+    """
     
     # Filter only for certain dates
     sliced_df = with_zscores_and_nearest_holidays_df[(with_zscores_and_nearest_holidays_df['Time'] >= train_start_date) & (with_zscores_and_nearest_holidays_df['Time'] <= train_end_date)]
@@ -392,12 +446,15 @@ def get_features(with_zscores_and_nearest_holidays_df, train_start_date, train_e
     removed_merged_df = remove_merge_from_columns(sliced_df)
     regionwise_df = get_regionwise_IN_and_OUT_columns(removed_merged_df)
     changed_datatypes_df = change_datatypes(regionwise_df, dtype_dict)
-    processed_features_df = process_transformations(changed_datatypes_df)
-
-    # Filter only for the features for modelling
-    filtered_features_df = filter_features_for_modelling(processed_features_df)
-
-    return filtered_features_df
 
+    # Fit the feature transformations once on the training data, or reuse the given ones so new trees see the same encoding
+    if feature_transformer is None:
+        feature_transformer = FeatureTransformer()
+        processed_features_df = feature_transformer.fit_transform(changed_datatypes_df)
+    else:
+        processed_features_df = feature_transformer.transform(changed_datatypes_df)
 
+    # Add the targets for modelling
+    filtered_features_df = pd.concat([processed_features_df, changed_datatypes_df[target_vars_et]], axis=1)
 
+    return filtered_features_df, feature_transformer
@@ -1,19 +1,37 @@
+import numpy as np
 import pandas as pd
-from src.prediction_pipeline.modeling.source_and_feature_selection import get_features
+from src.prediction_pipeline.modeling.source_and_feature_selection import get_features, feature_transformer_file_name
 from pycaret import *
 from pycaret.time_series import *
 from pycaret.regression import *
 import os
+import io
+import json
+import time
 import uuid
+import joblib
+import resource
+import tempfile
+import multiprocessing
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 from src.config import CONNECTION_STRING, CONTAINER_NAME
 from src.utils import upload_dataframe_to_azure
-from azure.storage.blob import BlobClient
+from azure.storage.blob import BlobClient, ContainerClient
 
 
 save_path_models = 'models/models_trained'
 save_path_predictions = 'models/test_data_predictions'
 local_path = os.path.join('outputs','models_trained')
 
+# Number of targets trained in parallel, each in its own process (defaults to one per target, limited by the CPUs)
+n_training_workers = None
+
+# Registry entry saved with the models of every training run (training mode, data windows and test metrics)
+run_info_file_name = 'run_info.json'
+
+# Number of trees added per target when warm-starting from a previous run
+n_new_trees = 50
+
 # Define target columns
 target_vars_et  = ['traffic_abs', 'sum_IN_abs', 'sum_OUT_abs', 'Lusen-Mauth-Finsterau IN', 'Lusen-Mauth-Finsterau OUT', 
                'Nationalparkzentrum Lusen IN', 'Nationalparkzentrum Lusen OUT', 'Rachel-Spiegelau IN', 'Rachel-Spiegelau OUT', 
@@ -84,66 +102,425 @@ def save_models_to_azure(model, save_path_models: str, model_name: str, local_pa
         
     return
 
-def train_regressor(feature_dataframe: pd.DataFrame) -> None:
+def save_feature_transformer_to_azure(feature_transformer, save_path_models: str, uuid: str) -> None:
+    """Save the fitted feature transformer to Azure Blob Storage next to the models of the training run.
+
+    Args:
+        feature_transformer (FeatureTransformer): The feature transformer fitted on the training data.
+        save_path_models (str): The path where the models should be saved.
+        uuid (str): The unique identifier string of the training run.
+
+    Returns:
+        None
+    """
+
+    blob_name = f"{save_path_models}/{uuid}/{feature_transformer_file_name}"
+
+    # Serialize the transformer in memory
+    buffer = io.BytesIO()
+    joblib.dump(feature_transformer, buffer)
+    buffer.seek(0)
+
+    try:
+        blob_client = BlobClient.from_connection_string(
+            conn_str=CONNECTION_STRING, 
+            container_name=CONTAINER_NAME, 
+            blob_name=blob_name
+        )
+        blob_client.upload_blob(buffer, overwrite=True)
+
+        print(f"Successfully saved feature transformer to Azure Blob Storage at: {CONTAINER_NAME}/{blob_name}")
+
+    except Exception as e:
+        print(f"Error saving feature transformer to Azure Blob Storage: {e}")
+
+    return
+
+def save_run_info_to_azure(run_info: dict, save_path_models: str, uuid: str) -> None:
+    """Save the registry entry of a training run next to its models.
+
+    Args:
+        run_info (dict): The mode, data windows and test metrics of the training run.
+        save_path_models (str): The path where the models are saved.
+        uuid (str): The unique identifier string of the training run.
+
+    Returns:
+        None
+    """
+
+    blob_name = f"{save_path_models}/{uuid}/{run_info_file_name}"
+
+    blob_client = BlobClient.from_connection_string(
+        conn_str=CONNECTION_STRING,
+        container_name=CONTAINER_NAME,
+        blob_name=blob_name
+    )
+    blob_client.upload_blob(json.dumps(run_info, indent=2, default=str), overwrite=True)
+
+    print(f"Successfully saved the run info to Azure Blob Storage at: {CONTAINER_NAME}/{blob_name}")
+
+    return
+
+def load_run_info_from_azure(save_path_models: str, uuid: str = None) -> dict:
+    """Load the registry entry of a training run, by default of the latest run that saved one.
+
+    Args:
+        save_path_models (str): The path where the models are saved.
+        uuid (str, optional): The unique identifier string of the training run. Defaults to the latest run.
+
+    Returns:
+        dict: The registry entry of the training run.
+
+    Raises:
+        ValueError: If no training run with a registry entry is found.
+    """
+
+    if uuid is None:
+        container_client = ContainerClient.from_connection_string(
+            conn_str=CONNECTION_STRING,
+            container_name=CONTAINER_NAME
+        )
+        run_info_blobs = [
+            blob for blob in container_client.list_blobs(name_starts_with=f"{save_path_models}/")
+            if blob.name.endswith(f"/{run_info_file_name}")
+        ]
+        if not run_info_blobs:
+            raise ValueError(f"No training run with a {run_info_file_name} found under {save_path_models}")
+        blob_name = max(run_info_blobs, key=lambda blob: blob.last_modified).name
+    else:
+        blob_name = f"{save_path_models}/{uuid}/{run_info_file_name}"
+
+    blob_client = BlobClient.from_connection_string(
+        conn_str=CONNECTION_STRING,
+        container_name=CONTAINER_NAME,
+        blob_name=blob_name
+    )
+    if not blob_client.exists():
+        raise ValueError(f"No {run_info_file_name} found for the training run {uuid}")
+
+    return json.loads(blob_client.download_blob().readall())
+
+def load_joblib_from_azure(blob_name: str):
+    """Load an object saved with joblib (e.g. a model or the feature transformer) from Azure Blob Storage.
+
+    Args:
+        blob_name (str): The full name of the blob.
+
+    Returns:
+        The loaded object.
+    """
+
+    blob_client = BlobClient.from_connection_string(
+        conn_str=CONNECTION_STRING,
+        container_name=CONTAINER_NAME,
+        blob_name=blob_name
+    )
+
+    return joblib.load(io.BytesIO(blob_client.download_blob().readall()))
+
+def get_test_metrics(predictions: pd.DataFrame, target: str) -> dict:
+    """Compute the error metrics of the predictions on the held-out data.
+
+    Args:
+        predictions (pd.DataFrame): The held-out data with the target and the 'prediction_label' column.
+        target (str): The target column.
+
+    Returns:
+        dict: The MAE, RMSE and R2 of the predictions.
+    """
+    return {
+        'MAE': float(mean_absolute_error(predictions[target], predictions['prediction_label'])),
+        'RMSE': float(mean_squared_error(predictions[target], predictions['prediction_label']) ** 0.5),
+        'R2': float(r2_score(predictions[target], predictions['prediction_label'])),
+    }
+
+def slice_window(feature_columns: dict, target: str, start, end) -> pd.DataFrame:
+    """Return the features and target of the rows with start <= Time < end as a DataFrame.
+
+    The rows are located by a binary search on the sorted times and sliced by position, and the DataFrame is built
+    from the sliced column arrays without copying them, so memory-mapped columns stay shared between the workers.
+    Categorical columns are restored from their codes and categories, which copies only their small code arrays.
+
+    Args:
+        feature_columns (dict): The column arrays dumped by `train_regressor`, with the sorted times under 'Time' and
+            the dtypes of the categorical columns under 'categories'.
+        target (str): The target column.
+        start (datetime): Start of the window (inclusive).
+        end (datetime): End of the window (exclusive).
+
+    Returns:
+        pd.DataFrame: The features and the target of the window with a DatetimeIndex.
+    """
+    times = feature_columns['Time']
+    first, last = np.searchsorted(times, [np.datetime64(pd.Timestamp(start)), np.datetime64(pd.Timestamp(end))])
+
+    columns = {column: feature_columns[column][first:last] for column in numeric_features + categorical_features + [target]}
+    for column, dtype in feature_columns['categories'].items():
+        if column in columns:
+            columns[column] = pd.Categorical.from_codes(columns[column], dtype=dtype)
+
+    return pd.DataFrame(columns, index=pd.DatetimeIndex(times[first:last], name='Time'), copy=False)
+
+def save_predictions_to_azure(predictions: pd.DataFrame, target: str, uuid: str) -> None:
+    """Save the predictions on the held-out data of one target to the cloud."""
+    file_name = f"y_test_predicted_{target}.parquet"
+    upload_dataframe_to_azure(
+        df=predictions,
+        file_name=file_name,
+        target_folder=f"{save_path_predictions}/{uuid}",
+        file_format="parquet",
+        write_options={"index": True}
+    )
+    print(f"Predictions with {target} saved to the cloud.")
+
+def train_target(target: str, feature_path: str, uuid: str, n_jobs: int, windows: dict, previous_run_id: str = None) -> tuple:
+    """Train, evaluate and save the Extra Trees Regressor of one target. Runs in a worker process of `train_regressor`.
+
+    Without a previous run, the model is fitted from scratch on the training window with PyCaret, evaluated on the
+    test window and finalized on both windows. With a previous run, its model is warm-started: `n_new_trees` trees
+    fitted on the training window (the data that arrived since the previous run) are added to the existing forest
+    before it is evaluated on the test window.
+
+    Args:
+        target (str): The target column.
+        feature_path (str): The path of the feature column arrays dumped with joblib, which are memory-mapped read-only.
+        uuid (str): The unique identifier string of the training run.
+        n_jobs (int): The number of CPUs used by PyCaret for this target.
+        windows (dict): The 'train_start', 'test_start' and 'test_end' of the data windows (ends are exclusive).
+        previous_run_id (str, optional): The training run to warm-start from. Defaults to None (fit from scratch).
+
+    Returns:
+        tuple: The target, the wall time in seconds, the peak memory (max. resident set size) of the worker in MB and
+        the test metrics.
+    """
+    start = time.perf_counter()
+    print(f"Training Extra Trees Regressor for {target}")
+
+    # The feature columns are memory-mapped, so the workers share the pages of one file instead of a pickled copy each
+    feature_columns = joblib.load(feature_path, mmap_mode='r')
+
+    # Split the data into train and test sets based on date ranges, as views of the memory-mapped columns
+    df_train = slice_window(feature_columns, target, windows['train_start'], windows['test_start'])
+    df_test = slice_window(feature_columns, target, windows['test_start'], windows['test_end'])
+
+    if previous_run_id is not None:
+        final_model, predictions = warm_start_model(target, df_train, df_test, previous_run_id, n_jobs)
+    else:
+        final_model, predictions = fit_model(target, df_train, df_test, n_jobs)
+
+    # save the model to the cloud
+    save_models_to_azure(
+        model=final_model,
+        save_path_models=save_path_models,
+        model_name=f"extra_trees_{target}",
+        local_path=local_path,
+        uuid=uuid
+    )
+
+    print(f"Model with {target} saved to the cloud.")
+
+    # save predictions to the cloud
+    save_predictions_to_azure(predictions, target, uuid)
+
+    # ru_maxrss is in KB on Linux, every worker process trains a single target
+    peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    return target, time.perf_counter() - start, peak_memory, get_test_metrics(predictions, target)
+
+def fit_model(target: str, df_train: pd.DataFrame, df_test: pd.DataFrame, n_jobs: int) -> tuple:
+    """Fit the Extra Trees Regressor of one target from scratch with PyCaret.
+
+    Args:
+        target (str): The target column.
+        df_train (pd.DataFrame): The features and target of the training window.
+        df_test (pd.DataFrame): The features and target of the test window.
+        n_jobs (int): The number of CPUs used by PyCaret.
+
+    Returns:
+        tuple: The model finalized on the training and test windows, and the predictions on the test window.
+    """
+
+    # Setup PyCaret for the target variable with the combined data
+    reg_setup = setup(data=df_train,
+                    target=target, 
+                    numeric_features=numeric_features, 
+                    categorical_features=categorical_features,
+                    fold=5,
+                    preprocess=False,
+                    data_split_shuffle=True,
+                    session_id=123,
+                    test_data=df_test,
+                    n_jobs=n_jobs,
+                    verbose=False)
+
+    # Train the Extra Trees Regressor model
+    extra_trees_model = create_model('et')
+
+    # Predict on the unseen data
+    predictions = predict_model(extra_trees_model) # predicts on hold-out data defined above
+
+    # Finalize the model
+    final_model = finalize_model(extra_trees_model)
+
+    return final_model, predictions
+
+def get_final_estimator(model):
+    """Return the estimator of a model saved on its own or as the last step of a pipeline.
+
+    Args:
+        model: The loaded model, an estimator or a pipeline.
+
+    Returns:
+        The estimator, which is the model itself if it is not a pipeline.
+
+    Raises:
+        ValueError: If the estimator cannot be warm-started (it has no `warm_start` and `n_estimators` parameters).
+    """
+    estimator = model.steps[-1][1] if hasattr(model, 'steps') else model
+
+    parameters = estimator.get_params(deep=False)
+    if 'warm_start' not in parameters or 'n_estimators' not in parameters:
+        raise ValueError(f"The model {type(estimator).__name__} cannot be warm-started with additional trees")
+
+    return estimator
+
+def warm_start_model(target: str, df_train: pd.DataFrame, df_test: pd.DataFrame, previous_run_id: str, n_jobs: int) -> tuple:
+    """Add trees fitted on the new data to the Extra Trees Regressor of a previous run.
+
+    Args:
+        target (str): The target column.
+        df_train (pd.DataFrame): The features and target of the data that arrived since the previous run.
+        df_test (pd.DataFrame): The features and target of the test window.
+        previous_run_id (str): The training run whose model is extended.
+        n_jobs (int): The number of CPUs used for fitting and predicting.
+
+    Returns:
+        tuple: The extended model and its predictions on the test window.
+    """
+    model = load_joblib_from_azure(f"{save_path_models}/{previous_run_id}/extra_trees_{target}.pkl")
+    feature_columns = list(model.feature_names_in_)
+    estimator = get_final_estimator(model)
+
+    if len(df_train) > 0:
+        # A model saved as a pipeline fits its estimator on the output of its other steps
+        train_features = df_train[feature_columns]
+        if estimator is not model:
+            train_features = model[:-1].transform(train_features)
+
+        # With warm_start, fit keeps the existing trees and only fits the additional ones on the new data
+        estimator.set_params(warm_start=True, n_estimators=estimator.n_estimators + n_new_trees, n_jobs=n_jobs)
+        estimator.fit(train_features, df_train[target])
+        estimator.set_params(warm_start=False)
+    else:
+        print(f"No new data for {target}, the model of run {previous_run_id} is only evaluated")
+
+    predictions = df_test.copy()
+    predictions['prediction_label'] = model.predict(df_test[feature_columns])
+
+    return model, predictions
+
+def train_regressor(
+    feature_dataframe: pd.DataFrame,
+    feature_transformer,
+    train_start,
+    test_start,
+    test_end,
+    previous_run_id: str = None,
+    n_workers: int = n_training_workers,
+) -> str:
+    """Train and save the Extra Trees Regressors of all targets, in parallel in a pool of worker processes.
+
+    Every target is trained in a fresh worker process (PyCaret keeps the experiment of `setup` in global state). The
+    feature and target columns are dumped once as arrays to a temporary file, which the workers memory-map read-only. The data windows,
+    the test metrics and the previous run (when warm-starting) are saved as the registry entry of the run.
+
+    Args:
+        feature_dataframe (pd.DataFrame): The features and targets with a DatetimeIndex.
+        feature_transformer (FeatureTransformer): The feature transformer the features were transformed with.
+        train_start (datetime): Start of the training window. When warm-starting, the start of the new data.
+        test_start (datetime): Start of the test window (held-out data), which is the end of the training window.
+        test_end (datetime): End of the test window (exclusive).
+        previous_run_id (str, optional): The training run whose models are warm-started with trees fitted on the
+            training window. Defaults to None (fit from scratch).
+        n_workers (int, optional): The number of targets trained in parallel. Defaults to one worker per target,
+            limited by the number of CPUs.
+
+    Returns:
+        str: The unique identifier string of the training run, or None if no models were trained.
+    """
 
     uuid = create_uuid()
     print(f"Training Regressor with Run ID: {uuid}")
 
-    for target in target_vars_et:
-        print(f"Training Extra Trees Regressor for {target}")
-    
-        # Ensure the DataFrame has a date-time index
-        if isinstance(feature_dataframe.index, pd.DatetimeIndex):
-            # Define date ranges for training, testing, and unseen data
-            train_start = '2023-01-01'
-            train_end = '2024-04-30'
-            test_start = '2024-05-01'
-            test_end = '2024-07-21'
-    
-            # Split the data into train, test, and unseen sets based on date ranges
-            df_train = feature_dataframe[numeric_features+categorical_features+[target]].loc[train_start:train_end]
-            df_test = feature_dataframe[numeric_features+categorical_features+[target]].loc[test_start:test_end]
- 
-            # Setup PyCaret for the target variable with the combined data
-            reg_setup = setup(data=df_train,
-                            target=target, 
-                            numeric_features=numeric_features, 
-                            categorical_features=categorical_features,
-                            fold=5,
-                            preprocess=False,
-                            data_split_shuffle=True,
-                            session_id=123,
-                            test_data=df_test)  # Use 90% of data for training 
-                
-            # Train the Extra Trees Regressor model
-            extra_trees_model = create_model('et')
-                
-            # Predict on the unseen data
-            predictions = predict_model(extra_trees_model) # predicts on hold-out data defined above
-
-            # Finalize the model
-            final_model = finalize_model(extra_trees_model)
-            
-            # save the model to the cloud
-            save_models_to_azure(
-                model=final_model,
-                save_path_models=save_path_models,
-                model_name=f"extra_trees_{target}",
-                local_path=local_path,
-                uuid=uuid
-            )
-                
-            print(f"Model with {target} saved to the cloud.")
-            
-            # save predictions to the cloud
-            file_name = f"y_test_predicted_{target}.parquet"
-            upload_dataframe_to_azure(
-                df=predictions,
-                file_name=file_name,
-                target_folder=f"{save_path_predictions}/{uuid}",
-                file_format="parquet",
-                write_options={"index": True}
+    # Ensure the DataFrame has a date-time index
+    if not isinstance(feature_dataframe.index, pd.DatetimeIndex):
+        print("The feature DataFrame has no DatetimeIndex, no models are trained.")
+        return None
+
+    # save the feature transformer the models are trained with, so inference uses the same transformations
+    save_feature_transformer_to_azure(feature_transformer, save_path_models, uuid)
+
+    windows = {
+        'train_start': pd.Timestamp(train_start),
+        'test_start': pd.Timestamp(test_start),
+        'test_end': pd.Timestamp(test_end),
+    }
+
+    n_cpus = os.cpu_count() or 1
+    n_workers = max(1, min(n_workers or n_cpus, len(target_vars_et)))
+    # Split the CPUs between the workers, so that the parallel cross-validations do not oversubscribe them
+    n_jobs = max(1, n_cpus // n_workers)
+    print(f"Training {len(target_vars_et)} targets with {n_workers} worker processes ({n_jobs} CPUs each)")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        feature_path = os.path.join(tmp_dir, "features.joblib")
+        # One array per column sorted by time, so the workers slice the windows of a column without copying it.
+        # Categorical columns are dumped as their integer codes with their dtypes, to be restored in the workers
+        feature_dataframe = feature_dataframe.sort_index()
+        feature_columns, categories = {}, {}
+        for column in numeric_features + categorical_features + target_vars_et:
+            values = feature_dataframe[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                categories[column] = values.dtype
+                values = values.cat.codes
+            feature_columns[column] = values.to_numpy()
+        feature_columns['Time'] = feature_dataframe.index.to_numpy(dtype='datetime64[ns]')
+        feature_columns['categories'] = categories
+        joblib.dump(feature_columns, feature_path)
+        del feature_columns
+
+        # Spawned workers do not inherit locks of running threads, a new process per target frees its memory
+        with multiprocessing.get_context("spawn").Pool(processes=n_workers, maxtasksperchild=1) as pool:
+            results = pool.starmap(
+                train_target,
+                [(target, feature_path, uuid, n_jobs, windows, previous_run_id) for target in target_vars_et],
+                chunksize=1
             )
-            print(f"Predictions with {target} saved to the cloud.")
 
-    return
\ No newline at end of file
+    print("\nTraining time, peak memory and test metrics per target:")
+    for target, elapsed, peak_memory, metrics in results:
+        print(f"  {target:<50} {elapsed:8.1f} s {peak_memory:8.0f} MB   MAE {metrics['MAE']:8.2f}   R2 {metrics['R2']:6.3f}")
+
+    # A finalized model has seen the test window, a warm-started one only the data before it and everything the
+    # previous run has seen, so the registry never moves back in time
+    fitted_until = windows['test_end']
+    if previous_run_id is not None:
+        previous_fitted_until = pd.Timestamp(load_run_info_from_azure(save_path_models, previous_run_id)['fitted_until'])
+        fitted_until = max(windows['test_start'], previous_fitted_until)
+
+    save_run_info_to_azure(
+        run_info={
+            'run_id': uuid,
+            'mode': 'warm_start' if previous_run_id is not None else 'fit',
+            'previous_run_id': previous_run_id,
+            'train_start': windows['train_start'],
+            'test_start': windows['test_start'],
+            'test_end': windows['test_end'],
+            'fitted_until': fitted_until,
+            'test_metrics': {target: metrics for target, _, _, metrics in results},
+        },
+        save_path_models=save_path_models,
+        uuid=uuid
+    )
+
+    return uuid
@@ -0,0 +1,290 @@
+"""
+Small DAG runner for the stages of the prediction pipeline.
+
+Every stage declares the stages whose outputs it takes as inputs and its parameters. The output of a cached stage is
+stored under a key that hashes the stage name, the source code of the module of the stage function and of all modules
+of the package that it imports (directly or indirectly, so code and configuration used by the stage are covered), the
+parameters and the content hashes of the input outputs. When nothing of this changed since an earlier run, the stage is skipped
+and its stored output is loaded instead. Stages that read external data (e.g. sourcing from the cloud or reading
+the feature store) are not cached but always run; the content hash of their output decides whether the downstream stages have to run again.
+
+Independent stages run concurrently in a thread pool as soon as all their inputs are available, and the wall time of
+every stage is reported at the end of the run.
+"""
+
+import ast
+import hashlib
+import importlib.util
+import inspect
+import os
+import pickle
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import pandas as pd
+
+
+def get_source_files(module_name: str) -> list:
+    """
+    Get the source files of a module and of all modules of its top-level package that it imports, directly or
+    indirectly. The imports are read from the source code, including imports inside functions.
+
+    Args:
+        module_name (str): The name of the module, e.g. 'src.prediction_pipeline.modeling.run_training'.
+
+    Returns:
+        list: The paths of the source files, sorted.
+    """
+    package = module_name.split(".")[0]
+    source_files = {}
+    pending_names = [module_name]
+
+    while pending_names:
+        name = pending_names.pop()
+        try:
+            spec = importlib.util.find_spec(name)
+        except (ImportError, ValueError, AttributeError):
+            spec = None
+        if spec is None or spec.origin is None or not spec.origin.endswith(".py") or spec.origin in source_files.values():
+            continue
+        source_files[name] = spec.origin
+
+        with open(spec.origin, encoding="utf-8") as file:
+            tree = ast.parse(file.read())
+
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                pending_names.extend(alias.name for alias in node.names if alias.name.split(".")[0] == package)
+            elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module and node.module.split(".")[0] == package:
+                # The imported names can be submodules as well as attributes of the module
+                pending_names.append(node.module)
+                pending_names.extend(f"{node.module}.{alias.name}" for alias in node.names)
+
+    return sorted(source_files.values())
+
+
+class Stage:
+    """A stage of the pipeline.
+
+    Attributes:
+        name (str): The unique name of the stage.
+        function (callable): The function that computes the output. It is called with the outputs of the input
+            stages as positional arguments (in the order of `inputs`) and the parameters as keyword arguments.
+        inputs (list): The names of the stages whose outputs are passed to the function.
+        params (dict): The keyword arguments passed to the function.
+        cache (bool): Whether the output is cached under its content hash. Stages that read external data should not
+            be cached.
+    """
+
+    def __init__(self, name: str, function, inputs: list = None, params: dict = None, cache: bool = True):
+        """
+        Define a stage.
+
+        Args:
+            name (str): The unique name of the stage.
+            function (callable): The function that computes the output of the stage.
+            inputs (list, optional): The names of the input stages. Defaults to no inputs.
+            params (dict, optional): The keyword arguments passed to the function. Defaults to no parameters.
+            cache (bool, optional): Whether the output is cached. Defaults to True.
+        """
+        self.name = name
+        self.function = function
+        self.inputs = list(inputs or [])
+        self.params = dict(params or {})
+        self.cache = cache
+
+    def get_key(self, input_hashes: list) -> str:
+        """
+        Get the cache key of the stage from its code, parameters and the content hashes of its inputs. The code is the
+        source of the module of the stage function and of all modules of the package it imports (see
+        `get_source_files`).
+
+        Args:
+            input_hashes (list): The content hashes of the input outputs, in the order of `inputs`.
+
+        Returns:
+            str: The cache key.
+        """
+        module = inspect.getmodule(self.function)
+        source_files = get_source_files(module.__name__) if module is not None else []
+
+        code = self.function.__qualname__
+        for source_file in source_files:
+            with open(source_file, encoding="utf-8") as file:
+                code += file.read()
+
+        key = hashlib.sha256()
+        for part in [self.name, code, repr(sorted(self.params.items())), *input_hashes]:
+            key.update(part.encode())
+            key.update(b"\0")
+
+        return key.hexdigest()[:16]
+
+
+def hash_output(output) -> str:
+    """
+    Hash the content of a stage output. DataFrames and Series are hashed row by row with their columns (independent of
+    the memory layout), tuples and lists element by element, and everything else by its pickled bytes.
+
+    Args:
+        output: The output of a stage.
+
+    Returns:
+        str: The content hash.
+    """
+    content_hash = hashlib.sha256()
+
+    if isinstance(output, (pd.DataFrame, pd.Series)):
+        content_hash.update(pd.util.hash_pandas_object(output).to_numpy().tobytes())
+        if isinstance(output, pd.DataFrame):
+            content_hash.update(repr(list(output.columns)).encode())
+            content_hash.update(repr(output.dtypes.tolist()).encode())
+    elif isinstance(output, (tuple, list)):
+        for element in output:
+            content_hash.update(hash_output(element).encode())
+    else:
+        content_hash.update(pickle.dumps(output))
+
+    return content_hash.hexdigest()[:16]
+
+
+class PipelineRunner:
+    """Run a DAG of stages with cached outputs, concurrent independent stages and per-stage timing.
+
+    Attributes:
+        stages (dict): The stages by name, in topological order.
+        cache_dir (str): The local folder with the cached outputs.
+        timings (list): Rows of (stage, status, seconds) of the last run, in order of completion.
+        wall_time (float): The wall time of the last run in seconds.
+    """
+
+    def __init__(self, stages: list, cache_dir: str = ".pipeline_cache"):
+        """
+        Check the stages and order them topologically.
+
+        Args:
+            stages (list): The stages of the pipeline.
+            cache_dir (str, optional): The local folder with the cached outputs. Defaults to ".pipeline_cache".
+
+        Raises:
+            ValueError: If a stage name is not unique, an input is not a stage, or the stages contain a cycle.
+        """
+        names = [stage.name for stage in stages]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Stage names are not unique: {names}")
+
+        stages_by_name = {stage.name: stage for stage in stages}
+        for stage in stages:
+            unknown_inputs = [name for name in stage.inputs if name not in stages_by_name]
+            if unknown_inputs:
+                raise ValueError(f"Stage {stage.name} has unknown inputs: {unknown_inputs}")
+
+        # Order the stages topologically, keeping the given order where possible
+        self.stages = {}
+        while len(self.stages) < len(stages):
+            ready = [stage for stage in stages if stage.name not in self.stages and all(name in self.stages for name in stage.inputs)]
+            if not ready:
+                raise ValueError("The stages contain a cycle")
+            self.stages[ready[0].name] = ready[0]
+
+        self.cache_dir = cache_dir
+        self.timings = []
+        self.wall_time = 0.0
+
+    def _cache_path(self, stage: Stage, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{stage.name}-{key}.pkl")
+
+    def _run_stage(self, stage: Stage, inputs: list, input_hashes: list, force: bool) -> tuple:
+        """
+        Run one stage or load its cached output.
+
+        Returns:
+            tuple: The output, its content hash and whether it was loaded from the cache.
+        """
+        key = stage.get_key(input_hashes)
+        cache_path = self._cache_path(stage, key)
+
+        if stage.cache and not force and os.path.exists(cache_path):
+            with open(cache_path, "rb") as file:
+                output, output_hash = pickle.load(file)
+            return output, output_hash, True
+
+        output = stage.function(*inputs, **stage.params)
+        output_hash = hash_output(output)
+
+        if stage.cache:
+            # Write to a temporary file first so that an interrupted run leaves no partial cache entry
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temporary_path = f"{cache_path}.tmp"
+            with open(temporary_path, "wb") as file:
+                pickle.dump((output, output_hash), file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary_path, cache_path)
+
+        return output, output_hash, False
+
+    def run(self, targets: list = None, force: bool = False, max_workers: int = 3) -> dict:
+        """
+        Run the stages needed for the targets. A stage starts as soon as all its inputs are available.
+
+        Args:
+            targets (list, optional): The names of the stages to compute, together with everything upstream of them.
+                Defaults to all stages.
+            force (bool, optional): Run all stages even if a cached output exists. Defaults to False.
+            max_workers (int, optional): The maximum number of stages that run concurrently. Defaults to 3.
+
+        Returns:
+            dict: The outputs of the stages that were run or loaded, by name.
+        """
+        # Select the targets and all stages upstream of them
+        needed = set()
+        pending_names = list(targets or self.stages)
+        while pending_names:
+            name = pending_names.pop()
+            if name not in needed:
+                needed.add(name)
+                pending_names.extend(self.stages[name].inputs)
+        pending = [stage for name, stage in self.stages.items() if name in needed]
+
+        outputs, output_hashes = {}, {}
+        self.timings = []
+        start_times = {}
+        run_start = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            running = {}
+            while pending or running:
+                # Submit every stage whose inputs are available
+                for stage in [stage for stage in pending if all(name in outputs for name in stage.inputs)]:
+                    pending.remove(stage)
+                    start_times[stage.name] = time.perf_counter()
+                    future = executor.submit(
+                        self._run_stage,
+                        stage,
+                        [outputs[name] for name in stage.inputs],
+                        [output_hashes[name] for name in stage.inputs],
+                        force,
+                    )
+                    running[future] = stage
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage = running.pop(future)
+                    output, output_hash, from_cache = future.result()
+                    outputs[stage.name], output_hashes[stage.name] = output, output_hash
+
+                    elapsed = time.perf_counter() - start_times[stage.name]
+                    self.timings.append((stage.name, "cached" if from_cache else "ran", elapsed))
+                    print(f"Stage {stage.name}: {'cached' if from_cache else 'ran'} in {elapsed:.2f} s")
+
+        self.wall_time = time.perf_counter() - run_start
+        self.print_timings()
+
+        return outputs
+
+    def print_timings(self) -> None:
+        """Print the status and wall time of every stage of the last run."""
+        print("\nStage timings:")
+        for name, status, elapsed in self.timings:
+            print(f"  {name:<30} {status:<7} {elapsed:8.2f} s")
+        print(f"  {'sum of stages':<30} {'':<7} {sum(elapsed for _, _, elapsed in self.timings):8.2f} s")
+        print(f"  {'wall time':<30} {'':<7} {self.wall_time:8.2f} s")
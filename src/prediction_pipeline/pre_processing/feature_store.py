@@ -0,0 +1,244 @@
+"""
+Offline feature store with the hourly features used for training and inference.
+
+The store consists of two parquet tables keyed by the hourly 'Time' column:
+- calendar features (holidays, school vacations, openings, season, weekday, distance to holidays) derived from the
+  visitor center workbook, which covers several years ahead and only changes when a new workbook is processed,
+- weather features (weather values and their daily max z-scores), which are upserted as new weather data arrives.
+
+Training and inference both read the features for a time range with `read_feature_store`, so inference only needs to
+slice the store instead of rebuilding the calendar features on every run. The store is only written by the training
+pipeline: inference computes the weather features of the latest forecasts in memory and never writes to the store.
+"""
+
+import pandas as pd
+from azure.storage.blob import BlobClient
+from src.config import CONNECTION_STRING, CONTAINER_NAME
+from src.utils import upload_dataframe_to_azure, read_dataframe_from_azure
+from src.prediction_pipeline.pre_processing.features_zscoreweather_distanceholidays import add_nearest_holiday_distance, add_daily_max_zscores, window_size
+from src.prediction_pipeline.sourcing_data.source_visitor_center_data import source_preprocessed_hourly_visitor_center_data
+
+
+###########################################################################################
+# GLOBAL VARIABLES
+###########################################################################################
+
+feature_store_folder = "preprocessed_data/feature_store"
+calendar_features_file_name = "calendar_features.parquet"
+weather_features_file_name = "weather_features.parquet"
+
+# Calendar features taken from the hourly visitor center data
+calendar_columns = ['Time', 'Tag', 'Hour', 'Monat', 'Wochentag', 'Wochenende', 'Jahreszeit', 'Laubfärbung',
+                    'Schulferien_Bayern', 'Schulferien_CZ', 'Feiertag_Bayern', 'Feiertag_CZ',
+                    'HEH_geoeffnet', 'HZW_geoeffnet', 'WGM_geoeffnet', 'Lusenschutzhaus_geoeffnet',
+                    'Racheldiensthuette_geoeffnet', 'Falkensteinschutzhaus_geoeffnet', 'Schwellhaeusl_geoeffnet']
+
+# Weather features stored as they arrive, z-scores are computed for a subset of them
+weather_columns = ['Time', 'Temperature (°C)', 'Relative Humidity (%)', 'Wind Speed (km/h)', 'coco_2']
+weather_columns_for_zscores = ['Temperature (°C)', 'Relative Humidity (%)', 'Wind Speed (km/h)']
+
+
+###########################################################################################
+# Functions
+###########################################################################################
+
+def feature_store_file_exists(file_name: str) -> bool:
+    """
+    Check if a table of the feature store exists in the cloud.
+
+    Args:
+        file_name (str): The file name of the table in the feature store folder.
+
+    Returns:
+        bool: True if the table exists.
+    """
+    blob_client = BlobClient.from_connection_string(
+        conn_str=CONNECTION_STRING,
+        container_name=CONTAINER_NAME,
+        blob_name=f"{feature_store_folder}/{file_name}"
+    )
+
+    return blob_client.exists()
+
+def read_feature_store_table(file_name: str, start_time=None, end_time=None) -> pd.DataFrame:
+    """
+    Read a table of the feature store, optionally only the rows with start_time <= Time < end_time.
+
+    The time range is pushed down to the parquet reader, so only the row groups within the range are read.
+
+    Args:
+        file_name (str): The file name of the table in the feature store folder.
+        start_time (datetime, optional): Start of the time range (inclusive).
+        end_time (datetime, optional): End of the time range (exclusive).
+
+    Returns:
+        pd.DataFrame: The rows of the table within the time range.
+    """
+    filters = []
+    if start_time is not None:
+        filters.append(('Time', '>=', pd.Timestamp(start_time)))
+    if end_time is not None:
+        filters.append(('Time', '<', pd.Timestamp(end_time)))
+
+    return read_dataframe_from_azure(
+        file_name=file_name,
+        file_format="parquet",
+        source_folder=feature_store_folder,
+        read_options={"filters": filters} if filters else None,
+    )
+
+def compute_calendar_features(hourly_visitor_center_data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Compute the calendar features of the hourly visitor center data.
+
+    The distances to the nearest holidays are computed over the whole horizon of the visitor center data, so that
+    they are also correct for short time ranges without any holiday.
+
+    Args:
+        hourly_visitor_center_data (pd.DataFrame): The preprocessed hourly visitor center data.
+
+    Returns:
+        pd.DataFrame: The calendar features sorted by time.
+    """
+    calendar_features = hourly_visitor_center_data[calendar_columns].copy()
+    calendar_features['Time'] = pd.to_datetime(calendar_features['Time'])
+    calendar_features = calendar_features.sort_values('Time')
+
+    return add_nearest_holiday_distance(calendar_features).drop(columns=['Date'])
+
+def write_calendar_features(hourly_visitor_center_data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Materialize the calendar features of the hourly visitor center data in the feature store.
+
+    Args:
+        hourly_visitor_center_data (pd.DataFrame): The preprocessed hourly visitor center data.
+
+    Returns:
+        pd.DataFrame: The calendar features that were written to the store.
+    """
+    calendar_features = compute_calendar_features(hourly_visitor_center_data)
+
+    upload_dataframe_to_azure(
+        df=calendar_features,
+        file_name=calendar_features_file_name,
+        target_folder=feature_store_folder,
+        file_format="parquet",
+    )
+
+    print("Calendar features written to the feature store")
+
+    return calendar_features
+
+def compute_weather_features(weather_data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Compute the weather features (weather values and daily max z-scores) for hourly weather data.
+
+    Args:
+        weather_data (pd.DataFrame): Hourly weather data with a 'Time' column.
+
+    Returns:
+        pd.DataFrame: The weather features sorted by time with one row per hour.
+    """
+    weather_features = weather_data[weather_columns].copy()
+    weather_features['Time'] = pd.to_datetime(weather_features['Time'])
+
+    # Keep a consistent schema for the table, regardless of where the weather data comes from
+    weather_features['coco_2'] = weather_features['coco_2'].astype('float64')
+
+    # One row per hour, keeping the latest arrived value
+    weather_features = weather_features.drop_duplicates(subset=['Time'], keep='last')
+    weather_features = weather_features.sort_values('Time').reset_index(drop=True)
+
+    weather_features = add_daily_max_zscores(weather_features, weather_columns_for_zscores, window_size)
+
+    return weather_features
+
+def write_weather_features(weather_data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Upsert newly arrived weather data into the feature store.
+
+    New rows replace stored rows with the same time (e.g. a forecast that is replaced by newer forecasts or
+    measurements), and the z-scores are recomputed as they depend on the previous days. Days missing between the
+    stored and the new rows are not bridged by the z-score windows.
+
+    This is a step of the training pipeline, the store has a single writer.
+
+    Args:
+        weather_data (pd.DataFrame): Newly arrived hourly weather data with a 'Time' column.
+
+    Returns:
+        pd.DataFrame: All weather features in the store.
+    """
+    if feature_store_file_exists(weather_features_file_name):
+        stored_weather_data = read_feature_store_table(weather_features_file_name)[weather_columns]
+        weather_data = pd.concat([stored_weather_data, weather_data[weather_columns]], ignore_index=True)
+
+    weather_features = compute_weather_features(weather_data)
+
+    upload_dataframe_to_azure(
+        df=weather_features,
+        file_name=weather_features_file_name,
+        target_folder=feature_store_folder,
+        file_format="parquet",
+    )
+
+    print("Weather features written to the feature store")
+
+    return weather_features
+
+def read_feature_store(start_time, end_time, weather_features: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Read the calendar and weather features for all hours with start_time <= Time < end_time.
+
+    The store is only read. If the calendar features were not materialized yet, they are computed in memory from the
+    preprocessed hourly visitor center data, until the training pipeline writes them.
+
+    Args:
+        start_time (datetime): Start of the time range (inclusive).
+        end_time (datetime): End of the time range (exclusive).
+        weather_features (pd.DataFrame, optional): Weather features computed by the caller (e.g. of the latest
+            forecasts at inference). Defaults to the weather features in the store.
+
+    Returns:
+        pd.DataFrame: The features with a 'Time' column, one row per hour of the calendar.
+    """
+    if feature_store_file_exists(calendar_features_file_name):
+        calendar_features = read_feature_store_table(calendar_features_file_name, start_time, end_time)
+    else:
+        print("No calendar features found in the feature store, computing them from the visitor center data")
+        calendar_features = compute_calendar_features(source_preprocessed_hourly_visitor_center_data())
+        calendar_features = calendar_features[
+            (calendar_features['Time'] >= start_time) & (calendar_features['Time'] < end_time)
+        ]
+
+    if weather_features is None:
+        weather_features = read_feature_store_table(weather_features_file_name, start_time, end_time)
+    else:
+        weather_features = weather_features[
+            (weather_features['Time'] >= start_time) & (weather_features['Time'] < end_time)
+        ]
+
+    features = calendar_features.merge(weather_features, on='Time', how='left')
+
+    return features
+
+def get_training_data(visitor_count_data: pd.DataFrame, start_time, end_time) -> pd.DataFrame:
+    """
+    Join the features from the feature store with the visitor counts (targets) for training.
+
+    Args:
+        visitor_count_data (pd.DataFrame): The preprocessed visitor count data with a 'Time' column.
+        start_time (datetime): Start of the training data (inclusive).
+        end_time (datetime): End of the training data (exclusive).
+
+    Returns:
+        pd.DataFrame: The features and visitor counts for all hours without missing values.
+    """
+    features = read_feature_store(start_time, end_time)
+
+    training_data = features.merge(visitor_count_data, on='Time', how='inner')
+
+    # Remove rows with missing values (e.g. hours without weather data)
+    training_data = training_data.dropna()
+
+    return training_data
@@ -36,139 +36,116 @@ def slice_at_first_non_null(df):
 
     return df
 
-def add_nearest_holiday_distance(df):
+def get_nearest_holiday_distance(days, holiday_days):
     """
-    Add columns to the DataFrame calculating the distance to the nearest holiday for both 'Feiertag_Bayern' and 'Feiertag_CZ'.
+    Calculate the distance in days from every day to its nearest holiday.
+
+    Both inputs are integer day numbers (days since epoch). The holidays are sorted once and every day is
+    located between its two neighbouring holidays with a binary search, so the cost is O(n log h) instead
+    of comparing every day with every holiday.
 
     Args:
-        df (pd.DataFrame): DataFrame with 'Time', 'Feiertag_Bayern', and 'Feiertag_CZ' columns.
-            - 'Time': Datetime column with timestamps.
-            - 'Feiertag_Bayern': Boolean column indicating if the date is a holiday in Bayern.
-            - 'Feiertag_CZ': Boolean column indicating if the date is a holiday in CZ.
+        days (np.ndarray): int64 array with the day number of every row.
+        holiday_days (np.ndarray): int64 array with the day numbers of the holidays.
 
     Returns:
-        pd.DataFrame: DataFrame with two new columns:
-            - 'Distance_to_Nearest_Holiday_Bayern': Distance in days to the nearest holiday in Bayern for each day/row.
-            - 'Distance_to_Nearest_Holiday_CZ': Distance in days to the nearest holiday in CZ for each day/row.
+        np.ndarray: int64 array with the distance in days to the nearest holiday, or a float array of NaN
+                    if no holidays are provided.
     """
+    holiday_days = np.unique(holiday_days)  # sorted and de-duplicated
 
-    # Ensure the Time column is in datetime format
-    df['Time'] = pd.to_datetime(df['Time'])
-
-    # Extract date from Time column
-    df['Date'] = df['Time'].dt.date
-
-    # Extract unique dates for holidays
-    bayern_holidays = df[df['Feiertag_Bayern']]['Date'].unique()
-    cz_holidays = df[df['Feiertag_CZ']]['Date'].unique()
+    if len(holiday_days) == 0:
+        return np.full(len(days), np.nan)
 
-    # Create a DataFrame with unique dates
-    dates_df = pd.DataFrame({'Date': df['Date'].unique()})
+    # Position of the first holiday on or after each day
+    right_position = np.searchsorted(holiday_days, days)
 
+    # The nearest holiday is either the one right before or the one right after the day
+    previous_holiday = holiday_days[np.clip(right_position - 1, 0, len(holiday_days) - 1)]
+    next_holiday = holiday_days[np.clip(right_position, 0, len(holiday_days) - 1)]
 
-    def get_nearest_holiday_distance(date, holidays):
-        """
-        Calculate the distance in days to the nearest holiday.
-
-        Args:
-            date (pd.Timestamp): The date for which to calculate the distance.
-            holidays (np.ndarray): Array of holiday dates.
-
-        Returns:
-            float: Distance in days to the nearest holiday, or NaN if no holidays are provided.
-        """
-        if len(holidays) == 0:
-            return np.nan
-        nearest_holiday = min(abs((date - pd.to_datetime(holidays)).days))
-        return nearest_holiday
-
-    # Apply the function to calculate distances for both sets of holidays
-    dates_df['Distance_to_Nearest_Holiday_Bayern'] = dates_df['Date'].apply(
-        lambda x: get_nearest_holiday_distance(pd.to_datetime(x), bayern_holidays)
-    )
-    dates_df['Distance_to_Nearest_Holiday_CZ'] = dates_df['Date'].apply(
-        lambda x: get_nearest_holiday_distance(pd.to_datetime(x), cz_holidays)
-    )
-    # Merge the distances back with the original DataFrame
-    df = df.merge(dates_df, on='Date', how='left')
-   
-
-    return df
+    return np.minimum(np.abs(days - previous_holiday), np.abs(days - next_holiday))
 
-def add_daily_max_values(df, columns):
+def add_nearest_holiday_distance(df):
     """
-    Add columns to the DataFrame that show the maximum daily value for each weather characteristic.
+    Add columns to the DataFrame calculating the distance to the nearest holiday for both 'Feiertag_Bayern' and 'Feiertag_CZ'.
 
     Args:
-        df (pd.DataFrame): DataFrame with 'Time' and multiple weather-related columns.
+        df (pd.DataFrame): DataFrame with 'Time', 'Feiertag_Bayern', and 'Feiertag_CZ' columns.
             - 'Time': Datetime column with timestamps.
-            - columns (list of str): List of column names to compute the daily maximum values for.
+            - 'Feiertag_Bayern': Boolean column indicating if the date is a holiday in Bayern.
+            - 'Feiertag_CZ': Boolean column indicating if the date is a holiday in CZ.
 
     Returns:
-        pd.DataFrame: DataFrame with new columns that contain the maximum values for each day,
-                      repeated for every hour.
+        pd.DataFrame: DataFrame with two new columns:
+            - 'Distance_to_Nearest_Holiday_Bayern': Distance in days to the nearest holiday in Bayern for each day/row.
+            - 'Distance_to_Nearest_Holiday_CZ': Distance in days to the nearest holiday in CZ for each day/row.
     """
+
     # Ensure the Time column is in datetime format
     df['Time'] = pd.to_datetime(df['Time'])
 
-    # Extract the date from the Time column
+    # Extract date from Time column
     df['Date'] = df['Time'].dt.date
 
-    # Create a DataFrame to store daily max values
-    daily_max_df = df.groupby('Date')[columns].max().reset_index()
+    # Start from a fresh index, as the previous merge-based implementation did
+    df = df.reset_index(drop=True)
 
-    # Rename columns to indicate they are daily maximum values
-    daily_max_df = daily_max_df.rename(columns={col: f'Daily_Max_{col}' for col in columns})
+    # Day number of every row (days since epoch) to compare dates as plain integers
+    days = df['Time'].to_numpy(dtype='datetime64[ns]').astype('datetime64[D]').astype(np.int64)
 
-    # Merge the daily max values back into the original DataFrame
-    df = df.merge(daily_max_df, on='Date', how='left')
+    # Calculate the distances for both sets of holidays on the same day array
+    holiday_columns = {
+        'Distance_to_Nearest_Holiday_Bayern': 'Feiertag_Bayern',
+        'Distance_to_Nearest_Holiday_CZ': 'Feiertag_CZ',
+    }
+    for distance_column, holiday_column in holiday_columns.items():
+        # Missing holiday flags are not holidays
+        is_holiday = df[holiday_column].eq(True).to_numpy()
+        df[distance_column] = get_nearest_holiday_distance(days, days[is_holiday])
 
     return df
 
-def add_moving_z_scores(df, columns, window_size):
+def add_daily_max_zscores(df, columns, window_size):
     """
     Add moving z-score columns for weather characteristics based on their daily maximum values.
 
+    The daily maxima, their rolling mean and standard deviation are computed on the daily series only
+    and broadcast back to the hourly rows through an integer day index, so no intermediate daily
+    DataFrame has to be merged back into the hourly one. As before, the daily series only has the days
+    present in the data, so the window spans the last `window_size` days with data, also across gaps.
+
     Args:
-        df (pd.DataFrame): DataFrame with 'Time' and daily maximum columns.
+        df (pd.DataFrame): DataFrame with 'Time' and multiple weather-related columns.
             - 'Time': Datetime column with timestamps.
         columns (list of str): List of column names to compute the moving z-scores for.
         window_size (int): Size of the moving window in days.
 
     Returns:
-        pd.DataFrame: DataFrame with new columns that contain the moving z-scores for each column.
+        pd.DataFrame: DataFrame with new 'ZScore_Daily_Max_<column>' columns that contain the moving z-scores
+                      of the daily maximum values, repeated for every hour.
     """
     # Ensure the Time column is in datetime format
     df['Time'] = pd.to_datetime(df['Time'])
 
-    # Extract unique dates with daily max values
-    daily_df = df[['Date'] + [f'Daily_Max_{col}' for col in columns]].drop_duplicates()
-
-    # Calculate rolling mean and standard deviation for daily max values
-    for col in columns:
-        daily_max_col = f'Daily_Max_{col}'
+    # Integer day index of every row, the position of its day among the sorted days with data
+    days = df['Time'].to_numpy(dtype='datetime64[ns]').astype('datetime64[D]').astype(np.int64)
+    day_index = np.unique(days, return_inverse=True)[1].reshape(-1)
 
-        # Calculate rolling mean and standard deviation over the specified window size
-        daily_df[f'Rolling_Mean_{daily_max_col}'] = daily_df[daily_max_col].rolling(window=window_size, min_periods=window_size).mean()
-        daily_df[f'Rolling_Std_{daily_max_col}'] = daily_df[daily_max_col].rolling(window=window_size, min_periods=window_size).std()
+    # Daily maximum values, one row per day with data
+    daily_max = df[columns].groupby(day_index).max()
 
-        # Calculate the z-score
-        daily_df[f'ZScore_{daily_max_col}'] = (
-            (daily_df[daily_max_col] - daily_df[f'Rolling_Mean_{daily_max_col}']) /
-            (daily_df[f'Rolling_Std_{daily_max_col}'] + 1e-8)  # Add a small value to prevent division by zero
-        )
-
-        # Drop the rolling mean and std columns as they are intermediate calculations
-        daily_df.drop(columns=[f'Rolling_Mean_{daily_max_col}', f'Rolling_Std_{daily_max_col}'], inplace=True)
-
-    # Merge the z-scores back into the original hourly DataFrame
-    df = df.merge(daily_df[['Date'] + [f'ZScore_Daily_Max_{col}' for col in columns]], on='Date', how='left')
-
-    # List of columns to drop (daily max columns)
-    daily_max_columns = [f'Daily_Max_{col}' for col in columns]
+    # Calculate the z-score over the rolling window of daily max values
+    rolling_daily_max = daily_max.rolling(window=window_size, min_periods=window_size)
+    daily_zscores = (
+        (daily_max - rolling_daily_max.mean()) /
+        (rolling_daily_max.std() + 1e-8)  # Add a small value to prevent division by zero
+    )
 
-    # Drop the daily max columns from the main DataFrame
-    df.drop(columns=daily_max_columns, inplace=True)
+    # Broadcast the daily z-scores back to the hourly rows
+    hourly_zscores = daily_zscores.to_numpy()[day_index]
+    for position, col in enumerate(columns):
+        df[f'ZScore_Daily_Max_{col}'] = hourly_zscores[:, position]
 
     return df
 
@@ -187,9 +164,7 @@ def get_zscores_and_nearest_holidays(df,columns_for_zscores):
 
     df_holidays = add_nearest_holiday_distance(df_no_null)
 
-    df_daily_max = add_daily_max_values(df_holidays, columns_for_zscores)
-
-    df_zscores_and_nearest_holidays = add_moving_z_scores(df_daily_max, columns_for_zscores, window_size)
+    df_zscores_and_nearest_holidays = add_daily_max_zscores(df_holidays, columns_for_zscores, window_size)
 
     # Remove NaN values (as there will be NaNs in the first rows of the dataframe due to zscore being NaN)
     df_zscores_and_nearest_holidays = df_zscores_and_nearest_holidays.dropna()
@@ -13,8 +13,12 @@ Output:
 #import libraries
 
 import pandas as pd
-import re
 import numpy as np
+from src.utils import parse_german_dates
+from src.config import sensor_lifecycle
+from src.prediction_pipeline.sourcing_data.source_historic_visitor_count import sensor_count_dtype
+from src.prediction_pipeline.pre_processing.region_aggregation import SensorAggregation
+from src.prediction_pipeline.pre_processing.sensor_lifecycle import SensorLifecycle
 
 pd.options.mode.chained_assignment = None  
 
@@ -26,61 +30,16 @@ pd.options.mode.chained_assignment = None
 output_data_folder = "preprocessed_data"
 output_file_name = "preprocessed_visitor_sensor_data.csv"
 
+# Time zone of the local timestamps in the sensor exports
+time_zone = "Europe/Berlin"
 
-##############################################################################################
-    
-# Functions
+# Sensor lifecycle table compiled once for all runs
+sensor_lifecycle_rules = SensorLifecycle(sensor_lifecycle)
 
-def parse_german_dates(
-    df: pd.DataFrame,
-    date_column_name: str
-) -> pd.DataFrame:
-    """
-    Parses German dates in the specified date column of the DataFrame using regex,
-    including hours and minutes if available.
-
-    Args:
-        df (pd.DataFrame): The DataFrame containing the date column.
-        date_column_name (str): The name of the date column.
 
-    Returns:
-        pd.DataFrame: The DataFrame with parsed German dates.
-    """
+##############################################################################################
     
-    # Define a mapping of German month names to their numeric values
-    month_map = {
-        "Jan.": "01",
-        "Feb.": "02",
-        "März": "03",
-        "Apr.": "04",
-        "Mai": "05",
-        "Juni": "06",
-        "Juli": "07",
-        "Aug.": "08",
-        "Sep.": "09",
-        "Okt.": "10",
-        "Nov.": "11",
-        "Dez.": "12"
-    }
-
-    # Create a regex pattern for replacing months and capturing time
-    pattern = re.compile(r'(\d{1,2})\.\s*(' + '|'.join(month_map.keys()) + r')\s*(\d{4})\s*(\d{2}):(\d{2})')
-
-    # Function to replace the month in the matched string and keep the time part
-    def replace_month(match):
-        day = match.group(1)
-        month = month_map[match.group(2)]
-        year = match.group(3)
-        hour = match.group(4)
-        minute = match.group(5)
-        return f"{year}-{month}-{day} {hour}:{minute}:00"
-
-    # Apply regex replacement and convert to datetime
-    df[date_column_name] = df[date_column_name].apply(lambda x: replace_month(pattern.search(x)) if pattern.search(x) else x)
-    df[date_column_name] = pd.to_datetime(df[date_column_name], errors='coerce')
-
-    return df
-
+# Functions
 
 def fix_columns_names(df):
     """
@@ -162,185 +121,102 @@ def fix_columns_names(df):
 def correct_and_impute_times(df):
     
     """
-    Corrects repeated timestamps caused by a 2-hour interval that is indicative of a daylight saving.
+    Localizes the timestamps to `time_zone` and corrects them around the daylight saving time switches.
 
     The function operates under the following assumptions:
-    1. By default every interval should be of 1 hour
-    2. If any interval differ from this, particularly the repeated timestamp is corrected by subtracting one hour.
-    3. The data values for the corrected timestamp are then imputed from the next available row.
-    4. 2017 is an odd year where the null row is not the one with the 2 hours interval, but the one with 0. We fixed this manually for this specific rows.
+    1. By default every interval should be of 1 hour and the timestamps are local (wall clock) times in `time_zone`.
+    2. When the clock skips one hour in spring, the hour after the skipped hour can be repeated in the export, with one of the repeated rows
+       being empty. A row in the skipped hour itself is moved to the next hour. The repeated rows are combined by taking the first non-missing
+       value of every column.
+    3. When the clock repeats one hour in autumn, the repeated rows are in chronological order: the first one is summer time and the next one
+       winter time. Both rows are kept.
+
+    All rows are localized with one vectorized call and ordered by their int64 timestamps, so no fixed row positions are needed and the
+    function works on exports of any length. The rows are gathered with at most one copy of the sensor block, and none if the export is
+    already in order. The skipped hour does not exist on the localized index; it is back-filled by `to_local_wall_clock`.
 
     Args:
         df (pandas.DataFrame): A DataFrame containing a 'Time' column with datetime-like values and other associated data columns.
 
     Returns:
-        pandas.DataFrame: The corrected DataFrame with timestamps set as the index and sorted chronologically.
+        pandas.DataFrame: The corrected DataFrame with the timestamps localized to `time_zone` as the index and sorted chronologically.
 
     Raises:
-        ValueError: If the 'Time' column is missing from the DataFrame.
-        KeyError: If an index out of range occurs due to imputation attempts beyond the DataFrame bounds.
+        KeyError: If the 'Time' column is missing from the DataFrame.
     """
-    # Swap values of specific rows to correct data misalignment
-    df.iloc[[54603, 54602]] = df.iloc[[54602, 54603]].values
+    wall_clock = pd.DatetimeIndex(df.pop('Time'))
 
-    # Sort DataFrame by 'Time'
-    df.sort_values("Time", ascending=True, inplace=True)
+    # Infer the repeated autumn hour from the row order: the first row of a local time is summer time, a repeated row winter time
+    summer_time = ~wall_clock.duplicated(keep='first')
+    index = wall_clock.tz_localize(time_zone, ambiguous=summer_time, nonexistent="shift_forward")
 
-    # Identify intervals where there is a 2 hours gap
-    intervals = df.Time.diff().dropna()
-    index_wrong_time = intervals[intervals == "0 days 02:00:00"].index
+    # Rows that fall on the same hour after the skipped spring hour are combined into their first row
+    repeated = index.duplicated(keep=False)
+    combined_rows = df[repeated].groupby(index[repeated], sort=False).first() if repeated.any() else None
 
-    # Impute values from the next row and adjust 'Time' column
-    for idx in index_wrong_time:
-        df.loc[idx, 'Time'] = df.loc[idx, 'Time'] - pd.Timedelta(hours=1)  # Adjust for daylight saving
-        df.loc[idx, df.columns != 'Time'] = df.loc[idx + 1, df.columns != 'Time']  # Impute values from the next row
+    # Keep the first row of every hour in chronological order
+    order = np.argsort(index.asi8, kind="stable")
+    order = order[~index.duplicated(keep='first')[order]]
+    if len(order) < len(df) or np.any(order[1:] < order[:-1]):
+        df = df.take(order)
+    df.index = index[order]
 
-    # Set 'Time' as index and sort by index
-    df = df.set_index('Time').sort_index()
+    if combined_rows is not None:
+        df.loc[combined_rows.index, combined_rows.columns] = combined_rows
 
     return df
 
-def correct_non_replaced_sensors(df):
+def to_local_wall_clock(df):
     """
-    Replaces data with NaN for non-replaced sensors in the DataFrame based on specified timestamps. A dictionary is provided where keys are timestamps as strings and values are lists of column names that should be set to NaN if the index is earlier than the timestamp.
+    Converts the localized index of `correct_and_impute_times` back to the local (wall clock) times that the feature store and the models use.
+    The hour skipped in spring is added to the data and its values are imputed from the next hour. Both rows of the hour repeated in autumn
+    are kept in chronological order.
 
     Args:
-        df (pd.DataFrame): The DataFrame to be corrected.
+        df (pandas.DataFrame): A DataFrame with the timestamps localized to `time_zone` as the index.
 
     Returns:
-        pd.DataFrame: The DataFrame with corrected sensor data.
+        pandas.DataFrame: The DataFrame with naive local timestamps as the index and the skipped hours imputed.
     """
+    wall_clock = df.index.tz_localize(None)
 
-    dict_non_replaced = {'2020-07-30 00:00:00' : ['Lusen 1 PYRO IN', 'Lusen 1 PYRO OUT'],
-                     '2022-12-20 00:00:00' : ['Lusen 3 IN', 'Lusen 3 OUT'],
-                     '2022-10-12 00:00:00' : ['Gsenget IN', 'Gsenget OUT']}
+    # Rows one hour after the previous row that are two hours after it on the local clock follow a skipped hour
+    one_hour = pd.Timedelta(hours=1).value
+    after_skipped_hour = np.flatnonzero(np.diff(wall_clock.asi8) - np.diff(df.index.asi8) == one_hour) + 1
 
+    if len(after_skipped_hour) == 0:
+        df.index = wall_clock
+        return df
 
-    # Iterate over the dictionary of non-replaced sensors
-    for key, columns in dict_non_replaced.items():
-        # Convert the timestamp key from string to datetime object
-        timestamp = pd.to_datetime(key)
-        
-        # Set values to NaN for specified columns where the index is earlier than the given timestamp
-        df.loc[df.index < timestamp, columns] = np.nan
+    # Gather the rows and the copies of the rows after the skipped hours in chronological order with one copy
+    rows = np.concatenate([np.arange(len(df)), after_skipped_hour])
+    times = np.concatenate([wall_clock.asi8, wall_clock.asi8[after_skipped_hour] - one_hour])
+    order = np.argsort(times, kind="stable")
 
-    print("Out of place values were turn to NaN for Lusen 1 PYRO, Lusen 3 and Gsenget")    
+    df = df.take(rows[order])
+    df.index = pd.DatetimeIndex(times[order], name=wall_clock.name)
 
     return df
 
-
-# Fix overlapping values in replaced sensors
-
-def correct_overlapping_sensor_data(df):
+def apply_sensor_lifecycle(df):
     """
-    Corrects sensor overlapping data by setting specific values to NaN based on replacement dates. Also filters the DataFrame to include only rows with an index timestamp on or after "2016-05-10 03:00:00". This is 3am after the installing date for the first working sensor.
+    Applies the sensor lifecycle table from the config in one pass: counts of every sensor outside of its valid interval
+    (e.g. before a sensor was replaced or after it was replaced by a new one) are set to NaN, and the columns of replaced
+    sensors are merged into new combined columns that replace the original columns. Additionally, drops columns with names
+    containing "Fahrräder" or "Fußgänger" as we will not use that distinction.
 
     Args:
-        df (pd.DataFrame): The DataFrame containing sensor data to be corrected.
+        df (pandas.DataFrame): A DataFrame with the timestamps as index containing the sensor columns of the lifecycle table.
 
     Returns:
-        pd.DataFrame: The DataFrame with corrected sensor data.
+        pandas.DataFrame: The modified DataFrame with the corrected and merged sensor columns, and Fahrräder or Fußgänger columns dropped.
     """
-    # Define the replacement dates and columns for different sensor types
-    replacement_dates = {
-        'trinkwassertalsperre': '2021-06-18 00:00:00',
-        'bucina': '2021-05-28 00:00:00',
-        'falkenstein 1': '2022-12-22 12:00:00'
-    }
-
-    multi_columns_dict = {
-        'trinkwassertalsperre': [
-            'Trinkwassertalsperre_MULTI Fußgänger IN',
-            'Trinkwassertalsperre_MULTI Fußgänger OUT',
-            'Trinkwassertalsperre_MULTI Fahrräder IN',
-            'Trinkwassertalsperre_MULTI Fahrräder OUT',
-            'Trinkwassertalsperre_MULTI IN',
-            'Trinkwassertalsperre_MULTI OUT'
-        ],
-        'bucina': [
-            'Bucina_Multi OUT',
-            'Bucina_Multi Fußgänger IN',
-            'Bucina_Multi Fahrräder IN',
-            'Bucina_Multi Fahrräder OUT',
-            'Bucina_Multi Fußgänger OUT',
-            'Bucina_Multi IN'
-        ],
-        'falkenstein 1': [
-            'Falkenstein 1 OUT',
-            'Falkenstein 1 IN'
-        ]
-    }
-
-    pyro_columns_dict = {
-        'trinkwassertalsperre': [
-            'Trinkwassertalsperre PYRO IN',
-            'Trinkwassertalsperre PYRO OUT'
-        ],
-        'bucina': [
-            'Bucina PYRO IN',
-            'Bucina PYRO OUT'
-        ],
-        'falkenstein 1': [
-            'Falkenstein 1 PYRO IN',
-            'Falkenstein 1 PYRO OUT'
-        ]
-    }
-
-    # Process each sensor type based on the predefined dictionaries
-    for sensor_type in replacement_dates:
-        replacement_date = pd.to_datetime(replacement_dates[sensor_type])
-        multi_columns = multi_columns_dict.get(sensor_type, [])
-        pyro_columns = pyro_columns_dict.get(sensor_type, [])
-
-        # Set to NaN the values in 'multi_columns' for dates on or before the replacement date
-        if multi_columns:
-            df.loc[df.index <= replacement_date, multi_columns] = np.nan
-
-        # Set to NaN the values in 'pyro_columns' for dates after the replacement date
-        if pyro_columns:
-            df.loc[df.index > replacement_date, pyro_columns] = np.nan
-
-    # Slice data before date because  there were no sensors installed
-    df = df[df.index >= "2016-05-10 03:00:00"]
-
-
-    print("Fixed overlapping values for replaced sensors")
-    return df
-
+    df = sensor_lifecycle_rules.apply(df)
 
-def merge_columns(df):
-    """
-    Merges columns from replaced sensors in the DataFrame into new combined columns based on a predefined mapping and drops the original columns after merging.
-
-    The function merges multiple related columns into single combined columns using a predefined dictionary (`merge_dict`). 
-    For each key-value pair in the dictionary, values from the first column are used, and missing values are filled 
-    from the second column. After merging, the original columns used for merging are dropped from the DataFrame.
-
-    Args:
-        df (pandas.DataFrame): A DataFrame containing columns to be merged.
+    # Drop columns with names containing "Fahrräder" or "Fußgänger"
+    df = df.loc[:, ~df.columns.str.contains("Fahrräder|Fußgänger")]
 
-    Returns:
-        pandas.DataFrame: The modified DataFrame with the new merged columns and original columns removed.
-    """
-    merge_dict = {
-        'Bucina MERGED IN': ['Bucina PYRO IN', 'Bucina_Multi IN'],
-        'Bucina MERGED OUT': ['Bucina PYRO OUT', 'Bucina_Multi OUT'],
-        'Falkenstein 1 MERGED IN': ['Falkenstein 1 PYRO IN', 'Falkenstein 1 IN'],
-        'Falkenstein 1 MERGED OUT': ['Falkenstein 1 PYRO OUT', 'Falkenstein 1 OUT'],
-        'Lusen 1 MERGED IN': ['Lusen 1 PYRO IN', 'Lusen 1 EVO IN'],
-        'Lusen 1 MERGED OUT': ['Lusen 1 PYRO OUT', 'Lusen 1 EVO OUT'],
-        'Trinkwassertalsperre MERGED IN': ['Trinkwassertalsperre PYRO IN', 'Trinkwassertalsperre_MULTI IN'],
-        'Trinkwassertalsperre MERGED OUT': ['Trinkwassertalsperre PYRO OUT', 'Trinkwassertalsperre_MULTI OUT']
-    }
-
-    # Iterate over each item in the dictionary to merge columns
-    for new_col, cols in merge_dict.items():
-        # Combine the two columns into one using the first non-null value
-        df[new_col] = df[cols[0]].combine_first(df[cols[1]])
-
-    # Drop the original columns used for merging
-    cols_to_drop = [col for cols in merge_dict.values() for col in cols]
-    df = df.drop(columns=cols_to_drop)
+    print("Applied the sensor lifecycle: fixed values of replaced sensors and merged their columns")
 
     return df
 
@@ -348,6 +224,9 @@ def handle_outliers(df):
     """
     Transform to NaN every value higher than 800. During exploration we found that values over that are outliers. There were only 6 rows with any count over 800
 
+    The values are clipped on one compact 2-D block of all columns instead of a boolean mask frame, and the returned DataFrame
+    holds the counts as a single `sensor_count_dtype` block.
+
     Args:
         df (pandas.DataFrame): DataFrame with values to be turned to NaN.
 
@@ -355,45 +234,10 @@ def handle_outliers(df):
         pandas.DataFrame: The modified DataFrame with values over 800 turned to NaN
     """
 
-    df[df > 800] = np.nan
-
-    return df
-
-def merge_columns(df):
-    """
-    Merges columns from replaced sensors in the DataFrame into new combined columns based on a predefined mapping
-    and drops the original columns after merging. Additionally, drops columns with names containing "Fahrräder" or "Fußgänger" as we will not use that distinction.
-
-    Args:
-        df (pandas.DataFrame): A DataFrame containing columns to be merged.
+    values = df.to_numpy(dtype=sensor_count_dtype, copy=True)
+    values[values > 800] = np.nan
 
-    Returns:
-        pandas.DataFrame: The modified DataFrame with the new merged columns, original columns removed, and Fahrräder or Fußgänger columns dropped.
-    """
-    merge_dict = {
-        'Bucina MERGED IN': ['Bucina PYRO IN', 'Bucina_Multi IN'],
-        'Bucina MERGED OUT': ['Bucina PYRO OUT', 'Bucina_Multi OUT'],
-        'Falkenstein 1 MERGED IN': ['Falkenstein 1 PYRO IN', 'Falkenstein 1 IN'],
-        'Falkenstein 1 MERGED OUT': ['Falkenstein 1 PYRO OUT', 'Falkenstein 1 OUT'],
-        'Lusen 1 MERGED IN': ['Lusen 1 PYRO IN', 'Lusen 1 EVO IN'],
-        'Lusen 1 MERGED OUT': ['Lusen 1 PYRO OUT', 'Lusen 1 EVO OUT'],
-        'Trinkwassertalsperre MERGED IN': ['Trinkwassertalsperre PYRO IN', 'Trinkwassertalsperre_MULTI IN'],
-        'Trinkwassertalsperre MERGED OUT': ['Trinkwassertalsperre PYRO OUT', 'Trinkwassertalsperre_MULTI OUT']
-    }
-
-    # Iterate over each item in the dictionary to merge columns
-    for new_col, cols in merge_dict.items():
-        # Combine the two columns into one using the first non-null value
-        df[new_col] = df[cols[0]].combine_first(df[cols[1]])
-
-    # Drop the original columns used for merging
-    cols_to_drop = [col for cols in merge_dict.values() for col in cols]
-    df = df.drop(columns=cols_to_drop)
-
-    # Drop columns with names containing "Fahrräder" or "Fußgänger"
-    df = df.loc[:, ~df.columns.str.contains("Fahrräder|Fußgänger")]
-
-    return df
+    return pd.DataFrame(values, index=df.index, columns=df.columns, copy=False)
 
 def calculate_traffic_metrics_abs(df):
     """
@@ -410,40 +254,40 @@ def calculate_traffic_metrics_abs(df):
     Returns:
         pandas.DataFrame: The DataFrame with additional columns for absolute traffic metrics.
     """
-    # Calculate total traffic
-    df["traffic_abs"] = df.filter(regex='IN|OUT').sum(axis=1)
-
-    # Calculate sum of 'IN' columns
-    df["sum_IN_abs"] = df.filter(like='IN').sum(axis=1)
-
-    # Calculate sum of 'OUT' columns
-    df["sum_OUT_abs"] = df.filter(like='OUT').sum(axis=1)
+    # Map the totals to the columns containing 'IN' and/or 'OUT' in their names
+    traffic_metrics = SensorAggregation({
+        "traffic_abs": df.filter(regex='IN|OUT').columns.tolist(),
+        "sum_IN_abs": df.filter(like='IN').columns.tolist(),
+        "sum_OUT_abs": df.filter(like='OUT').columns.tolist(),
+    })
+
+    # Calculate all totals with one matrix multiplication over the sensor values
+    df = traffic_metrics.aggregate(df)
     
     return df
 
 
 def preprocess_visitor_count_data(visitor_counts: pd.DataFrame) -> pd.DataFrame:
 
-    visitor_counts_parsed_dates = parse_german_dates(df=visitor_counts, date_column_name="Time")
+    # Every step replaces `df`, so only the current copy of the sensor block is kept in memory
+    df = parse_german_dates(df=visitor_counts, date_column_name="Time")
     # Remove data before 2016-05-10 03:00:00 as there were no sensors installed
-    df = visitor_counts_parsed_dates[visitor_counts_parsed_dates['Time'] >= "2016-05-10 03:00:00"].reset_index(drop=True)
+    df = df[df['Time'] >= "2016-05-10 03:00:00"]
    
-    df_mapped = fix_columns_names(df)
+    df = fix_columns_names(df)
     
-    df_imputed_timestamps = correct_and_impute_times(df_mapped)
-
-    df_corrected_sensors = correct_non_replaced_sensors(df_imputed_timestamps)
-
-    df_corrected_sensors = correct_overlapping_sensor_data(df_corrected_sensors)
+    df = correct_and_impute_times(df)
 
-    df_merged_columns = merge_columns(df_corrected_sensors)
+    df = apply_sensor_lifecycle(df)
 
-    df_no_outliers = handle_outliers(df_merged_columns)
+    df = handle_outliers(df)
    
-    df_traffic_metrics = calculate_traffic_metrics_abs(df_no_outliers)
+    df = calculate_traffic_metrics_abs(df)
 
-    df_traffic_metrics.reset_index(inplace=True)
+    df = to_local_wall_clock(df)
+
+    df.reset_index(inplace=True)
 
     print("\nVisitor sensors data is preprocessed and overall traffic metrics were created! \n")
 
-    return df_traffic_metrics
+    return df
@@ -0,0 +1,90 @@
+"""
+Aggregate sensor columns to region and park totals with a sparse sensor-to-region incidence matrix.
+
+A mapping of group names (e.g. 'Rachel-Spiegelau IN') to sensor columns is compiled once into a sparse matrix with
+one row per sensor and one column per group. All group totals are then computed with a single matrix multiplication
+over the 2-D block of sensor values, independent of how many sensors and regions there are.
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+
+class SensorAggregation:
+    """Sensor-to-group mapping compiled into a sparse incidence matrix.
+
+    Attributes:
+        sensor_columns (list): The sensor columns, in the row order of the matrix.
+        group_names (list): The group names, in the column order of the matrix.
+        matrix (scipy.sparse.csr_matrix): Incidence matrix with a 1 where a sensor belongs to a group.
+    """
+
+    def __init__(self, groups: dict):
+        """
+        Compile the mapping of groups to sensor columns. Groups without any sensor are skipped.
+
+        Args:
+            groups (dict): Dictionary with the group names as keys and the lists of sensor columns as values.
+        """
+        self.group_names = [group for group, sensors in groups.items() if sensors]
+
+        # Every sensor gets one row, in order of first appearance in the mapping
+        self.sensor_columns = list(dict.fromkeys(
+            sensor for group in self.group_names for sensor in groups[group]
+        ))
+        sensor_position = {sensor: position for position, sensor in enumerate(self.sensor_columns)}
+
+        rows = [sensor_position[sensor] for group in self.group_names for sensor in groups[group]]
+        columns = [position for position, group in enumerate(self.group_names) for _ in groups[group]]
+
+        self.matrix = sparse.csr_matrix(
+            (np.ones(len(rows)), (rows, columns)),
+            shape=(len(self.sensor_columns), len(self.group_names))
+        )
+        # A sensor listed twice in a group is still counted once
+        self.matrix.data[:] = 1.0
+
+    def aggregate_values(self, values: np.ndarray, min_count: int = 0) -> np.ndarray:
+        """
+        Sum the sensor values of every group, skipping missing values like `DataFrame.sum(axis=1, min_count=...)`.
+
+        Args:
+            values (np.ndarray): 2-D float array (e.g. float32) with one column per sensor in the order of `sensor_columns`.
+            min_count (int, optional): Minimum number of non-missing values for a total, otherwise it is NaN.
+
+        Returns:
+            np.ndarray: 2-D array of the same dtype with one column per group in the order of `group_names`.
+        """
+        matrix = self.matrix.astype(values.dtype, copy=False)
+
+        is_missing = np.isnan(values)
+        totals = np.asarray(np.where(is_missing, values.dtype.type(0), values) @ matrix)
+
+        if min_count > 0:
+            counts = np.asarray((~is_missing).astype(values.dtype) @ matrix)
+            totals[counts < min_count] = np.nan
+
+        return totals
+
+    def aggregate(self, df: pd.DataFrame, min_count: int = 0) -> pd.DataFrame:
+        """
+        Add one column per group with the sum of its sensor columns to the DataFrame.
+
+        Args:
+            df (pd.DataFrame): DataFrame containing all sensor columns.
+            min_count (int, optional): Minimum number of non-missing values for a total, otherwise it is NaN.
+
+        Returns:
+            pd.DataFrame: The DataFrame with the group totals added (existing columns are overwritten). Float sensor
+            columns keep their dtype in the totals.
+        """
+        values = df[self.sensor_columns].to_numpy()
+        if not np.issubdtype(values.dtype, np.floating):
+            values = values.astype(np.float64)
+        totals = self.aggregate_values(values, min_count=min_count)
+
+        for position, group in enumerate(self.group_names):
+            df[group] = totals[:, position]
+
+        return df
@@ -0,0 +1,107 @@
+"""
+Apply the lifecycle of the visitor sensors (replacements and merges) to the hourly sensor data.
+
+The lifecycle table in `src.config` lists for every sensor column the interval in which its counts are valid and the
+column it is merged into, if any. The table is compiled once into arrays of interval bounds and merge positions. All
+rules are then applied with one masking pass and one coalescing pass over the 2-D block of sensor values, so a new
+sensor swap only needs a new row in the table.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class SensorLifecycle:
+    """Sensor lifecycle table compiled into interval bounds and merge positions.
+
+    Attributes:
+        sensor_columns (list): The sensor columns, in the column order of the compiled arrays.
+        valid_from (np.ndarray): First valid hour of every sensor as datetime64[ns] (minimum datetime if open).
+        valid_to (np.ndarray): First hour that is not valid anymore for every sensor (maximum datetime if open).
+        merged_sensors (list): The sensor columns that are merged into other columns.
+        merged_columns (list): The merged columns, in order of first appearance in the table.
+        merge_ranks (list): For every rank of preference, the positions of the merged columns and their sensors.
+    """
+
+    def __init__(self, lifecycle: list):
+        """
+        Compile the lifecycle table.
+
+        Args:
+            lifecycle (list): Rows of (sensor, valid_from, valid_to, merged_into), with None for open bounds and
+                sensors that are not merged.
+        """
+        table = pd.DataFrame(lifecycle, columns=['sensor', 'valid_from', 'valid_to', 'merged_into'])
+
+        self.sensor_columns = table['sensor'].tolist()
+        self.valid_from = pd.to_datetime(table['valid_from']).fillna(pd.Timestamp.min).to_numpy(dtype="datetime64[ns]")
+        self.valid_to = pd.to_datetime(table['valid_to']).fillna(pd.Timestamp.max).to_numpy(dtype="datetime64[ns]")
+
+        merged = table.dropna(subset=['merged_into'])
+        self.merged_sensors = merged['sensor'].tolist()
+        self.merged_columns = list(dict.fromkeys(merged['merged_into']))
+
+        # The n-th sensor of every merged column has rank n, the sensors of one rank are coalesced at once
+        merged_position = merged['merged_into'].map({column: position for position, column in enumerate(self.merged_columns)})
+        rank = merged.groupby('merged_into').cumcount()
+        self.merge_ranks = [
+            (merged_position[rank == r].to_numpy(), merged.index[rank == r].to_numpy())
+            for r in range(rank.max() + 1 if len(merged) else 0)
+        ]
+
+    def apply_values(self, times: np.ndarray, values: np.ndarray) -> tuple:
+        """
+        Set the values outside of the valid interval of every sensor to NaN and coalesce the merged columns.
+
+        Args:
+            times (np.ndarray): 1-D datetime64[ns] array with the time of every row.
+            values (np.ndarray): 2-D float array (e.g. float32) with one column per sensor in the order of
+                `sensor_columns`. It is masked in place.
+
+        Returns:
+            tuple: The masked values and a 2-D array of the same dtype with one column per merged column in the
+            order of `merged_columns`.
+        """
+        times = times[:, np.newaxis]
+        values[(times < self.valid_from) | (times >= self.valid_to)] = np.nan
+
+        merged = np.full((len(values), len(self.merged_columns)), np.nan, dtype=values.dtype)
+        for merged_positions, sensor_positions in self.merge_ranks:
+            current = merged[:, merged_positions]
+            merged[:, merged_positions] = np.where(np.isnan(current), values[:, sensor_positions], current)
+
+        return values, merged
+
+    def apply(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Apply the lifecycle to a DataFrame with a DatetimeIndex. The sensors that are merged are replaced by the
+        merged columns, which are added at the end. Float sensor columns keep their dtype.
+
+        Args:
+            df (pd.DataFrame): DataFrame with a DatetimeIndex containing all sensor columns. A localized index is compared in
+                local (wall clock) time, like the dates of the table.
+
+        Returns:
+            pd.DataFrame: The DataFrame with the masked sensor columns and the merged columns.
+        """
+        values = _to_float_block(df[self.sensor_columns])
+        times = df.index.tz_localize(None) if df.index.tz is not None else df.index
+        values, merged = self.apply_values(times.to_numpy(dtype="datetime64[ns]"), values)
+
+        df[self.sensor_columns] = values
+
+        # Delete the merged sensors in place, as dropping them would copy all other columns
+        for column in self.merged_sensors:
+            del df[column]
+        for position, column in enumerate(self.merged_columns):
+            df[column] = merged[:, position]
+
+        return df
+
+
+def _to_float_block(df: pd.DataFrame) -> np.ndarray:
+    """Copy the columns into one 2-D float array, keeping compact float dtypes such as float32."""
+    values = df.to_numpy(copy=True)
+    if not np.issubdtype(values.dtype, np.floating):
+        values = values.astype(np.float64)
+    return values
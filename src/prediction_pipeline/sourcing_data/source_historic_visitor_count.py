@@ -101,6 +101,9 @@ common_columns = ['Time',
  'Wistlberg Fußgänger IN',
  'Wistlberg Fußgänger OUT']
 
+# Hourly counts are stored as float32 (exact for counts below 2**24, NaN for missing hours) instead of float64
+sensor_count_dtype = "float32"
+
 
 def source_historic_visitor_count():
     """Source historic visitor count data from the cloud."""
@@ -112,7 +115,8 @@ def source_historic_visitor_count():
         source_folder=raw_data_folder + "/" + visitor_counts_folder,
         read_options={
             "skiprows": 2,
-            "usecols": common_columns
+            "usecols": common_columns,
+            "dtype": dict.fromkeys(common_columns[1:], sensor_count_dtype)
         }
     )
 
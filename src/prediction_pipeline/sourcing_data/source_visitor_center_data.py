@@ -1,13 +1,13 @@
 import pandas as pd
 from src.utils import read_dataframe_from_azure
+from src.workbook_ingestion import read_workbook
+from src.prediction_pipeline.pre_processing.preprocess_visitor_center_data import expand_daily_to_hourly, daily_folder, daily_file_name
 
 
 def source_visitor_center_data():
-    # Source data - this is the preprocessed data
-    sourced_visitor_count_data = read_dataframe_from_azure(
-        file_name="04022026-daily-visitor-centers-huts-openings-historic-visitor-counts-vacation-holidays-weather-station-2017-2026.xlsx",
-        file_format="xlsx",
-        source_folder="raw-data",
+    # Source data - the workbook is parsed once per upload and read from its parquet copy afterwards
+    sourced_visitor_count_data = read_workbook(
+        blob_name="raw-data/04022026-daily-visitor-centers-huts-openings-historic-visitor-counts-vacation-holidays-weather-station-2017-2026.xlsx",
     )
 
     return sourced_visitor_count_data
@@ -15,18 +15,21 @@ def source_visitor_center_data():
 def source_preprocessed_hourly_visitor_center_data():
 
     """
-    Load the preprocessed hourly visitor center data from the cloud.
+    Load the preprocessed daily visitor center data from the cloud and expand it to all hours of its days.
     """
 
     print("Sourcing the historic preprocessed_hourly_visitor_center_data")
 
-    # Load visitor count data from the cloud
-    preprocessed_hourly_visitor_center_data = read_dataframe_from_azure(
-        file_name="visitor_centers_hourly_2017_to_2026.parquet",
+    # Load the daily visitor center data from the cloud
+    preprocessed_daily_visitor_center_data = read_dataframe_from_azure(
+        file_name=daily_file_name,
         file_format="parquet",
-        source_folder="preprocessed_data",
+        source_folder=daily_folder,
     )
 
+    # Gather the daily rows for all hours
+    preprocessed_hourly_visitor_center_data = expand_daily_to_hourly(preprocessed_daily_visitor_center_data)
+
     print(f"The historic preprocessed_hourly_visitor_center_data is: {preprocessed_hourly_visitor_center_data}")
 
     return preprocessed_hourly_visitor_center_data
\ No newline at end of file
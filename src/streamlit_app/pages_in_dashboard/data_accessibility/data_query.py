@@ -0,0 +1,123 @@
+"""
+Structured query model of the Data Access page.
+
+A `DataQuery` holds everything the query section selects (category, properties, sensors, time filters and an optional
+aggregation). It is passed unchanged from the UI to the executor (`data_retrieval.execute_query`), and the sentence
+shown in the query selection is generated from it, so the query never has to be parsed back from its display string.
+"""
+
+import datetime
+
+from src.calendar_features import month_names, season_names
+
+
+###########################################################################################
+# GLOBAL VARIABLES
+###########################################################################################
+
+# Categories whose queried columns are the selected properties, for the others they are the selected sensors
+property_categories = ['weather', 'parking']
+
+# Supported aggregations and the time frequencies they aggregate to
+aggregations = ['sum', 'mean', 'min', 'max']
+frequencies = {'hour': 'hourly', 'day': 'daily', 'week': 'weekly', 'month': 'monthly', 'year': 'yearly'}
+
+
+###########################################################################################
+# Query model
+###########################################################################################
+
+class DataQuery:
+    """A query of the Data Access page.
+
+    Attributes:
+        category (str): The data category ('weather', 'parking', 'visitor_sensors' or 'visitor_centers').
+        properties (list): The queried properties (e.g. 'Temperature (°C)' or 'occupancy').
+        sensors (list): The queried sensors. For 'parking' the single parking sensor whose data is queried, for the
+            visitor categories the queried sensor columns.
+        start_date (datetime.date): First day of the queried time range, or None.
+        end_date (datetime.date): Last day of the queried time range (inclusive), or None.
+        month (int): Queried month number (1-12), or None.
+        season (int): Queried season code (0: winter, 1: spring, 2: summer, 3: fall), or None.
+        year (int): Queried year, or None.
+        aggregation (str): Aggregation of the values per `frequency` (one of `aggregations`), or None for the raw
+            hourly values.
+        frequency (str): Time frequency of the aggregation (a key of `frequencies`).
+    """
+
+    def __init__(self, category: str, properties: list = None, sensors: list = None,
+                 start_date: datetime.date = None, end_date: datetime.date = None,
+                 month: int = None, season: int = None, year: int = None,
+                 aggregation: str = None, frequency: str = 'day'):
+        """
+        Define a query.
+
+        Raises:
+            ValueError: If the aggregation or frequency is not supported, or the time range is reversed.
+        """
+        if aggregation is not None and aggregation not in aggregations:
+            raise ValueError(f"Unsupported aggregation: {aggregation}. Must be one of {aggregations}.")
+        if frequency not in frequencies:
+            raise ValueError(f"Unsupported frequency: {frequency}. Must be one of {list(frequencies)}.")
+        if start_date is not None and end_date is not None and start_date > end_date:
+            raise ValueError("The end date must fall after the start date.")
+
+        self.category = category
+        self.properties = list(properties or [])
+        self.sensors = list(sensors or [])
+        self.start_date = start_date
+        self.end_date = end_date
+        self.month = month
+        self.season = season
+        self.year = year
+        self.aggregation = aggregation
+        self.frequency = frequency
+
+    @property
+    def columns(self) -> list:
+        """The value columns of the category dataset that are queried."""
+        return self.properties if self.category in property_categories else self.sensors
+
+    @property
+    def dataset_sensor(self) -> str:
+        """The sensor whose dataset is queried (only parking data is stored per sensor)."""
+        return self.sensors[0] if self.category == 'parking' and self.sensors else None
+
+    @property
+    def key(self) -> tuple:
+        """The fields of the query, which identify its result for a version of the dataset."""
+        return (
+            self.category, tuple(self.properties), tuple(self.sensors), self.start_date, self.end_date,
+            self.month, self.season, self.year, self.aggregation, self.frequency,
+        )
+
+    def describe(self) -> str:
+        """Generate the sentence of the query shown in the query selection."""
+        values = ", ".join(self.columns)
+        if self.aggregation is not None:
+            sentence = f"What is the {frequencies[self.frequency]} {self.aggregation} of the {values} value"
+        else:
+            sentence = f"What is the {values} value"
+
+        if self.category == 'parking' and self.dataset_sensor:
+            sentence += f" for the sensor {self.dataset_sensor}"
+
+        if self.start_date is not None and self.end_date is not None:
+            sentence += f" from {self.start_date:%d.%m.%Y} to {self.end_date:%d.%m.%Y}"
+        if self.month is not None:
+            sentence += f" for the month of {month_names['en'][self.month - 1]}"
+        if self.season is not None:
+            sentence += f" for the season of {season_names['en'][self.season]}"
+        if self.year is not None:
+            sentence += f" for the year {self.year}"
+
+        return sentence + "?"
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, DataQuery) and self.key == other.key
+
+    def __hash__(self) -> int:
+        return hash(self.key)
+
+    def __repr__(self) -> str:
+        return f"DataQuery({self.describe()!r})"
@@ -2,397 +2,92 @@
 # import the required libraries
 import streamlit as st
 import pandas as pd
-import re
 from src.config import storage_options, CONTAINER_NAME, CONNECTION_STRING
 from src.utils import read_dataframe_from_azure
-from azure.storage.blob import BlobServiceClient  
-
-
-# Types of queries that the functions will use to know what data to retrieve
-
-query_types = {
-    'type1': ['What is the property value for the sensor sensor from start_date to end_date?' ,
-             ['property','sensor','start_date','end_date']
-    ],
-    'type2': [
-        'What is the property value for the sensor sensor for the month of month for the year year?',
-        ['property', 'sensor', 'month', 'year']
-    ],
-    'type3': [
-        'What is the property value for the sensor sensor for the season of season for the year year?',
-        ['property', 'sensor', 'season', 'year']
-    ],
-    'type4': [
-        'What is the property value from start_date to end_date?',
-        ['property', 'start_date', 'end_date']
-    ],
-    'type5': [
-        'What is the property value for the month of month for the year year?',
-        ['property', 'month', 'year']
-    ],
-    'type6': [
-        'What is the property value for the season of season for the year year?',
-        ['property', 'season', 'year']
-    ]
-}
-
-def convert_number_to_month_name(month):
-
-    """
-    Convert a month number (1-12) to its corresponding month name.
+from src.workbook_ingestion import read_workbook
+from src.streamlit_app.pages_in_dashboard.data_accessibility.query_engine import (
+    dataset_exists, materialize_dataset, get_dataset_columns, run_query
+)
+from src.streamlit_app.pages_in_dashboard.data_accessibility.data_query import DataQuery
+from azure.storage.blob import BlobServiceClient, BlobClient
 
-    Parameters:
-        month (int): The month number.
-
-    Returns:
-        str: The name of the month.
-    """
 
-    month_dict = {1: 'January', 2: 'February', 3: 'March', 4: 'April',
-                   5: 'May', 6: 'June', 7: 'July', 8: 'August', 
-                   9: 'September', 10: 'October', 11: 'November', 12: 'December'}
-    
-    return month_dict[month]
+# Source blobs of the categories
+visitor_sensors_blob_name = "preprocessed_data/preprocessed_visitor_count_sensors_data.parquet"
+weather_folder = "preprocessed_data/bf_preprocessed_files/weather"
+visitor_centers_folder = "preprocessed_data/bf_preprocessed_files/visitor_centers"
+parking_folder = "preprocessed_data/preprocessed_parking_data/merged_parking_data"
 
-def convert_number_to_season_name(season):
-    season_dict = {1: 'Winter', 2: 'Spring', 3: 'Summer', 4: 'Fall'}
-    return season_dict[season]
+# Number of query results held in memory. Results are keyed by the dataset version and the query, so a new version
+# of a category never serves an outdated result.
+query_cache_entries = 32
 
-def extract_values_according_to_type(selected_query,type):
-    """Extract values from a query string based on the specified query type.
 
-    This function uses regular expressions to extract relevant values from the 
-    `selected_query` string according to the specified `type`. The extracted values
-    may include properties, sensors, dates, months, seasons, and years, depending on the type.
-
-    Args:
-        selected_query (str): The selected query string from which to extract values.
-        type (str): The type of the query. Options include:
-            - 'type1': Query for date range.
-            - 'type2': Query for month and year.
-            - 'type3': Query for season and year.
-            - 'type4': Query for date range (weather category).
-            - 'type5': Query for month and year (weather category).
-            - 'type6': Query for season and year (weather category).
-
-    Returns:
-        dict: A dictionary containing the extracted values, where keys are based on
-              the field names specified in `query_types`, including:
-              - 'property'
-              - 'sensor'
-              - 'month'
-              - 'season'
-              - 'year'
-              - 'start_date'
-              - 'end_date'
-
-    Raises:
-        AttributeError: If the expected regex match is not found in the selected_query.
-    """
-
-    if selected_query == None:
-        return None
-    
-    if type == 'type1':
-        property = re.search(r'What is the (.+?) value', selected_query).group(1)
-        sensor = re.search(r'for the sensor (.+?) from', selected_query).group(1)
-        start_date = re.search(r'from (.+?) to', selected_query).group(1)
-        end_date = re.search(r'to (.+?)\?', selected_query).group(1)
-        extracted_values = [property, sensor, start_date, end_date]
-    elif type == 'type2':
-        property = re.search(r'What is the (.+?) value', selected_query).group(1)
-        sensor = re.search(r'for the sensor (.+?) for the month of', selected_query).group(1)
-        month = re.search(r'for the month of (.+?) ', selected_query).group(1)
-        year = re.search(r'for the year (.+?)\?', selected_query).group(1)
-        extracted_values = [property, sensor]
-        
-    elif type == 'type3':
-        property = re.search(r'What is the (.+?) value', selected_query).group(1)
-        sensor = re.search(r'for the sensor (.+?) for the season of', selected_query).group(1)
-        season = re.search(r'for the season of (.+?) for', selected_query).group(1)
-        year = re.search(r'for the year (.+?)\?', selected_query).group(1)
-        extracted_values = [property, sensor]
-
-    elif type == 'type4':
-        property = re.search(r'What is the (.+?) value', selected_query).group(1)
-        start_date = re.search(r'from (.+?) to', selected_query).group(1)
-        end_date = re.search(r'to (.+?)\?', selected_query).group(1)
-        extracted_values = [property, start_date, end_date]
-
-    elif type == 'type5':
-        property = re.search(r'What is the (.+?) value', selected_query).group(1)
-        month = re.search(r'for the month of (.+?) for the year', selected_query).group(1)
-        year = re.search(r'for the year (.+?)\?', selected_query).group(1)
-        extracted_values = [property]
-
-    elif type == 'type6':
-        property = re.search(r'What is the (.+?) value', selected_query).group(1)
-        season = re.search(r'for the season of (.+?) for the year', selected_query).group(1)
-        year = re.search(r'for the year (.+?)\?', selected_query).group(1)
-        extracted_values = [property]
-
-
-    # Get the structure from query_types for 'type1'
-    type_struc = query_types[type][1] 
-
-    # Map the extracted values to the keys in the structure
-    result = {key: value for key, value in zip(type_struc, extracted_values)}
-
-    return result
-
-
-def get_queried_df(processed_category_df, get_values, type, selected_category, start_date, end_date):
-   
-    """Retrieve a filtered DataFrame based on the selected category and query type.
-
-    This function filters the input DataFrame `processed_category_df` according to the
-    specified `selected_category` and `type`. It uses values provided in the `get_values`
-    dictionary to perform the filtering.
-
-    Args:
-        processed_category_df (pd.DataFrame): The DataFrame containing processed data.
-        get_values (dict): A dictionary containing values for filtering, including:
-            - 'property' (str): The property to select from the DataFrame.
-            - 'start_date' (str): Start date for filtering (format: 'YYYY-MM-DD').
-            - 'end_date' (str): End date for filtering (format: 'YYYY-MM-DD').
-            - 'month' (int): Month for filtering.
-            - 'year' (int): Year for filtering.
-            - 'season' (str): Season for filtering (e.g., 'spring', 'summer').
-        type (str): The type of query to perform. Options include:
-            - 'type1': Filter by date range.
-            - 'type2': Filter by month and year.
-            - 'type3': Filter by season and year.
-            - 'type4': Filter by date range (weather category).
-            - 'type5': Filter by month and year (weather category).
-            - 'type6': Filter by season and year (weather category).
-        selected_category (str): The category to filter by. Options include:
-            - 'parking'
-            - 'weather'
-            - 'visitor_centers'
-            - 'visitor_sensors'
-
-    Returns:
-        pd.DataFrame: A DataFrame containing the filtered data for the specified property.
-
-    Raises:
-        KeyError: If 'property' is not in `get_values`.
-        ValueError: If an invalid type or selected_category is provided.
-    """
-
-    if get_values is None:
-        start_date = pd.to_datetime(start_date)
-        end_date = pd.to_datetime(end_date)
-        queried_df = processed_category_df[
-            (processed_category_df.index.date >= start_date.date()) &
-            (processed_category_df.index.date <= end_date.date())
-        ]
-        return queried_df
-
-    # get the property value from the get values dictionary
-    if 'property' in get_values:
-        property_value = get_values['property']
-    
-    # Implement filtering logic based on selected_category and type
-
-    if selected_category == 'parking':
-        
-        if type == 'type1':
-            start_date = pd.to_datetime(get_values['start_date'])
-            end_date = pd.to_datetime(get_values['end_date'])
-            queried_df = processed_category_df[
-                (processed_category_df.index.date >= start_date.date()) &
-                (processed_category_df.index.date <= end_date.date())
-            ]
-            queried_df = queried_df[[property_value]]
-            return queried_df  
-        
-        if type == 'type2':
-            month = get_values['month']
-            year = int(get_values['year'])
-            queried_df = processed_category_df[
-                (processed_category_df['month'] == month) &
-                (processed_category_df['year'] == year)
-            ]
-            queried_df = queried_df[[property_value]]
-            return queried_df
-                
-        if type == 'type3':
-            season = get_values['season']
-            year = int(get_values['year'])
-            queried_df = processed_category_df[
-                (processed_category_df['season'] == season) &
-                (processed_category_df['year'] == year)
-            ]
-            queried_df = queried_df[[property_value]]
-            return queried_df
-        
-    if selected_category == 'weather':
-        if type == 'type4':
-            start_date = pd.to_datetime(get_values['start_date'])
-            end_date = pd.to_datetime(get_values['end_date'])
-            queried_df = processed_category_df[
-                (processed_category_df.index.date >= start_date.date()) &
-                (processed_category_df.index.date <= end_date.date())
-            ]
-            queried_df = queried_df[[property_value]]
-            return queried_df
-        
-        if type == 'type5':
-            month = get_values['month']
-            year = int(get_values['year'])
-            queried_df = processed_category_df[
-                (processed_category_df['month'] == month) &
-                (processed_category_df['year'] == year)
-            ]
-            queried_df = queried_df[[property_value]]
-            return queried_df
-
-        if type == 'type6':
-            season = get_values['season']
-            year = int(get_values['year'])
-            queried_df = processed_category_df[
-                (processed_category_df['season'] == season) &
-                (processed_category_df['year'] == year)
-            ]
-            queried_df = queried_df[[property_value]]
-            return queried_df
-
-    if selected_category == 'visitor_centers' or selected_category == 'visitor_sensors':
-        if type == 'type4':
-            start_date = pd.to_datetime(get_values['start_date'])
-            end_date = pd.to_datetime(get_values['end_date'])
-            queried_df = processed_category_df[
-                (processed_category_df.index.date >= start_date.date()) &
-                (processed_category_df.index.date <= end_date.date())
-            ]
-            queried_df = queried_df[[property_value]]
-            return queried_df
-        
-        if type == 'type5':
-            month = get_values['month']
-            year = int(get_values['year'])
-            queried_df = processed_category_df[
-                (processed_category_df['month'] == month) &
-                (processed_category_df['year'] == year)
-            ]
-            queried_df = queried_df[[property_value]]
-            return queried_df
-
-        if type == 'type6':
-            season = get_values['season']
-            year = int(get_values['year'])
-            queried_df = processed_category_df[
-                (processed_category_df['season'] == season) &
-                (processed_category_df['year'] == year)
-            ]
-            queried_df = queried_df[[property_value]]
-            return queried_df
-        
-def create_temporal_columns(df):
-
-    """Create temporal columns from the DataFrame index.
-
-    This function takes a DataFrame with a datetime index and creates additional
-    columns for month names, year, and season based on the index.
+def get_latest_blob(folder: str, extensions: tuple = None):
+    """Get the most recently modified blob in a folder, optionally only blobs with the given extensions.
 
     Args:
-        df (pd.DataFrame): The input DataFrame with a datetime index.
+        folder (str): The folder (name prefix) of the blobs.
+        extensions (tuple, optional): The allowed file extensions, e.g. ('.xlsx', '.xls'). Defaults to all blobs.
 
     Returns:
-        pd.DataFrame: The original DataFrame with added columns:
-            - 'month': The name of the month corresponding to the index.
-            - 'year': The year extracted from the index.
-            - 'season': The name of the season corresponding to the index.
-
-    Raises:
-        ValueError: If the index of the DataFrame cannot be converted to datetime.
+        azure.storage.blob.BlobProperties: The properties (name, ETag, last modified) of the latest blob, or None
+        if the folder has no such blob.
     """
 
-    df.index = pd.to_datetime(df.index)
-
-    # make a new column called 'month' from the index
-    df['month'] = df.index.month
-
-    # convert the numbers in the months column to the month names from the
-    df['month'] = df['month'].apply(convert_number_to_month_name)
+    blob_service_client = BlobServiceClient.from_connection_string(CONNECTION_STRING)
+    container_client = blob_service_client.get_container_client(CONTAINER_NAME)
 
-    # make a new column called 'year' from the index
-    df['year'] = df.index.year
+    # Get blobs with metadata (including last_modified)
+    blobs = [
+        blob
+        for blob in container_client.list_blobs(name_starts_with=folder)
+        if extensions is None or blob.name.lower().endswith(extensions)
+    ]
 
-    # make a new column called 'season' from the index
-    df['season'] = (df.index.month%12 + 3)//3
-    # convert the numbers in the season column to the season names
+    if not blobs:
+        return None
 
-    df['season'] = df['season'].apply(convert_number_to_season_name)
+    return max(blobs, key=lambda x: x.last_modified)
 
-    return df
+def get_visitor_centers_data(blob_name, etag=None):
+    """Fetches visitor centers data from an Excel file.
 
-def get_visitor_centers_data():
-    """Fetches visitor centers data from the most recently modified Excel file.
+    The workbook is read through its parquet copy, which is created on
+    the first read of every upload.
 
-    This function retrieves visitor centers data from a specified Excel file
-    in Azure. It selects the last object from the provided list of objects
-    that is an Excel file (with extensions '.xlsx' or '.xls'), assuming this
-    is the most recently modified Excel file.
+    Args:
+        blob_name (str): The name of the Excel file in the container.
+        etag (str, optional): The ETag of the Excel file, if already known.
 
     Returns:
         pandas.DataFrame: A DataFrame containing the visitor centers
-        data read from the Excel file.
+        data read from the Excel file, indexed by the date.
     """
 
-    blob_service_client = BlobServiceClient.from_connection_string(CONNECTION_STRING)
-    container_client = blob_service_client.get_container_client(CONTAINER_NAME)
-    
-    # Get blobs with metadata (including last_modified)
-    blobs = list(container_client.list_blobs(name_starts_with="preprocessed_data/bf_preprocessed_files/visitor_centers"))
-    
-    if not blobs:
-        return None
-    
-    excel_objects = [
-        obj
-        for obj in blobs
-        if obj.name.lower().endswith(('.xlsx', '.xls'))
-    ]
-
-    if not excel_objects:
-        raise ValueError("No visitor center data found!")
-    
-    # Sort by last_modified (newest first) and return the latest
-    latest_blob = max(excel_objects, key=lambda x: x.last_modified).name
+    print(f"Fetching visitor centers data from: az://{CONTAINER_NAME}/{blob_name}")
 
-    AZURE_FILE_URL = f"az://{CONTAINER_NAME}/{latest_blob}"
-    print(f"Fetching visitor centers data from: {AZURE_FILE_URL}")
-
-    df = pd.read_excel(
-        AZURE_FILE_URL,
-        storage_options=storage_options,
-        skipfooter=1
+    # The workbook is parsed once per upload (ETag) and read from its parquet copy afterwards
+    df = read_workbook(
+        blob_name=blob_name,
+        read_options={"skipfooter": 1},
+        etag=etag,
     )
-    return df
+    return df.set_index('Datum')
+
 
+def get_weather_data(blob_name):
 
-def get_weather_data():
+    """Fetches weather data from a Parquet file.
 
-    """Fetches weather data from the most recently modified object.
+    Args:
+        blob_name (str): The name of the Parquet file in the container.
 
     Returns:
         pandas.DataFrame: A DataFrame containing the weather data read from the Parquet file.
     """
 
-    blob_service_client = BlobServiceClient.from_connection_string(CONNECTION_STRING)
-    container_client = blob_service_client.get_container_client(CONTAINER_NAME)
-    
-    # Get blobs with metadata (including last_modified)
-    blobs = list(container_client.list_blobs(name_starts_with="preprocessed_data/bf_preprocessed_files/weather"))
-    
-    if not blobs:
-        return None
-    
-    # Sort by last_modified (newest first) and return the latest
-    latest_blob = max(blobs, key=lambda x: x.last_modified).name
-
-    AZURE_FILE_URL = f"az://{CONTAINER_NAME}/{latest_blob}"
+    AZURE_FILE_URL = f"az://{CONTAINER_NAME}/{blob_name}"
     print(f"Fetching weather data from: {AZURE_FILE_URL}")
 
     df = pd.read_parquet(
@@ -426,109 +121,153 @@ def get_parking_data_for_selected_sensor(selected_sensor):
     return df
 
 
-def parse_german_dates_regex(
-    df: pd.DataFrame,
-    date_column_name: str
-) -> pd.DataFrame:
+@st.cache_data(ttl=300)
+def get_category_source(selected_category, selected_sensor=None):
+
+    """Get the source blob of a category and its current version.
+
+    The lookup is cached for a few minutes, so that running queries does not
+    list the container every time.
+
+    Args:
+        selected_category (str): The category of the data.
+        selected_sensor (str, optional): The parking sensor (only for 'parking').
+
+    Returns:
+        tuple: The name and the ETag of the source blob.
+
+    Raises:
+        ValueError: If no source data is found for the category.
     """
-    Parses German dates in the specified date column of the DataFrame using regex,
-    including hours and minutes if available.
+
+    if selected_category in ('visitor_sensors', 'parking'):
+        if selected_category == 'visitor_sensors':
+            blob_name = visitor_sensors_blob_name
+        else:
+            blob_name = f"{parking_folder}/{selected_sensor}.csv"
+        blob_client = BlobClient.from_connection_string(
+            conn_str=CONNECTION_STRING,
+            container_name=CONTAINER_NAME,
+            blob_name=blob_name
+        )
+        return blob_name, blob_client.get_blob_properties().etag.strip('"')
+
+    if selected_category == 'weather':
+        latest_blob = get_latest_blob(weather_folder)
+    elif selected_category == 'visitor_centers':
+        latest_blob = get_latest_blob(visitor_centers_folder, extensions=('.xlsx', '.xls'))
+    else:
+        raise ValueError(f"Unknown category: {selected_category}")
+
+    if latest_blob is None:
+        raise ValueError(f"No {selected_category} data found!")
+
+    return latest_blob.name, latest_blob.etag.strip('"')
+
+
+def get_category_dataset(selected_category, selected_sensor=None):
+
+    """Get the local query dataset of a category, downloading it only if its source changed.
 
     Args:
-        df (pd.DataFrame): The DataFrame containing the date column.
-        date_column_name (str): The name of the date column.
+        selected_category (str): The category of the data.
+        selected_sensor (str, optional): The parking sensor (only for 'parking').
 
     Returns:
-        pd.DataFrame: The DataFrame with parsed German dates.
+        tuple: The name and the version of the dataset in the query engine.
     """
-    
-    # Define a mapping of German month names to their numeric values
-    month_map = {
-        "Jan.": "01",
-        "Feb.": "02",
-        "März": "03",
-        "Apr.": "04",
-        "Mai": "05",
-        "Juni": "06",
-        "Juli": "07",
-        "Aug.": "08",
-        "Sep.": "09",
-        "Okt.": "10",
-        "Nov.": "11",
-        "Dez.": "12"
-    }
-
-    # Create a regex pattern for replacing months and capturing time
-    pattern = re.compile(r'(\d{1,2})\.\s*(' + '|'.join(month_map.keys()) + r')\s*(\d{4})\s*(\d{2}):(\d{2})')
-
-    # Function to replace the month in the matched string and keep the time part
-    def replace_month(match):
-        day = match.group(1)
-        month = month_map[match.group(2)]
-        year = match.group(3)
-        hour = match.group(4)
-        minute = match.group(5)
-        return f"{year}-{month}-{day} {hour}:{minute}:00"
-
-    # Apply regex replacement and convert to datetime
-    df[date_column_name] = df[date_column_name].apply(lambda x: replace_month(pattern.search(x)) if pattern.search(x) else x)
-    df[date_column_name] = pd.to_datetime(df[date_column_name], errors='coerce')
 
-    return df
+    blob_name, etag = get_category_source(selected_category, selected_sensor)
+    dataset_name = selected_category if selected_category != 'parking' else f"parking/{selected_sensor}"
+
+    if not dataset_exists(dataset_name, etag):
+        if selected_category == 'visitor_sensors':
+            category_df = read_dataframe_from_azure(
+                file_name=visitor_sensors_blob_name.split('/')[-1],
+                file_format="parquet",
+                source_folder=visitor_sensors_blob_name.rsplit('/', 1)[0],
+            ).set_index('Time')
+        elif selected_category == 'parking':
+            category_df = get_parking_data_for_selected_sensor(selected_sensor)
+        elif selected_category == 'weather':
+            category_df = get_weather_data(blob_name)
+        else:
+            category_df = get_visitor_centers_data(blob_name, etag)
 
-@st.cache_data(max_entries=1)
-def get_data_from_query(selected_category,selected_query,selected_query_type, start_date, end_date, selected_sensors):
+        materialize_dataset(category_df, dataset_name, etag)
 
-    """Retrieve data based on the selected category and query.
+    return dataset_name, etag
 
-    This function extracts values from the provided query, retrieves data from the cloud based on the selected category, processes the data, and returns a DataFrame
-    containing the queried information.
+
+def get_category_columns(selected_category, selected_sensor=None):
+
+    """Get the value columns of a category (e.g. the visitor sensors), read from the schema only.
 
     Args:
-        selected_category (str): The category of data to retrieve. Options include:
-            - 'visitor_sensors'
-            - 'parking'
-            - 'weather'
-            - 'visitor_centers'
-        selected_query (str): The query string used to extract specific values.
-        selected_query_type (str): The type of the query, which determines the 
-            format of the expected values.
+        selected_category (str): The category of the data.
+        selected_sensor (str, optional): The parking sensor (only for 'parking').
 
     Returns:
-        pd.DataFrame: A DataFrame containing the filtered data based on the query.
+        list: The value columns.
+    """
 
-    Raises:
-        ValueError: If the selected category is not recognized.
-        KeyError: If the expected values are not found in the query.
+    return get_dataset_columns(*get_category_dataset(selected_category, selected_sensor))
+
+
+@st.cache_data(max_entries=query_cache_entries)
+def get_query_result(dataset_name, version, query_key, _query: DataQuery):
+
+    """Run a query on a dataset version, caching the result per version and query.
+
+    Args:
+        dataset_name (str): The name of the dataset in the query engine.
+        version (str): The version of the dataset.
+        query_key (tuple): The key of the query (`DataQuery.key`), part of the cache key.
+        _query (DataQuery): The query (not hashed, it is identified by its key).
+
+    Returns:
+        pd.DataFrame: The queried columns with the time as index.
     """
 
-    if selected_category == 'visitor_sensors':
-        sensor_df = read_dataframe_from_azure(
-            file_name="preprocessed_visitor_count_sensors_data.parquet",
-            file_format="parquet",
-            source_folder="preprocessed_data",
-        )
+    return run_query(
+        dataset_name, version, _query.columns,
+        start_date=_query.start_date, end_date=_query.end_date,
+        month=_query.month, season=_query.season, year=_query.year,
+        aggregation=_query.aggregation, frequency=_query.frequency,
+    )
 
-        sensor_df = sensor_df.set_index('Time') 
-        processed_category_df = create_temporal_columns(sensor_df)
-        
-    if selected_category == 'parking':
-        category_df = get_parking_data_for_selected_sensor(selected_sensors)
-        processed_category_df = create_temporal_columns(category_df)
 
-    if selected_category == 'weather':
-        category_df = get_weather_data()
-        processed_category_df = create_temporal_columns(category_df)
+def invalidate_category_data():
+
+    """Forget the cached source versions and query results, e.g. after a new version of a category was uploaded.
+
+    The next query looks up the current version of its category, and as the local datasets and the query results
+    are keyed by version, it downloads the new data instead of serving the previous version.
+    """
+
+    get_category_source.clear()
+    get_query_result.clear()
+
 
-    if selected_category == 'visitor_centers':
-        category_df = get_visitor_centers_data()
-        category_df = category_df.set_index('Datum')
-        processed_category_df = create_temporal_columns(category_df)
+def execute_query(query: DataQuery):
 
-    get_values = extract_values_according_to_type(selected_query,selected_query_type)
+    """Execute a query of the Data Access page.
 
-    processed_category_df = get_queried_df(processed_category_df, get_values,selected_query_type, selected_category, start_date, end_date)
+    Every category is served by the same executor: the query runs as a parameterized SQL query on the local
+    dataset of its category, which is only downloaded again when its source data changed. Only the queried
+    columns and the partitions and row groups within the queried time range are read, and the results of the
+    latest queries are cached, so switching back to a previous category, sensor or query is a cache hit.
 
-    return processed_category_df
+    Args:
+        query (DataQuery): The query selected in the query section.
+
+    Returns:
+        pd.DataFrame: The queried columns (aggregated, if the query has an aggregation) with the time as index.
+
+    Raises:
+        ValueError: If the category or a queried column is not recognized.
+    """
 
+    dataset_name, version = get_category_dataset(query.category, query.dataset_sensor)
 
+    return get_query_result(dataset_name, version, query.key, query)
@@ -1,13 +1,22 @@
+import io
+from datetime import datetime, timedelta, timezone
+
 import streamlit as st
 import pandas as pd
-from src.config import CONNECTION_STRING, CONTAINER_NAME
-from src.utils import read_dataframe_from_azure
-from azure.storage.blob import BlobServiceClient
+from src.config import CONNECTION_STRING, CONTAINER_NAME, AZURE_ACCOUNT_KEY
+from azure.storage.blob import BlobServiceClient, BlobClient, BlobSasPermissions, generate_blob_sas
 
 
 # Setup
 base_folder = "raw-data/bf_raw_files"
 
+# The preview reads the first rows from a ranged read of the start of the file only
+preview_rows = 100
+preview_bytes = 256 * 1024
+
+# Validity of the download links in minutes
+download_link_minutes = 15
+
 def list_files_in_azure_folder(category: str) -> list:
     """Lists files in Azure for a given category and returns only file names."""
 
@@ -20,6 +29,63 @@ def list_files_in_azure_folder(category: str) -> list:
     return [name.split('/')[-1] for name in blob_list]
 
 
+def get_raw_blob_client(category: str, file_name: str) -> BlobClient:
+    """Get the client of a raw file of a category."""
+
+    return BlobClient.from_connection_string(
+        conn_str=CONNECTION_STRING,
+        container_name=CONTAINER_NAME,
+        blob_name=f"{base_folder}/{category.replace(' ', '_')}/{file_name}"
+    )
+
+
+def read_preview(blob_client: BlobClient, n_rows: int = preview_rows) -> pd.DataFrame:
+    """Read the first rows of a CSV file from a ranged read of its first bytes, without downloading the whole file.
+
+    Args:
+        blob_client (BlobClient): The client of the CSV file.
+        n_rows (int, optional): The number of rows to read. Defaults to preview_rows.
+
+    Returns:
+        pd.DataFrame: The first rows of the file.
+    """
+
+    head = blob_client.download_blob(offset=0, length=preview_bytes).readall()
+
+    # Drop the last line if the range ended within it
+    if len(head) == preview_bytes:
+        head = head[:head.rfind(b"\n") + 1]
+
+    return pd.read_csv(io.BytesIO(head), nrows=n_rows)
+
+
+def get_download_url(blob_client: BlobClient, file_name: str) -> str:
+    """Get a short-lived read-only link to a file, so that the browser downloads it directly from the cloud storage.
+
+    The file is passed through unchanged: it is neither parsed nor encoded again, and its bytes never go through
+    the memory of the app.
+
+    Args:
+        blob_client (BlobClient): The client of the file.
+        file_name (str): The name under which the file is saved.
+
+    Returns:
+        str: The download link, valid for download_link_minutes.
+    """
+
+    sas_token = generate_blob_sas(
+        account_name=blob_client.account_name,
+        container_name=blob_client.container_name,
+        blob_name=blob_client.blob_name,
+        account_key=AZURE_ACCOUNT_KEY,
+        permission=BlobSasPermissions(read=True),
+        expiry=datetime.now(timezone.utc) + timedelta(minutes=download_link_minutes),
+        content_disposition=f'attachment; filename="{file_name}"',
+    )
+
+    return f"{blob_client.url}?{sas_token}"
+
+
 def download_section():
 
     st.header("Download Data")
@@ -44,19 +110,14 @@ def download_section():
             )
 
             if preview_confirm:
-                # Load and preview selected file
-                st.write(f"Preview of {selected_file}")
-                data = read_dataframe_from_azure(
-                    file_name=selected_file,
-                    file_format="csv",
-                    source_folder=f"{base_folder}/{category.replace(' ', '_')}"
-                )
-                st.dataframe(data)
-
-                # Download button
-                st.download_button(
+                blob_client = get_raw_blob_client(category, selected_file)
+
+                # Preview the first rows of the selected file
+                st.write(f"Preview of the first {preview_rows} rows of {selected_file}")
+                st.dataframe(read_preview(blob_client))
+
+                # The file is downloaded as uploaded, directly from the cloud storage
+                st.link_button(
                     label="Download selected file as CSV",
-                    data=data.to_csv(index=False),
-                    file_name=selected_file,
-                    mime='text/csv',
+                    url=get_download_url(blob_client, selected_file),
                 )
\ No newline at end of file
@@ -1,15 +1,166 @@
-from ydata_profiling import ProfileReport
+"""
+Bounded-cost profiling of uploaded files and query results.
+
+The exact column summary (counts, missing values, minimum and maximum) is computed on all rows with vectorized column
+reductions. The ydata profiling report is built on a stratified sample within a row and column budget, so its cost
+does not grow with the size of the data. The report runs in a background worker and is cached by the content hash of
+the data, so the page stays responsive and profiling the same data again is free. The page only polls the worker
+while the report is built.
+"""
+
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
 import streamlit as st
+from ydata_profiling import ProfileReport
+
+
+###########################################################################################
+# GLOBAL VARIABLES
+###########################################################################################
+
+# Row and column budget of the profiled sample
+profile_max_rows = 10000
+profile_max_columns = 30
+
+# Number of profiling reports kept in memory
+profile_cache_entries = 8
+
+
+###########################################################################################
+# Functions
+###########################################################################################
+
+@st.cache_resource
+def get_profiling_executor() -> ThreadPoolExecutor:
+    """Get the background worker that builds the profiling reports of all sessions, one at a time."""
+    return ThreadPoolExecutor(max_workers=1)
+
+@st.cache_resource
+def get_profile_cache() -> dict:
+    """Get the profiling reports (futures of their HTML) of all sessions by the content hash of the data."""
+    return {}
+
+def get_content_hash(df: pd.DataFrame) -> str:
+    """Hash the values, index and columns of a DataFrame."""
+    content_hash = hashlib.sha256()
+    content_hash.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    content_hash.update(repr(list(df.columns)).encode())
+    return content_hash.hexdigest()[:16]
+
+def summarize_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Get the exact type, count, missing values, minimum and maximum of every column of all rows.
+
+    Args:
+        df (pd.DataFrame): The data.
+
+    Returns:
+        pd.DataFrame: One row per column of the data. The minimum and maximum are only given for numeric and datetime
+        columns.
+    """
+    counts = df.count()
+    missing = len(df) - counts
+    comparable = df.select_dtypes(include=['number', 'datetime'])
+
+    summary = pd.DataFrame({
+        'dtype': df.dtypes.astype(str),
+        'count': counts,
+        'missing': missing,
+        'missing (%)': (100 * missing / max(len(df), 1)).round(2),
+        'min': comparable.min().astype(str),
+        'max': comparable.max().astype(str),
+    })
+    summary[['min', 'max']] = summary[['min', 'max']].fillna("")
+
+    return summary
+
+def sample_rows(df: pd.DataFrame, max_rows: int = profile_max_rows, seed: int = 0) -> pd.DataFrame:
+    """
+    Take a stratified sample of the rows: the rows are split into `max_rows` consecutive strata of equal size and one
+    random row is taken from each. As the data is ordered by time, every period is represented in the sample.
+
+    Args:
+        df (pd.DataFrame): The data.
+        max_rows (int, optional): The maximum number of sampled rows. Defaults to profile_max_rows.
+        seed (int, optional): The seed of the random rows. Defaults to 0.
+
+    Returns:
+        pd.DataFrame: The sampled rows in their original order, or all rows if there are not more than `max_rows`.
+    """
+    if len(df) <= max_rows:
+        return df
+
+    bounds = np.linspace(0, len(df), max_rows + 1).astype(np.int64)
+    positions = bounds[:-1] + np.random.default_rng(seed).integers(0, np.diff(bounds))
+
+    return df.iloc[positions]
+
+def build_profile_html(sample: pd.DataFrame) -> str:
+    """Build the minimal ydata profiling report of a sample as HTML."""
+    print(f"Profiling a sample of {sample.shape[0]} rows and {sample.shape[1]} columns...")
+    return ProfileReport(sample, minimal=True).to_html()
+
+def submit_profile(df: pd.DataFrame) -> str:
+    """
+    Start building the profiling report of a sample of the data in the background, unless it is already cached.
+
+    Args:
+        df (pd.DataFrame): The data.
+
+    Returns:
+        str: The content hash of the data, the key of the report in the profile cache.
+    """
+    key = get_content_hash(df)
+    profile_cache = get_profile_cache()
+
+    if key not in profile_cache:
+        # Drop the oldest report when the cache is full
+        if len(profile_cache) >= profile_cache_entries:
+            profile_cache.pop(next(iter(profile_cache)))
+        sample = sample_rows(df.iloc[:, :profile_max_columns])
+        profile_cache[key] = get_profiling_executor().submit(build_profile_html, sample)
+
+    return key
+
+def render_profile(key: str, n_rows: int, n_columns: int) -> None:
+    """Render the finished profiling report of the data with the given key, or poll its progress while it is built."""
+    future = get_profile_cache().get(key)
+    if future is None:
+        return
+
+    if n_rows > profile_max_rows or n_columns > profile_max_columns:
+        st.caption(
+            f"The report profiles a stratified sample of {min(n_rows, profile_max_rows)} of {n_rows} rows "
+            f"and the first {min(n_columns, profile_max_columns)} of {n_columns} columns."
+        )
 
-@st.cache_data(max_entries=1)
-def custom_pandas_profiling_report(data):
-    
-    print("Profiling the uploaded data...")
+    if not future.done():
+        poll_profile(key)
+    elif future.exception() is not None:
+        st.error(f"The data could not be profiled: {future.exception()}")
+    else:
+        st.components.v1.html(future.result(), height=800, scrolling=True)
 
-    report = ProfileReport(data, minimal=True)
+@st.fragment(run_every="2s")
+def poll_profile(key: str) -> None:
+    """Show that the report is built, and rerun the page once when it is done, which renders it without polling."""
+    future = get_profile_cache().get(key)
+    if future is None or not future.done():
+        st.info("Profiling the data in the background...")
+    else:
+        st.rerun()
 
-    report_html = report.to_html()
+def custom_pandas_profiling_report(data: pd.DataFrame) -> None:
+    """
+    Render the exact column summary of the data and its sampled profiling report, which is built in the background.
 
-    # Render the report in Streamlit
-    st.components.v1.html(report_html, height=800, scrolling=True)
+    Args:
+        data (pd.DataFrame): The uploaded file or query result.
+    """
+    st.dataframe(summarize_columns(data))
 
+    key = submit_profile(data)
+    render_profile(key, *data.shape)
@@ -1,7 +1,8 @@
 # Import libraries
 import streamlit as st
 import datetime
-from src.streamlit_app.pages_in_dashboard.data_accessibility.data_retrieval import get_data_from_query
+from src.streamlit_app.pages_in_dashboard.data_accessibility.data_retrieval import execute_query, get_category_columns
+from src.streamlit_app.pages_in_dashboard.data_accessibility.data_query import DataQuery, property_categories, aggregations, frequencies
 from src.streamlit_app.pages_in_dashboard.data_accessibility.query_viz_and_download import get_visualization_section
 
 
@@ -24,7 +25,7 @@ def select_date():
     Select the start and end date for data access using date inputs in Streamlit.
 
     Returns: 
-        tuple: The selected start and end date in the format "MM-DD-YYYY".
+        tuple: The selected start and end date (datetime.date).
     """
     
     # Define the default start and end dates of the 01.01.2023 to 31.12.2023
@@ -32,20 +33,17 @@ def select_date():
     default_end = datetime.datetime(2023, 12, 31)
 
     # Create the date input widget with start date
-    d = st.date_input(
+    start_date = st.date_input(
         "Select the start date",
         default_start,
         format="DD.MM.YYYY",
     )
     # Create the date input widget with end date
-    e = st.date_input(
+    end_date = st.date_input(
         "Select the end date",
         default_end,
         format="DD.MM.YYYY",
     )
-    # capture the selected date
-    start_date = d.strftime("%m-%d-%Y")
-    end_date = e.strftime("%m-%d-%Y")
 
     # prompt if the end date is chosen before start date
     if start_date > end_date:
@@ -54,7 +52,20 @@ def select_date():
 
     return start_date, end_date
 
-def select_filters(category, start_date, end_date):
+def select_aggregation():
+    """
+    Select an optional aggregation of the queried values using st.selectbox from Streamlit.
+
+    Returns:
+        tuple: The selected aggregation (None for the raw values) and time frequency.
+    """
+    aggregation = st.selectbox("Aggregate the values", [None] + aggregations,
+                               format_func=lambda option: "no aggregation" if option is None else option)
+    frequency = st.selectbox("per", list(frequencies), index=1, disabled=aggregation is None)
+
+    return aggregation, frequency
+
+def select_filters(category):
 
     """
     Select additional filters such as sensors, weather values, or parking values.
@@ -170,15 +181,8 @@ def select_filters(category, start_date, end_date):
         selected_sensors = st.selectbox("Select the parking sensor you want to find the values for?", category_based_filters[category]['sensors'])
 
     elif category == "visitor_sensors":
-        visitor_sensors_data = get_data_from_query(
-            selected_category=category,
-            selected_query=None,
-            selected_query_type=None,
-            start_date=start_date,
-            end_date=end_date,
-            selected_sensors=None)
-        
-        visitor_sensor_options = list(set(visitor_sensors_data.columns.tolist()) - set(["month", "year", "season"]))
+        # The sensor columns are read from the schema of the local dataset, no data is loaded
+        visitor_sensor_options = get_category_columns(category)
 
         selected_sensors = st.multiselect("Select the visitor sensor you want to find the count for?", visitor_sensor_options, default=None)
         selected_properties = None
@@ -193,116 +197,45 @@ def select_filters(category, start_date, end_date):
 
     return selected_properties, selected_sensors
 
-def get_queries_for_parking(start_date, end_date, selected_properties, selected_sensors):
-    
-    """
-    Generate queries for parking data based on selected date range, properties, and sensors.
-
-    Args:
-        start_date (str): The start date for the query.
-        end_date (str): The end date for the query.
-        selected_properties (list): List of parking properties to include in the query (e.g., occupancy, capacity).
-        selected_sensors (list): List of parking sensors to query data for.
-
-    Returns:
-        dict: A dictionary with keys "type1", "type2", and "type3" containing queries for the date range.
-    """
-          
-    queries = {}
-
-    if selected_sensors:
-        for property in selected_properties:
-            queries.setdefault("type1", []).append(
-                f"What is the {property} value for the sensor {selected_sensors} from {start_date} to {end_date}?"
-            )
-
-    return queries
-
-def get_queries_for_weather(start_date, end_date, selected_properties):
-    queries = {}
-
-    # Queries for the date range (type1)
-    for property in selected_properties:
-        queries.setdefault("type4", []).append(
-            f"What is the {property} value from {start_date} to {end_date}?"
-        )
-
-    return queries
-
-def get_queries_for_visitor_centers(start_date, end_date, selected_sensors):
-    
-    """
-    Generate queries for visitor center data based on selected date range,and sensors.
-
-    Args:
-        start_date (str): The start date for the query.
-        end_date (str): The end date for the query.
-        selected_sensors (list): List of visitor center sensors to query data for.
-
-    Returns:
-        dict: A dictionary with keys "type4", "type5", and "type6" containing queries for the date range.
-    """
-
-    queries = {}
-
-    # Queries for the date range (type1)
-    for sensor in selected_sensors:
-        queries.setdefault("type4", []).append(
-            f"What is the {sensor} value from {start_date} to {end_date}?"
-        )
-
-    return queries
-
-
-def get_queries_for_visitor_sensors(start_date, end_date, selected_sensors):
-    
-    """
-    Generate queries for visitor sensor data based on selected date range and sensors.
-
-    Args:
-        start_date (str): The start date for the query.
-        end_date (str): The end date for the query.
-        selected_sensors (list): List of visitor sensors to query data for.
-
-    Returns:
-        dict: A dictionary with keys "type4", "type5", and "type6" containing queries for the date range.
-    """
-    
-    queries = {}
-
-    # Queries for the date range (type1)
-    for sensor in selected_sensors:
-        queries.setdefault("type4", []).append(
-            f"What is the {sensor} value from {start_date} to {end_date}?"
-        )
-
-    return queries
-
-
-def generate_queries(category, start_date, end_date, selected_properties, selected_sensors):
+def generate_queries(category, start_date, end_date, selected_properties, selected_sensors, aggregation=None, frequency='day'):
     
     """
-    Generate queries based on the selected category and date range.
+    Generate the queries for the selected category, date range and filters: one query per selected property (or
+    sensor for the visitor categories), and one query for all of them if several are selected.
 
     Args:
         category (str): The category of data (e.g., 'parking', 'weather', 'visitor_sensors', 'visitor_centers').
-        start_date (str): The start date for the queries.
-        end_date (str): The end date for the queries.
+        start_date (datetime.date): The start date for the queries.
+        end_date (datetime.date): The end date for the queries.
         selected_properties (list): List of selected properties relevant to the category.
-        selected_sensors (list): List of selected sensors relevant to the category.
+        selected_sensors (list or str): The selected sensors, for 'parking' the single selected parking sensor.
+        aggregation (str, optional): The aggregation of the values. Defaults to None (raw values).
+        frequency (str, optional): The time frequency of the aggregation. Defaults to 'day'.
 
     Returns:
-        dict: A dictionary containing generated queries based on the specified category and filters.
+        list: The generated DataQuery objects.
     """
 
     if category == 'parking':
-        queries = get_queries_for_parking(start_date, end_date,selected_properties, selected_sensors)
-    if category == 'weather':
-        queries = get_queries_for_weather(start_date, end_date, selected_properties)
-    if category == 'visitor_sensors':
-        queries = get_queries_for_visitor_sensors(start_date, end_date, selected_sensors)
-    if category == 'visitor_centers':
-        queries = get_queries_for_visitor_centers(start_date, end_date, selected_sensors)
+        if not selected_sensors:
+            return []
+        sensors = [selected_sensors]
+    else:
+        sensors = list(selected_sensors or [])
+    properties = list(selected_properties or [])
+
+    def make_query(columns):
+        if category in property_categories:
+            return DataQuery(category, properties=columns, sensors=sensors, start_date=start_date, end_date=end_date,
+                             aggregation=aggregation, frequency=frequency)
+        return DataQuery(category, sensors=columns, start_date=start_date, end_date=end_date,
+                         aggregation=aggregation, frequency=frequency)
+
+    columns = properties if category in property_categories else sensors
+    queries = [make_query([column]) for column in columns]
+    if len(columns) > 1:
+        queries.append(make_query(columns))
+
     return queries
 
 def get_query_section():
@@ -331,30 +264,20 @@ def get_query_section():
         start_date, end_date = select_date()
         print(start_date, end_date)
        
-    selected_properties, selected_sensors = select_filters(selected_category, start_date, end_date)
+    selected_properties, selected_sensors = select_filters(selected_category)
+    aggregation, frequency = select_aggregation()
     
-    # Give options to select your queries in form of a dropdown
-    queries_dict = generate_queries(selected_category, start_date, end_date, selected_properties,selected_sensors)
-
-    # get all the values of the all the keys in the dictionary queries
-
-    queries = [query for query_list in queries_dict.values() for query in query_list]
-
-    selected_query_type = None
+    # Give options to select your queries in form of a dropdown, the shown sentences are generated from the queries
+    queries = generate_queries(selected_category, start_date, end_date, selected_properties, selected_sensors,
+                               aggregation, frequency)
 
     with st.form("Select a query"):
 
-        selected_query = st.selectbox("Select a query", queries)
-        
-        # get the type of the selected query from the queries dictionary
-        for key, value in queries_dict.items():
-            if selected_query in value:
-                selected_query_type = key
+        selected_query = st.selectbox("Select a query", queries, format_func=DataQuery.describe)
 
         submitted = st.form_submit_button(":green[Run Query]")
-    if submitted:
-        # get_data_from_query(selected_query,selected_query_type,selected_category)
-        queried_df = get_data_from_query(selected_category,selected_query,selected_query_type, start_date, end_date, selected_sensors)
+    if submitted and selected_query is not None:
+        queried_df = execute_query(selected_query)
         
         # handle error if the queried df is an empty dataframe
         if queried_df.empty:
@@ -365,8 +288,3 @@ def get_query_section():
 
             # get visualization for the queried data
             get_visualization_section(queried_df)
-
-
-  
-
-
@@ -0,0 +1,468 @@
+"""
+Embedded columnar query engine (DuckDB) for the Data Access page.
+
+Every category dataset (e.g. the hourly visitor sensor counts) is downloaded once per version of its source blob and
+stored locally as parquet, partitioned by year and sorted by time, with precomputed month and season code columns.
+Queries are parameterized SQL over these local datasets: the time range prunes the year partitions, and as the rows
+are sorted, the min/max statistics of the row groups narrow a range down like a binary search. Month and season
+filters compare the stored codes instead of extracting the month of every timestamp, and only the queried columns are
+read. Switching the query, the date range or the selected sensors therefore only reruns a local query
+instead of downloading and reprocessing the whole dataset.
+
+Every dataset also has rollup tables with the sum, count, minimum and maximum of its numeric columns per day, ISO
+week and month. Aggregate queries are routed to the coarsest rollup that answers them exactly, so e.g. the monthly
+means of several years read a few hundred rows instead of all hourly rows.
+
+The datasets of several categories and parking sensors are held at once. When their total size exceeds
+`dataset_cache_budget_mb`, the least recently queried datasets are removed and downloaded again when needed. As other
+sessions may still query a dataset, neither older versions nor evicted datasets are removed while they were used within
+the last `dataset_grace_seconds`.
+"""
+
+import os
+import shutil
+import tempfile
+import time
+
+import duckdb
+import pandas as pd
+import streamlit as st
+from src.calendar_features import season_of_month
+
+
+###########################################################################################
+# GLOBAL VARIABLES
+###########################################################################################
+
+# Local folder with one sub-folder per dataset and version
+query_cache_dir = os.path.join(tempfile.gettempdir(), "data_access_datasets")
+
+# Time column of all datasets, the partition column and the code columns derived from it
+time_column = 'Time'
+partition_column = 'year'
+month_column = 'month'
+season_column = 'season'
+derived_columns = [partition_column, month_column, season_column]
+
+# Rows per parquet row group. One year of hourly data fits in one row group, as smaller row groups of these narrow
+# datasets cost more in metadata than they save in pruning. Finer (e.g. 15-minute) data gets several per year.
+row_group_size = 24 * 366
+
+# Version of the local dataset layout, part of the dataset folder so that a new layout is materialized again
+dataset_layout_version = 3
+
+# Disk budget of all local datasets in MB
+dataset_cache_budget_mb = 2048
+
+# Datasets used (queried or materialized) within this many seconds are not removed, as other sessions may read them
+dataset_grace_seconds = 600
+
+# SQL aggregates and time parts of the supported aggregations
+sql_aggregates = {'sum': 'sum', 'mean': 'avg', 'min': 'min', 'max': 'max'}
+sql_frequencies = ['hour', 'day', 'week', 'month', 'year']
+
+# Tables of every dataset: the hourly rows and the rollups from the coarsest to the finest, with the aggregation
+# frequencies each rollup can answer
+raw_table = 'hour'
+rollup_frequencies = {'month': ['month', 'year'], 'week': ['week'], 'day': ['day', 'week', 'month', 'year']}
+rollup_statistics = ['sum', 'count', 'min', 'max']
+
+# Aggregates of the rollup statistics for every supported aggregation ({0} is the column name without statistic)
+rollup_aggregates = {
+    'sum': 'sum("{0}__sum")',
+    'mean': 'sum("{0}__sum") / nullif(sum("{0}__count"), 0)',
+    'min': 'min("{0}__min")',
+    'max': 'max("{0}__max")',
+}
+
+
+###########################################################################################
+# Functions
+###########################################################################################
+
+@st.cache_resource
+def get_connection() -> duckdb.DuckDBPyConnection:
+    """
+    Get the in-process DuckDB connection shared by all sessions. Every query uses its own cursor, and the parquet
+    footers are cached so that repeated queries do not parse the metadata again.
+    """
+    connection = duckdb.connect()
+    connection.execute("SET parquet_metadata_cache = true")
+    return connection
+
+def quote_identifier(name: str) -> str:
+    """Quote a column name for SQL (identifiers cannot be passed as parameters)."""
+    return '"' + name.replace('"', '""') + '"'
+
+def get_dataset_path(dataset_name: str, version: str) -> str:
+    """
+    Get the local folder of a version of a dataset.
+
+    Args:
+        dataset_name (str): The name of the dataset, e.g. 'weather' or 'parking/<sensor>'.
+        version (str): The version of the source data, e.g. the ETag of the source blob.
+
+    Returns:
+        str: The local folder of the dataset version.
+    """
+    safe_version = "".join(character if character.isalnum() else "_" for character in version)
+    return os.path.join(query_cache_dir, dataset_name, f"v{dataset_layout_version}_{safe_version}")
+
+def dataset_exists(dataset_name: str, version: str) -> bool:
+    """Check if a version of a dataset has been materialized locally."""
+    return os.path.isdir(get_dataset_path(dataset_name, version))
+
+def get_folder_size(path: str) -> int:
+    """Get the total size of the files in a folder in bytes, skipping files that another session removed."""
+    size = 0
+    for folder, _, file_names in os.walk(path):
+        for file_name in file_names:
+            try:
+                size += os.path.getsize(os.path.join(folder, file_name))
+            except OSError:
+                pass
+    return size
+
+def get_last_use(path: str) -> float:
+    """Get the last use of a dataset folder (its modification time), or None if another session removed it."""
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+def is_in_grace_period(last_use: float) -> bool:
+    """Check if a dataset was used so recently that other sessions may still read it."""
+    return last_use is not None and time.time() - last_use < dataset_grace_seconds
+
+def evict_datasets(keep_path: str = None, budget_mb: float = None) -> list:
+    """
+    Remove the least recently queried local datasets until all datasets fit in the disk budget. The last use of a
+    dataset is the modification time of its folder, which every query updates. Datasets used within the grace period
+    are kept even if the budget is exceeded, they are removed by a later eviction.
+
+    Args:
+        keep_path (str, optional): The folder of a dataset that is never removed (e.g. the one just materialized).
+        budget_mb (float, optional): The disk budget in MB. Defaults to dataset_cache_budget_mb.
+
+    Returns:
+        list: The folders of the removed datasets.
+    """
+    budget_bytes = (dataset_cache_budget_mb if budget_mb is None else budget_mb) * 2**20
+    version_prefix = f"v{dataset_layout_version}_"
+
+    datasets = [
+        (get_last_use(folder), get_folder_size(folder), folder)
+        for folder, _, _ in os.walk(query_cache_dir)
+        if os.path.basename(folder).startswith(version_prefix)
+    ]
+    datasets = [dataset for dataset in datasets if dataset[0] is not None]
+
+    total_bytes = sum(size for _, size, _ in datasets)
+    removed = []
+    for last_use, size, folder in sorted(datasets):
+        if total_bytes <= budget_bytes:
+            break
+        if folder == keep_path or is_in_grace_period(last_use):
+            continue
+        shutil.rmtree(folder, ignore_errors=True)
+        total_bytes -= size
+        removed.append(folder)
+
+    return removed
+
+def remove_old_versions(dataset_folder: str, keep_path: str) -> list:
+    """
+    Remove the older versions of a dataset and the temporary folders of interrupted materializations, unless they
+    were used within the grace period. Versions still in use are removed by a later materialization or eviction.
+
+    Args:
+        dataset_folder (str): The folder with the versions of the dataset.
+        keep_path (str): The folder of the current version.
+
+    Returns:
+        list: The removed folders.
+    """
+    removed = []
+    for old_version in os.listdir(dataset_folder):
+        old_path = os.path.join(dataset_folder, old_version)
+        if old_path != keep_path and not is_in_grace_period(get_last_use(old_path)):
+            shutil.rmtree(old_path, ignore_errors=True)
+            removed.append(old_path)
+
+    return removed
+
+def materialize_dataset(df: pd.DataFrame, dataset_name: str, version: str) -> None:
+    """
+    Store a dataset locally as parquet partitioned by year and sorted by time, with the month and season codes of
+    every row, and remove its older versions that are no longer in use. If another session materialized the same
+    version in the meantime, its dataset is kept.
+
+    Args:
+        df (pd.DataFrame): The data with a DatetimeIndex (or an index that can be converted to one).
+        dataset_name (str): The name of the dataset.
+        version (str): The version of the source data.
+    """
+    df = df.drop(columns=[column for column in [time_column] + derived_columns if column in df.columns])
+    df.index = pd.to_datetime(df.index)
+    df.index.name = time_column
+    df = df.sort_index().reset_index()
+
+    months = df[time_column].dt.month.to_numpy()
+    df[month_column] = months.astype('int8')
+    df[season_column] = season_of_month[months]
+    df[partition_column] = df[time_column].dt.year
+
+    # Write to a temporary folder first, so that concurrent queries never see a partial dataset
+    dataset_folder = os.path.join(query_cache_dir, dataset_name)
+    os.makedirs(dataset_folder, exist_ok=True)
+    temporary_path = tempfile.mkdtemp(dir=dataset_folder, prefix=".tmp_")
+    df.to_parquet(
+        os.path.join(temporary_path, raw_table),
+        partition_cols=[partition_column],
+        index=False,
+        row_group_size=row_group_size,
+    )
+
+    numeric_columns = [
+        column for column in df.columns
+        if column not in [time_column] + derived_columns
+        and pd.api.types.is_numeric_dtype(df[column]) and not pd.api.types.is_bool_dtype(df[column])
+    ]
+    write_rollups(temporary_path, numeric_columns)
+
+    dataset_path = get_dataset_path(dataset_name, version)
+    try:
+        os.replace(temporary_path, dataset_path)
+    except OSError:
+        # Another session has materialized the same version first, which is as good as this one
+        if not os.path.isdir(dataset_path):
+            raise
+        shutil.rmtree(temporary_path, ignore_errors=True)
+
+    remove_old_versions(dataset_folder, keep_path=dataset_path)
+
+    removed = evict_datasets(keep_path=dataset_path)
+    if removed:
+        print(f"Removed {len(removed)} least recently used local datasets to stay within the disk budget")
+
+def _read_table_sql(table_path: str, years: list = None) -> str:
+    """
+    Get the SQL table function that reads a table folder. If years are given, only the existing partitions of these
+    years are listed, so that a query of one year does not glob the files of all years. Without years or if none of
+    them exists, all partitions are read.
+    """
+    folders = [os.path.join(table_path, f"{partition_column}={year}") for year in years or []]
+    folders = [folder for folder in folders if os.path.isdir(folder)] or [os.path.join(table_path, "**")]
+    patterns = ", ".join("'" + os.path.join(folder, "*.parquet").replace("'", "''") + "'" for folder in folders)
+    return f"read_parquet([{patterns}], hive_partitioning = true)"
+
+def _read_dataset_sql(dataset_name: str, version: str, table: str = raw_table, years: list = None) -> str:
+    """Get the SQL table function that reads the partitions of a table of a dataset version (see `_read_table_sql`)."""
+    return _read_table_sql(os.path.join(get_dataset_path(dataset_name, version), table), years)
+
+def write_rollups(dataset_path: str, columns: list) -> None:
+    """
+    Write the rollup tables of a dataset from its hourly table: the sum, count, minimum and maximum of every column
+    per period (named '<column>__<statistic>') and the year of the period start. The day and month rollups keep the
+    month and season codes, which are the same for all hours of these periods. The rollups are small, so every rollup
+    is a single file instead of one file per year.
+
+    Args:
+        dataset_path (str): The folder of the dataset, with the hourly table already written.
+        columns (list): The numeric value columns to roll up.
+    """
+    cursor = get_connection().cursor()
+    source = _read_table_sql(os.path.join(dataset_path, raw_table))
+
+    for frequency in rollup_frequencies:
+        period = f"date_trunc('{frequency}', {quote_identifier(time_column)})"
+        select_list = [f"{period} AS {quote_identifier(time_column)}", f"year({period}) AS {partition_column}"]
+        if frequency != 'week':
+            select_list += [f"min({month_column}) AS {month_column}", f"min({season_column}) AS {season_column}"]
+        for column in columns:
+            for statistic in rollup_statistics:
+                select_list.append(f"{statistic}({quote_identifier(column)}) AS {quote_identifier(f'{column}__{statistic}')}")
+
+        os.makedirs(os.path.join(dataset_path, frequency))
+        target = os.path.join(dataset_path, frequency, "rollup.parquet").replace("'", "''")
+        cursor.execute(
+            f"COPY (SELECT {', '.join(select_list)} FROM {source} GROUP BY ALL ORDER BY 1) "
+            f"TO '{target}' (FORMAT parquet)"
+        )
+
+@st.cache_data
+def get_dataset_schema(dataset_name: str, version: str) -> tuple:
+    """
+    Get the value columns of a dataset version (without the time and derived columns) and the value columns that
+    have rollups (its numeric columns), read from the schemas only. A version never changes once materialized, so
+    both are cached together and a query does not describe any table.
+
+    Args:
+        dataset_name (str): The name of the dataset.
+        version (str): The version of the source data.
+
+    Returns:
+        tuple: The list of value columns and the list of value columns with rollups.
+    """
+    cursor = get_connection().cursor()
+    schema = cursor.execute(f"DESCRIBE SELECT * FROM {_read_dataset_sql(dataset_name, version)}").fetchall()
+    columns = [row[0] for row in schema if row[0] != time_column and row[0] not in derived_columns]
+
+    schema = cursor.execute(f"DESCRIBE SELECT * FROM {_read_dataset_sql(dataset_name, version, 'day')}").fetchall()
+    rollup_columns = [row[0][:-len("__sum")] for row in schema if row[0].endswith("__sum")]
+
+    return columns, rollup_columns
+
+def get_dataset_columns(dataset_name: str, version: str) -> list:
+    """Get the value columns of a dataset version (see `get_dataset_schema`)."""
+    return get_dataset_schema(dataset_name, version)[0]
+
+def is_period_start(timestamp: pd.Timestamp, frequency: str) -> bool:
+    """Check if a timestamp (at midnight) is the start of a day, ISO week or month."""
+    if frequency == 'month':
+        return timestamp.day == 1
+    if frequency == 'week':
+        return timestamp.dayofweek == 0
+    return True
+
+def get_rollup_table(columns: list, rollup_columns: list, start_date=None, end_date=None,
+                     month: int = None, season: int = None, year: int = None,
+                     aggregation: str = None, frequency: str = 'day') -> str:
+    """
+    Get the coarsest rollup table that answers an aggregate query exactly. A rollup answers a query if its periods
+    make up the periods of the query frequency, the date range starts and ends at period boundaries, and no month,
+    season or year filter cuts through its periods (ISO weeks cross month and year boundaries).
+
+    Args:
+        columns (list): The queried value columns.
+        rollup_columns (list): The value columns with rollups.
+        The other arguments are the filters and aggregation of the query (see `build_query`).
+
+    Returns:
+        str: The rollup table ('month', 'week' or 'day'), or None if the query needs the hourly rows.
+    """
+    if aggregation is None or not set(columns) <= set(rollup_columns):
+        return None
+
+    bounds = []
+    if start_date is not None:
+        bounds.append(pd.Timestamp(start_date).normalize())
+    if end_date is not None:
+        bounds.append(pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1))
+
+    for table, answered_frequencies in rollup_frequencies.items():
+        if frequency not in answered_frequencies:
+            continue
+        if table == 'week' and (month, season, year) != (None, None, None):
+            continue
+        if all(is_period_start(bound, table) for bound in bounds):
+            return table
+
+    return None
+
+def build_query(dataset_name: str, version: str, columns: list, start_date=None, end_date=None,
+                month: int = None, season: int = None, year: int = None,
+                aggregation: str = None, frequency: str = 'day', table: str = raw_table) -> tuple:
+    """
+    Build the parameterized SQL of a query. The date range includes the whole end day. Queries of the hourly rows
+    with a year filter or a bounded date range only list the partitions of these years.
+
+    Args:
+        dataset_name (str): The name of the dataset.
+        version (str): The version of the source data.
+        columns (list): The value columns to return.
+        start_date (datetime, optional): First day of the date range.
+        end_date (datetime, optional): Last day of the date range (inclusive).
+        month (int, optional): Month number (1-12) to filter on.
+        season (int, optional): Season code to filter on (0: winter, 1: spring, 2: summer, 3: fall).
+        year (int, optional): Year to filter on.
+        aggregation (str, optional): Aggregate the values per `frequency` with this SQL aggregate ('sum', 'mean',
+            'min' or 'max'). Defaults to None (raw values).
+        frequency (str, optional): Time frequency of the aggregation ('hour', 'day', 'week', 'month' or 'year'),
+            the time of every aggregate is the start of its period. Defaults to 'day'.
+        table (str, optional): The table to query, the hourly rows or a rollup that answers the aggregation
+            (see `get_rollup_table`). Defaults to raw_table.
+
+    Returns:
+        tuple: The SQL string and the list of its parameters.
+    """
+    conditions, params = [], []
+
+    if start_date is not None:
+        start_time = pd.Timestamp(start_date).normalize()
+        conditions += [f"{partition_column} >= ?", f"{quote_identifier(time_column)} >= ?"]
+        params += [start_time.year, start_time.to_pydatetime()]
+    if end_date is not None:
+        end_time = pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1)
+        conditions += [f"{partition_column} <= ?", f"{quote_identifier(time_column)} < ?"]
+        params += [pd.Timestamp(end_date).year, end_time.to_pydatetime()]
+    if year is not None:
+        conditions.append(f"{partition_column} = ?")
+        params.append(int(year))
+    if month is not None:
+        conditions.append(f"{month_column} = ?")
+        params.append(int(month))
+    if season is not None:
+        conditions.append(f"{season_column} = ?")
+        params.append(int(season))
+
+    # Aggregates and time parts cannot be parameters, they are checked against fixed lists instead
+    if aggregation is None:
+        select_list = ", ".join(quote_identifier(column) for column in [time_column] + list(columns))
+    else:
+        if aggregation not in sql_aggregates or frequency not in sql_frequencies:
+            raise ValueError(f"Unsupported aggregation {aggregation} per {frequency}")
+        if table == raw_table:
+            aggregates = [f"{sql_aggregates[aggregation]}({quote_identifier(column)})" for column in columns]
+        else:
+            aggregates = [rollup_aggregates[aggregation].format(column.replace('"', '""')) for column in columns]
+        select_list = ", ".join(
+            [f"date_trunc('{frequency}', {quote_identifier(time_column)}) AS {quote_identifier(time_column)}"]
+            + [f"{aggregate} AS {quote_identifier(column)}" for aggregate, column in zip(aggregates, columns)]
+        )
+
+    years = None
+    if year is not None:
+        years = [int(year)]
+    elif start_date is not None and end_date is not None:
+        years = list(range(pd.Timestamp(start_date).year, pd.Timestamp(end_date).year + 1))
+
+    sql = f"SELECT {select_list} FROM {_read_dataset_sql(dataset_name, version, table, years)}"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    if aggregation is not None:
+        sql += " GROUP BY 1"
+    sql += " ORDER BY 1"
+
+    return sql, params
+
+def run_query(dataset_name: str, version: str, columns: list, **filters) -> pd.DataFrame:
+    """
+    Run a query on a dataset version. Aggregations are answered from the coarsest rollup that answers them exactly.
+
+    Args:
+        dataset_name (str): The name of the dataset.
+        version (str): The version of the source data.
+        columns (list): The value columns to return. Unknown columns raise a ValueError.
+        **filters: The filters and aggregation of `build_query` (start_date, end_date, month, season, year,
+            aggregation, frequency).
+
+    Returns:
+        pd.DataFrame: The queried columns with the time as DatetimeIndex.
+
+    Raises:
+        ValueError: If a column does not exist in the dataset.
+    """
+    dataset_columns, rollup_columns = get_dataset_schema(dataset_name, version)
+    unknown_columns = set(columns) - set(dataset_columns)
+    if unknown_columns:
+        raise ValueError(f"Unknown columns for {dataset_name}: {sorted(unknown_columns)}")
+
+    # Mark the dataset as in use before reading it, so that it is not removed during the grace period
+    os.utime(get_dataset_path(dataset_name, version))
+
+    table = get_rollup_table(columns, rollup_columns, **filters) or raw_table
+    sql, params = build_query(dataset_name, version, columns, table=table, **filters)
+    queried_df = get_connection().cursor().execute(sql, params).df()
+
+    return queried_df.set_index(time_column)
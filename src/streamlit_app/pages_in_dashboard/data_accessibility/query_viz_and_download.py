@@ -1,8 +1,6 @@
 import streamlit as st
-from src.streamlit_app.pages_in_dashboard.data_accessibility.data_retrieval import get_data_from_query
 import pandas as pd
-from ydata_profiling import ProfileReport
-from streamlit_pandas_profiling import st_profile_report
+from src.streamlit_app.pages_in_dashboard.data_accessibility.pandas_profiling_styling import custom_pandas_profiling_report
 
 
 def get_visualization_section(retrieved_df):
@@ -13,6 +11,5 @@ def get_visualization_section(retrieved_df):
 
     st.dataframe(retrieved_df)
 
-    # Generate Pandas Profiling report
-    pr = ProfileReport(retrieved_df,minimal=True)
-    st_profile_report(pr)
+    # Summarize all rows and profile a sample in the background
+    custom_pandas_profiling_report(retrieved_df)
@@ -1,26 +1,157 @@
+import io
+import os
+import tempfile
+
+import numpy as np
+import openpyxl
 import pandas as pd
 import streamlit as st
-from src.streamlit_app.pages_in_dashboard.data_accessibility.pandas_profiling_styling import custom_pandas_profiling_report 
-from src.streamlit_app.pre_processing.data_quality_check import data_quality_check
-from src.utils import upload_dataframe_to_azure
+from pandas.io.parsers import TextParser
+from src.streamlit_app.pages_in_dashboard.data_accessibility.pandas_profiling_styling import custom_pandas_profiling_report
+from src.streamlit_app.pre_processing.data_quality_check import streaming_data_quality_check, invalid_upload_folder
+from src.streamlit_app.pages_in_dashboard.data_accessibility.data_retrieval import invalidate_category_data
+from src.delta_store import get_container_client
 
 # Setup
 base_folder = "raw-data/bf_raw_files"
 
+# Rows per chunk when checking an uploaded file, and rows read for its preview
+chunk_rows = 50000
+preview_rows = 10000
+
 def generate_file_name(category: str, upload_timestamp: str) -> str:
     """Generates a file name based on the category."""
     return f"{category.replace(' ', '_')}_uploaded_{upload_timestamp}.csv"
 
-# Function to read the uploaded file
-def read_csv_file(uploaded_file):
-    # Check the file extension and read accordingly
+def convert_excel_cell(cell):
+    """Convert a workbook cell like `pd.read_excel`: empty cells are "", error cells NaN and whole numbers int."""
+    if cell.value is None:
+        return ""
+    if cell.data_type == "e":
+        return np.nan
+    if cell.data_type == "n":
+        value = int(cell.value)
+        return value if value == cell.value else float(cell.value)
+    return cell.value
+
+def iter_excel_rows(sheet):
+    """
+    Yield the converted rows of a worksheet without their trailing empty cells. Like in `pd.read_excel`, empty rows
+    between rows with values are kept (as empty lists), and the empty rows at the end of the sheet are dropped.
+    """
+    n_pending_empty_rows = 0
+    for cells in sheet.iter_rows():
+        row = [convert_excel_cell(cell) for cell in cells]
+        while row and row[-1] == "":
+            row.pop()
+
+        if not row:
+            n_pending_empty_rows += 1
+            continue
+
+        for _ in range(n_pending_empty_rows):
+            yield []
+        n_pending_empty_rows = 0
+        yield row
+
+def get_excel_columns(header: list) -> list:
+    """Get the column names of a worksheet header like `pd.read_excel`: empty cells become 'Unnamed: <position>'
+    and duplicate names get a '.<count>' suffix (e.g. 'Gsenget IN' and 'Gsenget IN.1')."""
+    if not header:
+        return []
+    return list(TextParser([header], header=0).read().columns)
+
+def parse_excel_rows(rows: list, columns: list) -> pd.DataFrame:
+    """
+    Parse converted worksheet rows with the parser of `pd.read_excel(dtype=object)`, which turns the missing value
+    markers (e.g. "" or "NA") into NaN.
+
+    Args:
+        rows (list): The converted rows, see `iter_excel_rows`.
+        columns (list): The column names, see `get_excel_columns`. Rows that are longer than the header get
+            additional Unnamed columns, like in `pd.read_excel`.
+
+    Returns:
+        pd.DataFrame: The parsed rows.
+    """
+    n_columns = max([len(columns)] + [len(row) for row in rows])
+    columns = columns + [f"Unnamed: {position}" for position in range(len(columns), n_columns)]
+
+    if not rows:
+        return pd.DataFrame(columns=columns, dtype=object)
+
+    # Pad the rows to the width of the sheet, so that empty rows are kept as rows of missing values
+    padded_rows = [row + [""] * (n_columns - len(row)) for row in rows]
+    return TextParser(padded_rows, names=columns, header=None, dtype=object).read()
+
+def iter_file_chunks(uploaded_file, n_rows: int = chunk_rows):
+    """Read an uploaded CSV or Excel file in chunks of consecutive rows.
+
+    Excel rows are converted lazily from a read-only workbook and parsed like `pd.read_excel(dtype=object)` parses the
+    whole sheet (same column names, missing values and empty rows), so only one chunk of the file is held in memory at
+    a time.
+
+    Args:
+        uploaded_file (UploadedFile): The uploaded CSV or Excel file.
+        n_rows (int, optional): The number of rows per chunk. Defaults to chunk_rows.
+
+    Yields:
+        tuple: A DataFrame with the next rows and the fraction of the file read so far.
+    """
+    uploaded_file.seek(0)
+
     if uploaded_file.name.endswith('.csv'):
-        return pd.read_csv(uploaded_file, index_col=False)
+        # Read through a text wrapper that is detached afterwards, so that the uploaded file stays open
+        text_file = io.TextIOWrapper(uploaded_file, encoding="utf-8", newline="")
+        try:
+            for chunk in pd.read_csv(text_file, index_col=False, chunksize=n_rows):
+                yield chunk, min(uploaded_file.tell() / max(uploaded_file.size, 1), 1.0)
+        finally:
+            text_file.detach()
+
     elif uploaded_file.name.endswith('.xlsx'):
-        return pd.read_excel(uploaded_file, dtype=object, engine = 'openpyxl')
+        workbook = openpyxl.load_workbook(uploaded_file, read_only=True, data_only=True)
+        sheet = workbook.worksheets[0]
+        rows = iter_excel_rows(sheet)
+
+        header = next(rows, None)
+        if header is not None:
+            columns = get_excel_columns(header)
+            n_total_rows = max((sheet.max_row or 1) - 1, 1)
+            batch, n_read_rows = [], 0
+
+            for row in rows:
+                batch.append(row)
+                if len(batch) == n_rows:
+                    n_read_rows += len(batch)
+                    yield parse_excel_rows(batch, columns), min(n_read_rows / n_total_rows, 1.0)
+                    batch = []
+
+            if batch or n_read_rows == 0:
+                yield parse_excel_rows(batch, columns), 1.0
+
+        workbook.close()
+
     else:
         st.error("Unsupported file format. Please upload a CSV or Excel file.")
-        return None
+
+# Function to read the uploaded file
+def read_csv_file(uploaded_file):
+    """Read the first preview_rows rows of the uploaded file for the preview, or None if it cannot be read."""
+    first_chunk = next(iter_file_chunks(uploaded_file, preview_rows), None)
+    return None if first_chunk is None else first_chunk[0]
+
+def write_raw_chunks(chunks, raw_path: str, progress_bar):
+    """Pass the chunks of an upload through, appending each to a local CSV copy and updating the progress bar."""
+    for chunk_number, (chunk, fraction) in enumerate(chunks):
+        chunk.to_csv(raw_path, mode='a', header=chunk_number == 0, index=False)
+        progress_bar.progress(fraction, text=f"Checking the uploaded file: {fraction:.0%}")
+        yield chunk
+
+def upload_raw_file(raw_path: str, target_folder: str, file_name: str) -> None:
+    """Upload the local CSV copy of an upload to the cloud, streaming it from the disk."""
+    with open(raw_path, "rb") as raw_file:
+        get_container_client().upload_blob(name=f"{target_folder}/{file_name}", data=raw_file, overwrite=True)
 
 def upload_section():
     st.header("Upload Data")
@@ -41,14 +172,14 @@ def upload_section():
     # Initialize `data` to None
     data = None
 
-    # Only read the file if it has been uploaded
+    # Only read the first rows of the file for the preview, the whole file is checked chunk by chunk on upload
     if uploaded_file:
         # Check if uploaded file is a CSV or Excel file
         data = read_csv_file(uploaded_file)
 
     # Ensure that both file and category are provided before proceeding
     if uploaded_file and category and data is not None:
-        # Store the data in session state
+        # Store the preview in session state
         st.session_state.data = data
 
         # Display the header and place the upload button next to it
@@ -69,6 +200,7 @@ def upload_section():
 
         if not upload_confirm:
             # Show the preview and summary report below the header
+            st.caption(f"The preview and the summary report show the first {preview_rows} rows of the file.")
             st.dataframe(st.session_state.data)
             st.header("Data Summary Report")
 
@@ -77,24 +209,32 @@ def upload_section():
                 custom_pandas_profiling_report(st.session_state.data)
 
         if upload_confirm:
-            # Check the data and if it passes, upload the preprocessed file to the cloud
-            status = data_quality_check(st.session_state.data, category)
-
-            if not status:
-                st.error("Data quality check failed. Please check the data and try again.")
-            else:
-                st.success("Data quality check passed.")
-                # Capture upload timestamp
-                upload_timestamp = pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')
-
-                # Generate file name and cloud path
-                file_name = generate_file_name(category, upload_timestamp)
-
-                # Upload the raw file to the cloud
-                upload_dataframe_to_azure(
-                    df=st.session_state.data,
-                    file_name=file_name,
-                    target_folder=f"{base_folder}/{category.replace(' ', '_')}",
-                    file_format="csv"
-                )
-                st.success("File successfully uploaded.")
+            # Capture upload timestamp
+            upload_timestamp = pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')
+
+            with tempfile.TemporaryDirectory() as raw_folder:
+                raw_path = os.path.join(raw_folder, "upload.csv")
+                progress_bar = st.progress(0.0, text="Checking the uploaded file...")
+
+                # Check the file chunk by chunk and if it passes, upload the preprocessed rows to the cloud
+                chunks = write_raw_chunks(iter_file_chunks(uploaded_file), raw_path, progress_bar)
+                status = streaming_data_quality_check(chunks, category)
+
+                # Read the rest of the file, so that the raw copy is complete also when the check stopped early
+                for _ in chunks:
+                    pass
+                progress_bar.empty()
+
+                if not status:
+                    print("Data quality check failed. Please check the columns in the uploaded file.")
+                    upload_raw_file(raw_path, f"{invalid_upload_folder}/{category}", f"{category}_{upload_timestamp}.csv")
+                    st.error("If you have changed any column names, please update and try again. Your file is now uploaded to the invalid folder on the cloud storage.")
+                    st.error("Data quality check failed. Please check the data and try again.")
+                else:
+                    st.success("Data quality check passed.")
+                    # The check wrote a new version of the category, so the queries must not serve the cached one
+                    invalidate_category_data()
+
+                    # Upload the raw file to the cloud
+                    upload_raw_file(raw_path, f"{base_folder}/{category.replace(' ', '_')}", generate_file_name(category, upload_timestamp))
+                    st.success("File successfully uploaded.")
@@ -1,18 +1,24 @@
 import pandas as pd
 from src.streamlit_app.pre_processing.gen_config_for_visitor_sensors_and_centers import visitor_centers, visitor_sensors
 import numpy as np
-import re
 import streamlit as st
 import os
-from src.config import CONNECTION_STRING, CONTAINER_NAME
-from src.utils import upload_dataframe_to_azure, read_dataframe_from_azure
-from azure.storage.blob import BlobClient    
+import tempfile
+from src.utils import parse_german_dates
+from src.delta_store import append_delta_parts
+from src.workbook_ingestion import convert_to_parquet_types
 
 
 raw_folder = "raw-data/bf_raw_files"
 preprocessed_folder = "preprocessed_data/bf_preprocessed_files"
 invalid_upload_folder = "invalid-data/bf_invalid_upload_files"
 
+# Configurations of the categories with a data quality check
+category_configurations = {
+    "visitor_count_sensors": visitor_sensors,
+    "visitors_count_centers": visitor_centers,
+}
+
 def convert_sensor_dictionary_to_excel_file(
         sensor_dict: dict,
         output_file_path: str) -> None:
@@ -87,9 +93,8 @@ def convert_sensor_excel_file_to_dictionary(
 
     return sensor_dict
 
-def get_and_match_columns(df,dict_to_check):
-    
-    # Flatten the sensor list from the dictionary
+def flatten_configuration(dict_to_check):
+    """Get the list of all columns of a configuration dictionary, in order."""
     sensors_list = []
     for _, sensors in dict_to_check.items():
         if isinstance(sensors, dict):  # Handle locations that have sensors stored as dictionaries
@@ -97,80 +102,75 @@ def get_and_match_columns(df,dict_to_check):
                 sensors_list.extend(columns)
         elif isinstance(sensors, list):  # Handle locations like 'Time' that are lists
             sensors_list.extend(sensors)
-    # Compare the DataFrame columns with the flattened sensor list
-    missing_in_df = []
-    extra_in_df = []
-
-    # Check if any sensor in the dictionary is missing in the DataFrame columns
-    for sensor in sensors_list:
-        if sensor not in df.columns:
-            missing_in_df.append(sensor)
-
-    # Check if any column in the DataFrame is not found in the dictionary
-    for column in df.columns:
-        if column not in sensors_list:
-            extra_in_df.append(column)
-            # if column name has Unnamed in it and all the values are NaN, then drop the column
-            if "Unnamed" in column and df[column].isnull().all():
-                df.drop(column, axis=1, inplace=True)
-                # update the extra_in_df list
-                extra_in_df.remove(column)
-
-    if missing_in_df or extra_in_df:
-        # Show a streamlit error message saying which columns are missing and extra
-
-        st.error(f"Missing columns in the DataFrame: {missing_in_df}")
-        st.error(f"Extra columns in the DataFrame: {extra_in_df}")
-        status = False
-    else:
-        status = True
+    return sensors_list
+
+def match_header(columns, dict_to_check):
+    """
+    Compare the header of an upload with the configuration, without reading its rows.
+
+    Args:
+        columns (list): The columns of the upload.
+        dict_to_check (dict): The configuration dictionary of the category.
+
+    Returns:
+        tuple: The missing columns, the extra columns and the extra Unnamed columns. The Unnamed columns are only
+        allowed if they are empty, which is checked on the rows.
+    """
+    sensors_list = flatten_configuration(dict_to_check)
+    expected_columns = set(sensors_list)
+    upload_columns = set(columns)
+
+    missing_in_df = [sensor for sensor in sensors_list if sensor not in upload_columns]
+    extra_in_df = [column for column in columns if column not in expected_columns]
+    unnamed_columns = [column for column in extra_in_df if "Unnamed" in str(column)]
+    extra_in_df = [column for column in extra_in_df if column not in unnamed_columns]
+
+    return missing_in_df, extra_in_df, unnamed_columns
 
-    return status
+def get_filled_columns(df, columns):
+    """Get the columns that have a value in any row of the DataFrame."""
+    return [column for column in columns if df[column].notna().any()]
 
 def int_for_all_counts(df):
     """
     Convert all numeric columns in the DataFrame to integer type. Round float values that are not integers,
     and replace NaN values with 0 to allow conversion to integers.
+
+    All float columns are rounded and cast as one NumPy block (rounding half to even, like Python's round).
     """
-    # Loop through each column in the dataframe
-    for column in df.columns:
-        # Check if the column is of float type
-        if df[column].dtype == "float64":
-            # Apply the transformation only to non-NaN values
-            df[column] = df[column].apply(lambda x: int(x) if pd.notna(x) and x.is_integer() else (round(x) if pd.notna(x) else np.nan))
-            # Replace NaN values with 0 or another placeholder, then convert to integer
-            df[column] = df[column].fillna(0).astype('int64')
-        elif df[column].dtype == "object":
-            pass
+    float_columns = df.columns[(df.dtypes == "float64").to_numpy()]
+
+    if len(float_columns):
+        counts = np.round(df[float_columns].to_numpy())
+        counts[np.isnan(counts)] = 0
+        # Build the converted columns as one block, setting them one by one would fragment the frame
+        converted = pd.DataFrame(counts.astype('int64'), index=df.index, columns=float_columns)
+        df = pd.concat([df.drop(columns=float_columns), converted], axis=1)[df.columns]
 
     return df
 
+def _existing_columns(df, column_groups):
+    """Get the columns of a configuration group (a dictionary of column lists) that exist in the DataFrame."""
+    return [column for column_list in column_groups.values() for column in column_list if column in df.columns]
+
+def _to_numeric_block(df, columns):
+    """Convert columns to numbers, with values that are not numeric as NaN."""
+    return df[columns].apply(pd.to_numeric, errors='coerce')
+
+def _to_binary_block(df, columns):
+    """Convert columns to binary flags: 1 for positive numbers, 0 for everything else (including NaN)."""
+    return (_to_numeric_block(df, columns) > 0).astype(int)
+
 def convert_data_types(df, visitor_centers):
-    # Visitor centers count should be integers
-    visitor_center_columns = visitor_centers['visitor_centers_count'].values()
-    for column_list in visitor_center_columns:
-        for column in column_list:
-            if column in df.columns:
-                # Convert to numeric and fill NaN with 0, then convert to integer
-                df[column] = pd.to_numeric(df[column], errors='coerce').fillna(0).astype(int)
-
-    # Holidays should be binary (0 or 1)
-    holiday_columns = visitor_centers['holidays'].values()
-    for column_list in holiday_columns:
-        for column in column_list:
-            if column in df.columns:
-                # Convert to numeric and treat non-numeric as NaN, then ensure binary values (0 or 1)
-                df[column] = pd.to_numeric(df[column], errors='coerce').fillna(0)
-                df[column] = df[column].apply(lambda x: 1 if x > 0 else 0).astype(int)
-
-    # Opening or closed should be binary (0 or 1)
-    opening_columns = visitor_centers['opening_or_closed'].values()
-    for column_list in opening_columns:
-        for column in column_list:
-            if column in df.columns:
-                # Convert to numeric and ensure binary (0 or 1)
-                df[column] = pd.to_numeric(df[column], errors='coerce').fillna(0)
-                df[column] = df[column].apply(lambda x: 1 if x > 0 else 0).astype(int)
+    # Visitor centers count should be integers (non-numeric values become 0)
+    count_columns = _existing_columns(df, visitor_centers['visitor_centers_count'])
+    if count_columns:
+        df[count_columns] = _to_numeric_block(df, count_columns).fillna(0).astype(int)
+
+    # Holidays and opening or closed should be binary (0 or 1), all flag columns are converted as one block
+    flag_columns = _existing_columns(df, visitor_centers['holidays']) + _existing_columns(df, visitor_centers['opening_or_closed'])
+    if flag_columns:
+        df[flag_columns] = _to_binary_block(df, flag_columns)
 
     
     # Retrieve 'Datum' and 'Wochentag' from the dictionary
@@ -186,188 +186,101 @@ def convert_data_types(df, visitor_centers):
         df[day_column] = df[day_column].astype(str)
 
     # Convert temperature columns to float64, except 'Laubfärbung' to binary
-    temperature_columns = visitor_centers['temperature_columns'].values()
-    for column_list in temperature_columns:
-        for column in column_list:
-            if column in df.columns:
-                if column == 'Laubfärbung':
-                    # Convert Laubfärbung to binary (0 or 1)
-                    df[column] = pd.to_numeric(df[column], errors='coerce').fillna(0)
-                    df[column] = df[column].apply(lambda x: 1 if x > 0 else 0).astype(int)
-                else:
-                    # Convert other temperature columns to float64
-                    df[column] = pd.to_numeric(df[column], errors='coerce').astype('float64')
+    temperature_columns = _existing_columns(df, visitor_centers['temperature_columns'])
+    binary_columns = [column for column in temperature_columns if column == 'Laubfärbung']
+    float_columns = [column for column in temperature_columns if column != 'Laubfärbung']
+    if binary_columns:
+        df[binary_columns] = _to_binary_block(df, binary_columns)
+    if float_columns:
+        df[float_columns] = _to_numeric_block(df, float_columns).astype('float64')
 
     return df
 
-def parse_german_dates(
-    df: pd.DataFrame,
-    date_column_name: str
-) -> pd.DataFrame:
+def normalize_chunk(chunk, category, time_column, upload_time):
     """
-    Parses German dates in the specified date column of the DataFrame using regex,
-    including hours and minutes if available.
+    Parse the dates and convert the types of a chunk of an upload that passed the schema check.
 
     Args:
-        df (pd.DataFrame): The DataFrame containing the date column.
-        date_column_name (str): The name of the date column.
+        chunk (pd.DataFrame): Consecutive rows of the upload.
+        category (str): The category of the upload.
+        time_column (str): The time column of the category.
+        upload_time (str): The upload time added to every row.
 
     Returns:
-        pd.DataFrame: The DataFrame with parsed German dates.
+        pd.DataFrame: The normalized rows.
     """
-    
-    # Define a mapping of German month names to their numeric values
-    month_map = {
-        "Jan.": "01",
-        "Feb.": "02",
-        "März": "03",
-        "Apr.": "04",
-        "Mai": "05",
-        "Juni": "06",
-        "Juli": "07",
-        "Aug.": "08",
-        "Sep.": "09",
-        "Okt.": "10",
-        "Nov.": "11",
-        "Dez.": "12"
-    }
-
-    # Create a regex pattern for replacing months and capturing time
-    pattern = re.compile(r'(\d{1,2})\.\s*(' + '|'.join(month_map.keys()) + r')\s*(\d{4})\s*(\d{2}):(\d{2})')
-
-    # Function to replace the month in the matched string and keep the time part
-    def replace_month(match):
-        day = match.group(1)
-        month = month_map[match.group(2)]
-        year = match.group(3)
-        hour = match.group(4)
-        minute = match.group(5)
-        return f"{year}-{month}-{day} {hour}:{minute}:00"
-
-    # Apply regex replacement and convert to datetime
-        # Apply regex replacement and convert to datetime, only for string values
-    df[date_column_name] = df[date_column_name].apply(
-        lambda x: replace_month(pattern.search(str(x))) if isinstance(x, str) and pattern.search(str(x)) else x
-    )
-    df[date_column_name] = pd.to_datetime(df[date_column_name], errors='coerce')
-
-    return df
-
-def start_and_end_dates(df,time_column):
-    start_date = df[time_column].min()
-    end_date = df[time_column].max()
-
-    # get the start and the end dates with the format YYYY-MM-DD without the time
-    start_date = start_date.strftime('%Y-%m-%d')
-    end_date = end_date.strftime('%Y-%m-%d')
-    return start_date, end_date
-
-def process_and_upload_data(
-        new_processed_df,
-        target_folder,
-        file_name,
-        time_column):
-    
-    try:
-        blob_to_verify = BlobClient.from_connection_string(
-            conn_str=CONNECTION_STRING, 
-            container_name=CONTAINER_NAME, 
-            blob_name=f"{target_folder}/{file_name}.csv"
-        )
-        
-        # Check if the file already exists in Azure
-        if blob_to_verify.exists():
-            st.info("Existing preprocessed file found. Reading and concatenating with new data...")
-            
-            # Read the last edited file from the preprocessed folder
-            old_processed_df = read_dataframe_from_azure(
-                file_name=file_name,
-                file_format="csv",
-                source_folder=target_folder
-            )
-            
-            # Concatenate the old and the new dataframes
-            new_df = pd.concat([old_processed_df, new_processed_df], ignore_index=True)
-            
-            # Handle duplicate dates (remove rows with the same 'Time' value, keeping the last: as the concatination in the previous step concats as last dataframe the new data, keep='last' will keep the latest data when there are duplicates in the 'Time' column")
-            new_df = new_df.drop_duplicates(subset=[time_column], keep='last')
-
-        else:
-            st.info("No preprocessed file found. Using the new data only.")
-            # If the file does not exist, just use the new data
-            new_df = new_processed_df
-
-        # Add upload timestamp to the new data
-        new_df["Upload_time"] = pd.to_datetime("today").strftime('%Y-%m-%d %H:%M:%S')
-
-        # Write the new dataframe back to the cloud
-        upload_dataframe_to_azure(
-            df=new_df,
-            file_name=file_name,
-            target_folder=target_folder,
-            file_format="csv",
-            write_options={"index": False}
-        )
-        st.success("Data successfully processed and uploaded to the preprocessed folder.")
-
-    except Exception as e:
-        st.error(f"Error while processing data: {e}")
-
-def data_quality_check(data,category):
+    fixed_dates_chunk = parse_german_dates(chunk, time_column)
 
     if category == "visitor_count_sensors":
-        configuration_dict = visitor_sensors
-    elif category == "visitors_count_centers":
-        configuration_dict = visitor_centers
+        normalized_chunk = int_for_all_counts(fixed_dates_chunk)
     else:
-        status = True # This category does not have a data quality check implemented, so return True
-        return status
+        normalized_chunk = convert_data_types(fixed_dates_chunk, visitor_centers)
 
-    # check the column names from the data
-    status = get_and_match_columns(data, configuration_dict)
-    
-    if status:
-        # get the time column from the configuration dictionary
-        time_column = configuration_dict.get('time', [None])[0]
-
-        fixed_dates_data_df = parse_german_dates(data, time_column)
-
-        # get the start and the end dates
-        start_date, end_date = start_and_end_dates(fixed_dates_data_df, time_column)
-        
-        if category == "visitor_count_sensors":
-            new_processed_df = int_for_all_counts(fixed_dates_data_df)
-        elif category == "visitors_count_centers":
-            new_processed_df = convert_data_types(fixed_dates_data_df, visitor_centers)
-                    
-        # Add upload times the last column of the dataframe
-        new_processed_df["Upload_time"] = pd.to_datetime("today").strftime('%Y-%m-%d %H:%M:%S')
-
-        process_and_upload_data(
-            new_processed_df=new_processed_df,
-            target_folder=f"{preprocessed_folder}/{category}",
-            file_name=f"{category}_preprocessed",
-            time_column=time_column
-        )
+    normalized_chunk["Upload_time"] = upload_time
+    return normalized_chunk
 
-    else:
-        print("Data quality check failed. Please check the columns in the uploaded file.")
-        upload_time = pd.to_datetime("today").strftime('%Y-%m-%d %H:%M:%S')
-
-        upload_dataframe_to_azure(
-            df=data,
-            file_name=f"{category}_{upload_time}.csv",
-            target_folder=f"{invalid_upload_folder}/{category}",
-            file_format="csv",
-            write_options={
-                "index": False
-            }
-        )
-
-        st.error("If you have changed any column names, please update and try again. Your file is now uploaded to the invalid folder on the cloud storage.")
-    
-    return status
-    
+def streaming_data_quality_check(chunks, category):
+    """
+    Check and preprocess an upload chunk by chunk, so that the memory needed is bounded by the chunk size.
+
+    The schema is checked on the header of the first chunk. Every chunk is then checked for values in Unnamed
+    columns, normalized, and written to a local parquet part. Only when all chunks passed, the parts are written
+    as a single delta of the preprocessed table of the category (see `src.delta_store`), so a failed check or a
+    failed write leaves the table unchanged.
 
-if __name__ == "__main__":
-    data_quality_check()
+    Args:
+        chunks (iterable): The upload as DataFrames of consecutive rows, e.g. read with `pd.read_csv(chunksize=...)`.
+            Chunks after a failed check are not read.
+        category (str): The category of the upload.
+
+    Returns:
+        bool: True if the upload passed the check (or its category has no check) and its rows were written.
+    """
+    if category not in category_configurations:
+        return True # This category does not have a data quality check implemented, so return True
+
+    configuration_dict = category_configurations[category]
+    time_column = configuration_dict.get('time', [None])[0]
+    target_folder = f"{preprocessed_folder}/{category}"
+    table_name = f"{category}_preprocessed"
+    upload_time = pd.to_datetime("today").strftime('%Y-%m-%d %H:%M:%S')
+
+    with tempfile.TemporaryDirectory() as part_folder:
+        part_paths = []
+
+        for chunk_number, chunk in enumerate(chunks):
+            if chunk_number == 0:
+                missing_in_df, extra_in_df, unnamed_columns = match_header(list(chunk.columns), configuration_dict)
+                if missing_in_df or extra_in_df:
+                    st.error(f"Missing columns in the DataFrame: {missing_in_df}")
+                    st.error(f"Extra columns in the DataFrame: {extra_in_df}")
+                    return False
+
+            # Unnamed columns are only allowed if they are empty in all rows
+            filled_unnamed_columns = get_filled_columns(chunk, unnamed_columns)
+            if filled_unnamed_columns:
+                st.error(f"Extra columns in the DataFrame: {filled_unnamed_columns}")
+                return False
+
+            normalized_chunk = normalize_chunk(chunk.drop(columns=unnamed_columns), category, time_column, upload_time)
+            # Within the upload, the last row of every time wins as well
+            normalized_chunk = normalized_chunk.drop_duplicates(subset=[time_column], keep='last')
+
+            part_path = os.path.join(part_folder, f"part_{chunk_number:05d}.parquet")
+            convert_to_parquet_types(normalized_chunk).to_parquet(part_path, index=False)
+            part_paths.append(part_path)
+
+        if not part_paths:
+            st.error("The uploaded file has no rows.")
+            return False
+
+        # The parts keep the order of the rows, so for a time in several parts the last one wins
+        try:
+            delta_file_name = append_delta_parts(part_paths, folder=target_folder, table_name=table_name)
+            st.success(f"Data successfully processed and uploaded to the preprocessed folder ({delta_file_name}).")
+        except Exception as e:
+            # Nothing was written, so the upload is handled like a failed check
+            st.error(f"Error while processing data: {e}")
+            return False
+
+    return True
@@ -1,7 +1,30 @@
+import re
 import pandas as pd
 from src.config import CONTAINER_NAME, storage_options
 from typing import Dict, Any, Optional
 
+# Mapping of the German month names in the sensor exports to their numeric values
+german_month_map = {
+    "Jan.": "01",
+    "Feb.": "02",
+    "März": "03",
+    "Apr.": "04",
+    "Mai": "05",
+    "Juni": "06",
+    "Juli": "07",
+    "Aug.": "08",
+    "Sep.": "09",
+    "Okt.": "10",
+    "Nov.": "11",
+    "Dez.": "12"
+}
+
+# Regex pattern for German dates with time, e.g. "1. Jan. 2018 00:00"
+german_date_pattern = re.compile(r'(\d{1,2})\.\s*(' + '|'.join(german_month_map.keys()) + r')\s*(\d{4})\s*(\d{2}):(\d{2})')
+
+# Regex pattern for the date part only, e.g. "1. Jan. 2018"
+german_date_only_pattern = re.compile(r'^(\d{1,2})\.\s*(' + '|'.join(german_month_map.keys()) + r')\s*(\d{4})$')
+
 def read_dataframe_from_azure(
     file_name: str,
     file_format: str = "csv",
@@ -156,4 +179,75 @@ def upload_dataframe_to_azure(
 
     except Exception as e:
         print(f"❌ An error occurred while writing to Azure Blob Storage: {e}")
-        raise e
\ No newline at end of file
+        raise e
+
+
+def _replace_german_month(value):
+    """Rewrite a German date string to "YYYY-MM-DD HH:MM:00" using the regex pattern; other values are returned unchanged."""
+    match = german_date_pattern.search(value) if isinstance(value, str) else None
+    if match is None:
+        return value
+    day, month, year, hour, minute = match.groups()
+    return f"{year}-{german_month_map[month]}-{day} {hour}:{minute}:00"
+
+
+def _german_date_to_iso(match) -> str:
+    """Rewrite a match of the date-only pattern to "YYYY-MM-DD"."""
+    day, month, year = match.groups()
+    return f"{year}-{german_month_map[month]}-{int(day):02d}"
+
+
+def parse_german_dates(
+    df: pd.DataFrame,
+    date_column_name: str
+) -> pd.DataFrame:
+    """
+    Parses German dates (e.g. "1. Jan. 2018 00:00") in the specified date column of the DataFrame,
+    including hours and minutes if available.
+
+    The exports repeat the same few thousand days and 24 hours, so the column is split into its date and time parts
+    and only their unique values are parsed with the regex pattern and an explicit format. Values in any other layout
+    (e.g. datetimes read from Excel or already formatted dates) fall back to the regex rewrite and pandas' format
+    inference. Values that cannot be parsed become NaT.
+
+    Args:
+        df (pd.DataFrame): The DataFrame containing the date column.
+        date_column_name (str): The name of the date column.
+
+    Returns:
+        pd.DataFrame: The DataFrame with parsed German dates.
+    """
+    values = df[date_column_name]
+
+    # Nothing to do if the column is already parsed
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return df
+
+    parsed = pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns]")
+
+    if pd.api.types.infer_dtype(values, skipna=True) == "string":
+        is_string = values.notna()
+        strings = values[is_string].astype("string[pyarrow]")
+
+        # Split "1. Jan. 2018 00:00" into "1. Jan. 2018" and "00:00" and parse every unique part once
+        date_codes, date_parts = pd.factorize(strings.str.slice(0, -5))
+        time_codes, time_parts = pd.factorize(strings.str.slice(-5))
+
+        date_parts = pd.Series(date_parts, dtype=object).str.rstrip()
+        iso_dates = date_parts.str.replace(german_date_only_pattern, _german_date_to_iso, regex=True)
+        dates = pd.to_datetime(iso_dates, format="%Y-%m-%d", errors="coerce").to_numpy(dtype="datetime64[ns]")
+        time_parts = pd.Series(time_parts, dtype=object)
+        times = pd.to_timedelta(
+            time_parts.where(time_parts.str.fullmatch(r"\d{2}:\d{2}")) + ":00", errors="coerce"
+        ).to_numpy(dtype="timedelta64[ns]")
+
+        parsed[is_string] = dates[date_codes] + times[time_codes]
+
+    # Parse the remaining values that are not in the layout of the sensor exports
+    unparsed = parsed.isna() & values.notna()
+    if unparsed.any():
+        parsed[unparsed] = pd.to_datetime(values[unparsed].map(_replace_german_month), errors="coerce")
+
+    df[date_column_name] = parsed
+
+    return df
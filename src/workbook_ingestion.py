@@ -0,0 +1,160 @@
+"""
+Ingest Excel workbooks from the cloud into typed parquet copies.
+
+Parsing a multi-year workbook with openpyxl is much slower than reading columnar data. Every workbook is therefore
+parsed once per upload and stored as parquet next to the other preprocessed files. The copy is keyed by the ETag of
+the source blob, which changes with every upload, so a new workbook is picked up automatically and all later reads
+of the same upload only read the parquet copy.
+"""
+
+import hashlib
+import os
+
+import pandas as pd
+from azure.storage.blob import BlobClient
+from src.config import CONNECTION_STRING, CONTAINER_NAME, storage_options
+from src.utils import read_dataframe_from_azure, upload_dataframe_to_azure
+from typing import Dict, Any, Optional
+
+
+###########################################################################################
+# GLOBAL VARIABLES
+###########################################################################################
+
+ingested_workbooks_folder = "preprocessed_data/ingested_workbooks"
+
+
+###########################################################################################
+# Functions
+###########################################################################################
+
+def get_blob_etag(blob_name: str) -> str:
+    """
+    Get the ETag of a blob in the container, without the surrounding quotes.
+
+    Args:
+        blob_name (str): The full name of the blob, including its folder.
+
+    Returns:
+        str: The ETag of the blob.
+    """
+    blob_client = BlobClient.from_connection_string(
+        conn_str=CONNECTION_STRING,
+        container_name=CONTAINER_NAME,
+        blob_name=blob_name
+    )
+
+    return blob_client.get_blob_properties().etag.strip('"')
+
+def get_ingested_file_name(blob_name: str, etag: str, read_options: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Get the file name of the parquet copy of a workbook for one upload (ETag) and set of read options.
+
+    Args:
+        blob_name (str): The full name of the workbook blob.
+        etag (str): The ETag of the workbook blob.
+        read_options (dict, optional): The options passed to `pd.read_excel`. Defaults to None.
+
+    Returns:
+        str: The parquet file name within the ingested workbooks folder.
+    """
+    stem = os.path.splitext(os.path.basename(blob_name))[0]
+    key = etag
+    if read_options:
+        key += "-" + hashlib.md5(repr(sorted(read_options.items())).encode()).hexdigest()[:8]
+
+    return f"{stem}-{key}.parquet"
+
+def _is_blank(value) -> bool:
+    """Check if a cell value is an empty or whitespace-only string."""
+    return isinstance(value, str) and not value.strip()
+
+def convert_to_parquet_types(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Give the object columns of a parsed workbook a single type, so that they can be stored as parquet.
+
+    Blank cells (empty or whitespace-only strings) are missing values. Object columns whose values are all numbers
+    (or missing) become numeric, e.g. a column of 0/1 flags with blank cells. All other object columns (e.g. columns
+    with both numbers and text markers) store their values as strings, with missing values kept missing.
+
+    Args:
+        df (pd.DataFrame): The DataFrame read from the workbook.
+
+    Returns:
+        pd.DataFrame: The DataFrame with typed columns.
+    """
+    df.columns = df.columns.astype(str)
+
+    for column in df.columns[df.dtypes == object]:
+        values = df[column]
+        values = values.mask(values.map(_is_blank))
+        try:
+            df[column] = pd.to_numeric(values)
+        except (ValueError, TypeError):
+            df[column] = values.where(values.isna(), values.astype(str))
+
+    return df
+
+def ingested_file_exists(file_name: str) -> bool:
+    """
+    Check if a parquet copy of a workbook exists in the cloud.
+
+    Args:
+        file_name (str): The file name of the copy in the ingested workbooks folder.
+
+    Returns:
+        bool: True if the copy exists.
+    """
+    blob_client = BlobClient.from_connection_string(
+        conn_str=CONNECTION_STRING,
+        container_name=CONTAINER_NAME,
+        blob_name=f"{ingested_workbooks_folder}/{file_name}"
+    )
+
+    return blob_client.exists()
+
+def read_workbook(
+    blob_name: str,
+    read_options: Optional[Dict[str, Any]] = None,
+    etag: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    Read a workbook from the cloud through its parquet copy, ingesting the workbook first if this upload has not
+    been ingested yet.
+
+    Args:
+        blob_name (str): The full name of the workbook blob, including its folder.
+        read_options (dict, optional): Additional options for `pd.read_excel` (e.g. skipfooter). Defaults to None.
+        etag (str, optional): The ETag of the workbook blob, if already known (e.g. from listing the blobs).
+            Otherwise it is requested from the blob properties.
+
+    Returns:
+        pd.DataFrame: The data of the workbook.
+    """
+    etag = (etag or get_blob_etag(blob_name)).strip('"')
+    file_name = get_ingested_file_name(blob_name, etag, read_options)
+
+    if ingested_file_exists(file_name):
+        return read_dataframe_from_azure(
+            file_name=file_name,
+            file_format="parquet",
+            source_folder=ingested_workbooks_folder,
+        )
+
+    print(f"Ingesting the workbook {blob_name} (ETag {etag}) to parquet")
+
+    df = pd.read_excel(
+        f"az://{CONTAINER_NAME}/{blob_name}",
+        storage_options=storage_options,
+        **(read_options or {})
+    )
+    df = convert_to_parquet_types(df)
+
+    upload_dataframe_to_azure(
+        df=df,
+        file_name=file_name,
+        target_folder=ingested_workbooks_folder,
+        file_format="parquet",
+    )
+
+    return df
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+from src.prediction_pipeline.pre_processing.preprocess_historic_visitor_count_data import (
+    correct_and_impute_times, to_local_wall_clock
+)
+
+
+def make_export(times: list, counts: list) -> pd.DataFrame:
+    """A sensor export with local timestamps and one count column."""
+    return pd.DataFrame({'Time': pd.to_datetime(times), 'Lusen 1 EVO IN': counts})
+
+
+def test_spring_repeated_hour_is_combined_and_skipped_hour_imputed():
+    export = make_export(
+        ["2023-03-26 01:00", "2023-03-26 03:00", "2023-03-26 03:00", "2023-03-26 04:00"],
+        [1.0, np.nan, 3.0, 4.0],
+    )
+
+    df = correct_and_impute_times(export)
+
+    assert str(df.index.tz) == "Europe/Berlin"
+    assert list(df.index.tz_convert("UTC").hour) == [0, 1, 2]
+    assert df['Lusen 1 EVO IN'].tolist() == [1.0, 3.0, 4.0]
+
+    df = to_local_wall_clock(df)
+
+    assert df.index.tz is None
+    assert list(df.index.hour) == [1, 2, 3, 4]
+    assert df['Lusen 1 EVO IN'].tolist() == [1.0, 3.0, 3.0, 4.0]
+
+
+def test_autumn_repeated_hour_is_inferred_from_row_order():
+    export = make_export(
+        ["2023-10-29 01:00", "2023-10-29 02:00", "2023-10-29 02:00", "2023-10-29 03:00"],
+        [1.0, 2.0, 5.0, 3.0],
+    )
+
+    df = correct_and_impute_times(export)
+
+    assert list(df.index.tz_convert("UTC").hour) == [23, 0, 1, 2]
+    assert df['Lusen 1 EVO IN'].tolist() == [1.0, 2.0, 5.0, 3.0]
+    assert list(to_local_wall_clock(df).index.hour) == [1, 2, 2, 3]
@@ -0,0 +1,74 @@
+import datetime
+import io
+
+import openpyxl
+import pandas as pd
+import pytest
+
+from src.streamlit_app.pages_in_dashboard.data_accessibility.upload import iter_file_chunks
+
+
+class UploadedFile(io.BytesIO):
+    """In-memory stand-in for the file returned by st.file_uploader."""
+
+    def __init__(self, content: bytes, name: str):
+        super().__init__(content)
+        self.name = name
+        self.size = len(content)
+
+
+def make_workbook(rows: list) -> bytes:
+    """Write the rows to the first sheet of a workbook and return its bytes."""
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    for row in rows:
+        sheet.append(row)
+    content = io.BytesIO()
+    workbook.save(content)
+    return content.getvalue()
+
+
+def make_sensor_rows() -> list:
+    """A sensor export with the duplicate Gsenget headers, missing values, an empty row and trailing empty rows."""
+    rows = [['Time', 'Gsenget IN', 'Gsenget OUT', 'Gsenget IN', 'Gsenget OUT', None, 'Scheuereck']]
+    for hour in range(30):
+        rows.append([
+            datetime.datetime(2024, 3, 1) + datetime.timedelta(hours=hour),
+            hour, float(hour), hour + 0.5, None if hour % 4 else 'NA', None, 'x' if hour % 7 == 0 else None,
+        ])
+        if hour == 12:
+            rows.append([None] * 7)
+    rows += [[None] * 7, [None] * 3]
+    return rows
+
+
+@pytest.mark.parametrize("n_rows", [1, 4, 7, 1000])
+def test_excel_chunks_match_read_excel(n_rows):
+    content = make_workbook(make_sensor_rows())
+    expected = pd.read_excel(io.BytesIO(content), dtype=object)
+
+    chunks = [chunk for chunk, _ in iter_file_chunks(UploadedFile(content, "upload.xlsx"), n_rows)]
+    result = pd.concat(chunks, ignore_index=True)
+
+    assert list(result.columns)[:5] == ['Time', 'Gsenget IN', 'Gsenget OUT', 'Gsenget IN.1', 'Gsenget OUT.1']
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_excel_chunks_report_progress():
+    content = make_workbook(make_sensor_rows())
+
+    fractions = [fraction for _, fraction in iter_file_chunks(UploadedFile(content, "upload.xlsx"), 10)]
+
+    assert fractions == sorted(fractions)
+    assert fractions[-1] == 1.0
+
+
+def test_excel_header_only():
+    content = make_workbook(make_sensor_rows()[:1])
+    expected = pd.read_excel(io.BytesIO(content), dtype=object)
+
+    chunks = [chunk for chunk, _ in iter_file_chunks(UploadedFile(content, "upload.xlsx"))]
+
+    assert len(chunks) == 1
+    assert list(chunks[0].columns) == list(expected.columns)
+    assert chunks[0].empty
@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+from src.prediction_pipeline.pre_processing.features_zscoreweather_distanceholidays import (
+    add_daily_max_zscores, add_nearest_holiday_distance
+)
+
+
+def test_daily_max_zscores_window_spans_gaps():
+    days = pd.to_datetime(["2024-01-01", "2024-01-02", "2024-01-03", "2024-01-10", "2024-01-11"])
+    times = (days.values[:, np.newaxis] + np.array([0, 12], dtype="timedelta64[h]")).ravel()
+    df = pd.DataFrame({'Time': times, 'Temperature': [1.0, 2.0, 2.0, 4.0, 3.0, 3.0, 8.0, 1.0, 5.0, 6.0]})
+
+    df = add_daily_max_zscores(df, ['Temperature'], window_size=3)
+
+    # The window of a day after the gap holds the last three days with data
+    daily_max = pd.Series([2.0, 4.0, 3.0, 8.0, 6.0])
+    rolling = daily_max.rolling(3, min_periods=3)
+    expected = ((daily_max - rolling.mean()) / (rolling.std() + 1e-8)).repeat(2).to_numpy()
+    np.testing.assert_allclose(df['ZScore_Daily_Max_Temperature'].to_numpy(), expected)
+
+
+def test_missing_holiday_flags_are_not_holidays():
+    df = pd.DataFrame({
+        'Time': pd.date_range("2024-01-01", periods=5, freq="D"),
+        'Feiertag_Bayern': [np.nan, False, True, False, np.nan],
+        'Feiertag_CZ': [True, None, False, False, False],
+    })
+
+    df = add_nearest_holiday_distance(df)
+
+    assert df['Distance_to_Nearest_Holiday_Bayern'].tolist() == [2, 1, 0, 1, 2]
+    assert df['Distance_to_Nearest_Holiday_CZ'].tolist() == [0, 1, 2, 3, 4]
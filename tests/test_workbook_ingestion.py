@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+from src.workbook_ingestion import convert_to_parquet_types
+from src.prediction_pipeline.pre_processing.preprocess_visitor_center_data import change_binary_variables
+
+
+def make_workbook_frame() -> pd.DataFrame:
+    """Columns as parsed from a visitor center workbook with dtype=object."""
+    return pd.DataFrame({
+        'HEH_geoeffnet': pd.Series([1, 0, " ", 1, ""], dtype=object),
+        'Besuchszahlen_HEH': pd.Series([120, None, 87.5, "  ", 14], dtype=object),
+        'Bemerkung': pd.Series([0, "geschlossen", " ", None, 1], dtype=object),
+    })
+
+
+def test_blank_cells_are_missing_numbers():
+    df = convert_to_parquet_types(make_workbook_frame())
+
+    assert pd.api.types.is_numeric_dtype(df['HEH_geoeffnet'])
+    np.testing.assert_array_equal(df['HEH_geoeffnet'].to_numpy(), [1, 0, np.nan, 1, np.nan])
+    np.testing.assert_array_equal(df['Besuchszahlen_HEH'].to_numpy(), [120, np.nan, 87.5, np.nan, 14])
+
+
+def test_text_columns_are_strings_with_blanks_missing():
+    df = convert_to_parquet_types(make_workbook_frame())
+
+    assert df['Bemerkung'].tolist()[:2] == ['0', 'geschlossen']
+    assert df['Bemerkung'].iloc[2:4].isna().all()
+
+
+def test_flags_with_blank_cells_stay_binary():
+    df = change_binary_variables(convert_to_parquet_types(make_workbook_frame()))
+
+    assert df['HEH_geoeffnet'].dtype == bool